@@ -0,0 +1,4 @@
+from .harness import BenchmarkEnvironment
+from .fakes import FakeEmbeddings, FakeChain, FakeCrossEncoder
+
+__all__ = ["BenchmarkEnvironment", "FakeEmbeddings", "FakeChain", "FakeCrossEncoder"]
@@ -0,0 +1,123 @@
+"""Benchmark toàn bộ luồng xử lý mà không cần Qdrant Cloud, MongoDB Atlas, HuggingFace, Cohere hay Gemini.
+
+Cần thêm mongomock ngoài requirements của ứng dụng (tests/ dùng chung môi trường này):
+
+    pip install -r benchmarks/requirements.txt      # hoặc requirements-dev.txt để chạy cả pytest
+
+    python -m benchmarks --chunks 1000 10000 --questions 200 --chat-logs 100000 --save-baseline baseline.json
+    python -m benchmarks --chunks 1000 10000 --questions 200 --chat-logs 100000 --compare baseline.json
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+
+from .harness import BenchmarkEnvironment
+
+
+def flatten(results, prefix=""):
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = float(value)
+    return flat
+
+
+def higher_is_better(metric: str) -> bool:
+    return metric.endswith("_per_sec") or metric.endswith("hit_rate") or metric.endswith("recall_at_k")
+
+
+def compare(current, baseline, threshold):
+    current_flat, baseline_flat = flatten(current), flatten(baseline)
+    regressions = []
+    print(f"\n{'metric':<55}{'baseline':>14}{'current':>14}{'change':>10}")
+    for metric in sorted(current_flat):
+        if metric not in baseline_flat:
+            continue
+        old, new = baseline_flat[metric], current_flat[metric]
+        change = (new - old) / old if old else 0.0
+        worse = -change if higher_is_better(metric) else change
+        flag = ""
+        if worse > threshold and not metric.endswith(("chunks", "questions", "chat_logs", "input_units", "points")):
+            flag = "  REGRESSION"
+            regressions.append(metric)
+        print(f"{metric:<55}{old:>14.4f}{new:>14.4f}{change * 100:>9.1f}%{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, nargs="+", default=[1000], help="Số chunk tổng hợp cho mỗi lần ingest")
+    parser.add_argument("--questions", type=int, default=100)
+    parser.add_argument("--repeat-ratio", type=float, default=0.3, help="Tỉ lệ câu hỏi lặp lại (ảnh hưởng cache)")
+    parser.add_argument("--chat-logs", type=int, default=10000, help="Số bản ghi chat cho dashboard")
+    parser.add_argument("--pdf-pages", type=int, default=50)
+    parser.add_argument("--csv-rows", type=int, default=5000)
+    parser.add_argument("--html-paragraphs", type=int, default=500)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--embed-latency", type=float, default=0.0)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--first-token-latency", type=float, default=0.2)
+    parser.add_argument("--rerank-latency", type=float, default=0.05)
+    parser.add_argument("--no-cache", action="store_true", help="Tắt semantic cache")
+    parser.add_argument("--trace-memory", action="store_true", help="Đo bộ nhớ cấp phát đỉnh bằng tracemalloc")
+    parser.add_argument("--profile-chunks", type=int, default=5000, help="Số điểm cho benchmark profile collection")
+    parser.add_argument("--profiles", nargs="*", help="Chỉ đo các profile này (mặc định: tất cả)")
+    parser.add_argument("--qdrant-url", help="Qdrant server cho benchmark profile; chế độ :memory: bỏ qua "
+                                             "lượng tử hóa và HNSW nên recall/độ trễ không phản ánh thực tế")
+    parser.add_argument("--skip", nargs="*", default=[],
+                        choices=["ingest", "chat", "parsers", "dashboard", "profiles"])
+    parser.add_argument("--output", help="Ghi kết quả ra file JSON")
+    parser.add_argument("--save-baseline", help="Lưu kết quả làm baseline")
+    parser.add_argument("--compare", help="So sánh với baseline đã lưu")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Ngưỡng chậm đi bị coi là hồi quy (0.1 = 10%%)")
+    args = parser.parse_args(argv)
+
+    env = BenchmarkEnvironment(args.dim, args.embed_latency, args.llm_latency, args.first_token_latency,
+                               args.rerank_latency, not args.no_cache, args.trace_memory).setup()
+
+    results = {}
+    if "ingest" not in args.skip or "chat" not in args.skip:
+        for chunks in args.chunks:
+            results[f"ingest_{chunks}"] = env.bench_ingest(chunks)
+            print(f"ingest {chunks} chunks: {results[f'ingest_{chunks}']['seconds']:.2f}s", file=sys.stderr)
+    if "chat" not in args.skip:
+        results["chat"] = env.bench_chat(args.questions, args.repeat_ratio)
+        print(f"chat {args.questions} questions: {results['chat']['seconds']:.2f}s", file=sys.stderr)
+    if "parsers" not in args.skip:
+        results["parsers"] = env.bench_parsers(args.pdf_pages, args.csv_rows, args.html_paragraphs)
+    if "profiles" not in args.skip:
+        results["profiles"] = env.bench_profiles(args.profile_chunks, args.questions, profiles=args.profiles,
+                                                 qdrant_url=args.qdrant_url)
+    if "dashboard" not in args.skip:
+        results["dashboard"] = env.bench_dashboard(args.chat_logs)
+        print(f"dashboard {args.chat_logs} logs: {results['dashboard']['seconds']:.2f}s", file=sys.stderr)
+
+    report = {
+        "meta": {"timestamp": time.strftime("%Y-%m-%d %H:%M:%S"), "python": platform.python_version(),
+                 "machine": platform.machine(), "args": vars(args)},
+        "results": results,
+    }
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline["results"], args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) above {args.threshold * 100:.0f}%", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+import csv
+import hashlib
+import random
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional
+
+import pytz
+from langchain_core.documents import Document
+
+MAJORS = [
+    ("7480201", "Công nghệ thông tin"),
+    ("7480101", "Khoa học máy tính"),
+    ("7480103", "Kỹ thuật phần mềm"),
+    ("7520103", "Kỹ thuật cơ khí"),
+    ("7510301", "Công nghệ kỹ thuật điện, điện tử"),
+    ("7340101", "Quản trị kinh doanh"),
+    ("7340301", "Kế toán"),
+    ("7510401", "Công nghệ kỹ thuật hóa học"),
+    ("7540101", "Công nghệ thực phẩm"),
+    ("7580201", "Kỹ thuật xây dựng"),
+]
+METHODS = ["xét tuyển học bạ", "đánh giá năng lực", "điểm thi tốt nghiệp THPT"]
+YEARS = [2022, 2023, 2024]
+
+
+def _major_text(rng: random.Random) -> str:
+    code, name = rng.choice(MAJORS)
+    year = rng.choice(YEARS)
+    method = rng.choice(METHODS)
+    score = rng.randint(600, 900) if method == "đánh giá năng lực" else round(rng.uniform(18, 28), 2)
+    return (f"Ngành {name} (mã ngành {code}) năm {year} có điểm chuẩn {method} là {score}. "
+            f"Chỉ tiêu tuyển sinh {rng.randint(50, 400)} sinh viên, tổ hợp {rng.choice(['A00', 'A01', 'D01', 'D07'])}. "
+            f"Ghi chú: chương trình {rng.choice(['đại trà', 'chất lượng cao', 'liên kết quốc tế'])}.")
+
+
+def generate_chunks(count: int, seed: int = 42, source: str = "synthetic") -> Iterator[Document]:
+    rng = random.Random(seed)
+    for i in range(count):
+        yield Document(page_content=_major_text(rng), metadata={"source": f"{source}-{i // 50}", "page": i % 50})
+
+
+def _question(rng: random.Random) -> str:
+    code, name = rng.choice(MAJORS)
+    return rng.choice([
+        f"Điểm chuẩn ngành {name} năm {rng.choice(YEARS)}",
+        f"Mã ngành {code} xét tuyển học bạ bao nhiêu điểm",
+        f"Chỉ tiêu ngành {name} là bao nhiêu",
+    ])
+
+
+def generate_questions(count: int, repeat_ratio: float = 0.3, seed: int = 7) -> List[str]:
+    rng = random.Random(seed)
+    questions = []
+    for _ in range(count):
+        if questions and rng.random() < repeat_ratio:
+            questions.append(rng.choice(questions))
+        else:
+            questions.append(_question(rng))
+    return questions
+
+
+def generate_chat_records(count: int, days: int = 30, users: int = 500, seed: int = 11) -> Iterator[Dict]:
+    # Cùng cấu trúc với bản ghi do Chat.save_chat_result tạo ra
+    rng = random.Random(seed)
+    now = datetime.now(pytz.utc)
+    for _ in range(count):
+        question = _question(rng)
+        answer = _major_text(rng)
+        stages = {
+            "embedding": rng.uniform(0.01, 0.3),
+            "cache_lookup": rng.uniform(0.0, 0.01),
+            "retrieval": rng.uniform(0.05, 0.4),
+            "rerank": rng.uniform(0.1, 1.0),
+            "context": rng.uniform(0.0, 0.02),
+            "llm": rng.uniform(1.0, 6.0),
+        }
+        yield {
+            "question": question,
+            "answer": answer,
+            "processing_time": sum(stages.values()),
+            "time_to_first_token": stages["llm"] * 0.2 + sum(stages.values()) - stages["llm"],
+            "input_word_count": len(question.split()),
+            "output_word_count": len(answer.split()),
+            "timestamp": (now - timedelta(seconds=rng.uniform(0, days * 86400))),
+            "username": f"user{rng.randint(1, users)}",
+            "cache_hit": False,
+            "stages": stages,
+        }
+
+
+def write_csv(path: str, rows: int, seed: int = 3):
+    rng = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Mã ngành", "Tên ngành", "Năm", "Phương thức", "Điểm chuẩn", "Ghi chú"])
+        for _ in range(rows):
+            code, name = rng.choice(MAJORS)
+            writer.writerow([code, name, rng.choice(YEARS), rng.choice(METHODS), round(rng.uniform(18, 28), 2),
+                             "Chương trình đại trà, học tại cơ sở chính"])
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: str, pages: int, lines_per_page: int = 40, seed: int = 5):
+    # PDF tối giản viết tay (font Helvetica, chỉ ký tự ASCII) để không phụ thuộc thư viện tạo PDF
+    rng = random.Random(seed)
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for _ in range(pages):
+        lines = [f"Major {rng.choice(MAJORS)[0]} year {rng.choice(YEARS)} score {round(rng.uniform(18, 28), 2)} "
+                 f"quota {rng.randint(50, 400)}" for _ in range(lines_per_page)]
+        stream = "BT /F1 10 Tf 40 800 Td 14 TL " + " ".join(f"({_pdf_escape(line)}) '" for line in lines) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        content_id = len(objects)
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>")
+        page_ids.append(len(objects))
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{i} 0 R' for i in page_ids)}] /Count {len(page_ids)} >>"
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    for offset in offsets:
+        output += f"{offset:010d} 00000 n \n".encode("latin-1")
+    output += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    with open(path, "wb") as f:
+        f.write(output)
+
+
+def generate_html(paragraphs: int, seed: int = 9) -> str:
+    rng = random.Random(seed)
+    body = "\n".join(f"<p>{_major_text(rng)}</p>" for _ in range(paragraphs))
+    return f"<html><head><title>Tuyển sinh</title><style>p {{}}</style></head><body>{body}</body></html>"
+
+
+@contextmanager
+def serve_html(pages: Dict[str, str], etag: bool = False, requests: Optional[List] = None):
+    # pages có thể sửa trong lúc server chạy; etag=True trả ETag theo nội dung và 304 khi khớp If-None-Match,
+    # requests (nếu có) nhận (path, time.monotonic()) của mỗi request
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if requests is not None:
+                requests.append((self.path, time.monotonic()))
+            html = pages.get(self.path)
+            if html is None:
+                self.send_error(404)
+                return
+            payload = html.encode("utf-8")
+            tag = f'"{hashlib.sha1(payload).hexdigest()}"'
+            if etag and self.headers.get("If-None-Match") == tag:
+                self.send_response(304)
+                self.send_header("ETag", tag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            if etag:
+                self.send_header("ETag", tag)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,87 @@
+import hashlib
+import time
+from typing import Dict, Iterator, List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from models.text import tokenize
+
+
+class FakeEmbeddings(Embeddings):
+    """Embedding tất định: tổng các vector ngẫu nhiên (gieo theo từng từ), nên câu gần nhau có vector gần nhau."""
+
+    def __init__(self, dim: int = 384, latency: float = 0.0):
+        self.dim = dim
+        self.latency = latency
+        self._token_vectors: Dict[str, np.ndarray] = {}
+
+    def _token_vector(self, token: str) -> np.ndarray:
+        vector = self._token_vectors.get(token)
+        if vector is None:
+            seed = int.from_bytes(hashlib.md5(token.encode("utf-8")).digest()[:8], "little")
+            vector = np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+            self._token_vectors[token] = vector
+        return vector
+
+    def _embed(self, text: str) -> List[float]:
+        tokens = tokenize(text) or [""]
+        vector = np.sum([self._token_vector(token) for token in tokens], axis=0)
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._embed(text)
+
+
+class FakeChain:
+    """Thay cho chuỗi Gemini: trả lời dựa trên context, có độ trễ cấu hình được."""
+
+    def __init__(self, latency: float = 0.5, tokens: int = 200, first_token_latency: float = 0.2):
+        self.latency = latency
+        self.tokens = tokens
+        self.first_token_latency = first_token_latency
+
+    def _answer_tokens(self, inputs) -> List[str]:
+        context = inputs.get("context") or []
+        words = " ".join(getattr(doc, "page_content", str(doc)) for doc in context).split()
+        words = words or inputs.get("question", "").split() or ["..."]
+        return [words[i % len(words)] for i in range(self.tokens)]
+
+    def invoke(self, inputs) -> str:
+        time.sleep(self.latency)
+        return " ".join(self._answer_tokens(inputs))
+
+    def stream(self, inputs) -> Iterator[str]:
+        tokens = self._answer_tokens(inputs)
+        time.sleep(self.first_token_latency)
+        per_token = max(self.latency - self.first_token_latency, 0.0) / max(len(tokens), 1)
+        for token in tokens:
+            if per_token:
+                time.sleep(per_token)
+            yield token + " "
+
+
+class FakeCrossEncoder:
+    """Thay cho reranker: chấm điểm bằng độ trùng từ giữa câu hỏi và chunk."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+
+    def score(self, query: str, texts: List[str], batch_size: int = 16) -> List[float]:
+        if self.latency:
+            time.sleep(self.latency)
+        query_tokens = set(tokenize(query, fold=True))
+        scores = []
+        for text in texts:
+            tokens = set(tokenize(text, fold=True))
+            union = len(query_tokens | tokens)
+            scores.append(len(query_tokens & tokens) / union if union else 0.0)
+        return scores
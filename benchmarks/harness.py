@@ -0,0 +1,292 @@
+import importlib
+import os
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Dict, List
+
+import numpy as np
+import psutil
+
+from .datasets import (generate_chat_records, generate_chunks, generate_html, generate_questions, serve_html,
+                       write_csv, write_pdf)
+from .fakes import FakeChain, FakeCrossEncoder, FakeEmbeddings
+from .shim import HeadlessStreamlit
+
+BENCH_SECRETS = {
+    "QDRANT": {"URL": ":memory:", "API_KEY": ""},
+    "MONGODB": {
+        "URI": "mongodb://localhost",
+        "DATABASE": "benchmark",
+        "CHAT_HISTORY": "chat_history",
+        "LOGIN_HISTORY": "login_history",
+        "BAN_COLLECTION": "ban_list",
+        "ACCOUNT": "account",
+        "CHAT_DB": "chat_db",
+    },
+    "MODEL": {"EMBEDED": "fake-embedding", "CHAT": "fake-chat", "API_KEY": "", "HUGGINGFACE": ""},
+    "LANGCHAIN": {"LANGCHAIN_TRACING_V2": "false", "LANGCHAIN_ENDPOINT": "", "LANGCHAIN_API_KEY": "",
+                  "LANGCHAIN_PROJECT": ""},
+    "COHERE": {"API_KEY": ""},
+}
+
+UI_MODULES = ["ui.chat.chat", "ui.dashboard.upload", "ui.dashboard.manage", "ui.dashboard.collections"]
+
+
+def install_secrets():
+    # Phải chạy trước khi import config, vì config đọc st.secrets ngay lúc import
+    import streamlit as st
+    st.secrets._secrets = BENCH_SECRETS
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    array = np.asarray(values, dtype=float)
+    return {
+        "p50": float(np.percentile(array, 50)),
+        "p95": float(np.percentile(array, 95)),
+        "p99": float(np.percentile(array, 99)),
+        "mean": float(array.mean()),
+    }
+
+
+@contextmanager
+def measure(result: Dict, trace_memory: bool = False):
+    process = psutil.Process()
+    rss_before = process.memory_info().rss
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result["seconds"] = time.perf_counter() - start
+        result["rss_delta_mb"] = (process.memory_info().rss - rss_before) / (1024 ** 2)
+        if trace_memory:
+            result["peak_alloc_mb"] = tracemalloc.get_traced_memory()[1] / (1024 ** 2)
+            tracemalloc.stop()
+
+
+class BenchmarkEnvironment:
+    def __init__(self, dim: int = 384, embed_latency: float = 0.0, llm_latency: float = 0.5,
+                 first_token_latency: float = 0.2, rerank_latency: float = 0.05, cache: bool = True,
+                 trace_memory: bool = False):
+        self.dim = dim
+        self.embed_latency = embed_latency
+        self.llm_latency = llm_latency
+        self.first_token_latency = first_token_latency
+        self.rerank_latency = rerank_latency
+        self.cache = cache
+        self.trace_memory = trace_memory
+        self.st = HeadlessStreamlit()
+
+    def setup(self):
+        install_secrets()
+        try:
+            import mongomock
+        except ImportError as e:
+            raise ImportError("Benchmark cần mongomock: pip install -r benchmarks/requirements.txt") from e
+        from qdrant_client import QdrantClient
+
+        from config import MONGODB_CONFIG
+        from database import MongoManager, QdrantManager
+        from models import Model, Reranker, SemanticCache
+        from services import ResourceRegistry
+
+        MongoManager._instance = object.__new__(MongoManager)
+        MongoManager._client = mongomock.MongoClient()
+        MongoManager._db = MongoManager._client[MONGODB_CONFIG["DATABASE"]]
+
+        QdrantManager._instance = object.__new__(QdrantManager)
+        QdrantManager._client = QdrantClient(":memory:")
+        QdrantManager._url = ":memory:"
+
+        self.embeddings = FakeEmbeddings(self.dim, self.embed_latency)
+        Model._instance = object.__new__(Model)
+        Model._embedding_model = self.embeddings
+        Model._google_chain = FakeChain(self.llm_latency, first_token_latency=self.first_token_latency)
+
+        Reranker.initialize(backend="local", fallback="none")
+        Reranker._local = FakeCrossEncoder(self.rerank_latency)
+        SemanticCache.initialize(enabled=self.cache)
+
+        ResourceRegistry._resources = {
+            "mongodb": MongoManager._instance,
+            "qdrant_db": QdrantManager._instance,
+            "model": Model._instance,
+            "embedding_model": self.embeddings,
+            "ip": "127.0.0.1",
+        }
+        ResourceRegistry._initialized = True
+
+        for name in UI_MODULES:
+            importlib.import_module(name).st = self.st
+
+        self.st.session_state.update({
+            "mongodb": MongoManager._instance,
+            "qdrant_db": QdrantManager._instance,
+            "model": Model._instance,
+            "embedding_model": self.embeddings,
+            "chat_collection": MONGODB_CONFIG["CHAT_HISTORY"],
+            "login_collection": MONGODB_CONFIG["LOGIN_HISTORY"],
+            "ban_collection": MONGODB_CONFIG["BAN_COLLECTION"],
+            "account_collection": MONGODB_CONFIG["ACCOUNT"],
+            "chat_db": MONGODB_CONFIG["CHAT_DB"],
+            "username": "benchmark",
+            "messages": [],
+        })
+        return self
+
+    def activate_collection(self, name: str):
+        from database import QdrantManager
+        from services import ActiveCollection, ResourceRegistry
+
+        store = QdrantManager.get_store(name, self.embeddings)
+        retriever = QdrantManager.get_retriever(store)
+        ResourceRegistry._set_active(ActiveCollection(1, name, store, retriever))
+
+    def bench_ingest(self, chunks: int, batch_size: int = 256, workers: int = 4) -> Dict:
+        from services import IngestionPipeline
+
+        collection = f"bench_{chunks}"
+        result = {"chunks": chunks}
+        with measure(result, self.trace_memory):
+            pipeline = IngestionPipeline(collection, self.embeddings, batch_size=batch_size, workers=workers,
+                                         force_recreate=True)
+            summary = pipeline.run(generate_chunks(chunks))
+        result["chunks_per_sec"] = chunks / result["seconds"] if result["seconds"] else 0.0
+        result["embed_seconds"] = summary["timings"]["embed"]
+        result["upsert_seconds"] = summary["timings"]["upsert"]
+        self.activate_collection(collection)
+        return result
+
+    def bench_chat(self, questions: int, repeat_ratio: float = 0.3) -> Dict:
+        from models import SemanticCache
+        from ui.chat.chat import Chat
+
+        chat_collection = self.st.session_state.chat_collection
+        self.st.session_state.mongodb.delete_many(chat_collection, {})
+        SemanticCache.clear()
+
+        latencies = []
+        result = {"questions": questions}
+        with measure(result, self.trace_memory):
+            for question in generate_questions(questions, repeat_ratio):
+                start = time.perf_counter()
+                Chat.get_answer(question)
+                latencies.append(time.perf_counter() - start)
+        result["questions_per_sec"] = questions / result["seconds"] if result["seconds"] else 0.0
+        result["latency"] = percentiles(latencies)
+
+        records = self.st.session_state.mongodb.find_many(chat_collection, {})
+        result["cache_hit_rate"] = sum(1 for r in records if r.get("cache_hit")) / len(records) if records else 0.0
+        stages = {}
+        for record in records:
+            for stage, seconds in (record.get("stages") or {}).items():
+                stages.setdefault(stage, []).append(seconds)
+        result["stages"] = {stage: percentiles(values) for stage, values in stages.items()}
+        return result
+
+    def bench_parsers(self, pdf_pages: int = 50, csv_rows: int = 5000, html_paragraphs: int = 500) -> Dict:
+        from services import DocumentLoader
+
+        def parse(upload_type: str, source: str) -> Dict:
+            # Cùng chuỗi generator mà IngestionPipeline.ingest tiêu thụ, đếm chunk thay vì giữ cả danh sách
+            result = {}
+            with measure(result, self.trace_memory):
+                try:
+                    result["chunks"] = sum(1 for _ in DocumentLoader.split(
+                        DocumentLoader.iter_documents(upload_type, source)))
+                except Exception as e:
+                    result["error"] = str(e)
+            return result
+
+        results = {}
+        with tempfile.TemporaryDirectory() as tmp:
+            pdf_path = os.path.join(tmp, "bench.pdf")
+            csv_path = os.path.join(tmp, "bench.csv")
+            write_pdf(pdf_path, pdf_pages)
+            write_csv(csv_path, csv_rows)
+            results["pdf"] = {"input_units": pdf_pages, **parse("pdf", pdf_path)}
+            results["csv"] = {"input_units": csv_rows, **parse("csv", csv_path)}
+
+        with serve_html({"/tuyen-sinh": generate_html(html_paragraphs)}) as base_url:
+            results["web"] = {"input_units": html_paragraphs, **parse("web", f"{base_url}/tuyen-sinh")}
+        return results
+
+    def bench_profiles(self, chunks: int, queries: int = 100, k: int = 10, profiles: List[str] = None,
+                       qdrant_url: str = None) -> Dict:
+        from qdrant_client import QdrantClient, models
+
+        from database import QdrantManager
+        from database.qdrant import COLLECTION_PROFILES, estimate_memory
+
+        local_client = QdrantManager._client
+        if qdrant_url:
+            QdrantManager._client = QdrantClient(qdrant_url)
+        client = QdrantManager._client
+        docs = list(generate_chunks(chunks))
+        vectors = self.embeddings.embed_documents([doc.page_content for doc in docs])
+        query_vectors = [self.embeddings.embed_query(q) for q in generate_questions(queries, repeat_ratio=0.0)]
+
+        results = {}
+        try:
+            for profile in profiles or list(COLLECTION_PROFILES):
+                collection = f"bench_profile_{profile}"
+                result = {"points": chunks}
+                with measure(result, self.trace_memory):
+                    QdrantManager.ensure_collection(collection, self.dim, force_recreate=True, profile=profile)
+                    for i in range(0, len(docs), 256):
+                        QdrantManager.upsert_documents(collection, docs[i:i + 256], vectors[i:i + 256], sparse=True)
+                    # Chờ optimizer dựng xong HNSW/lượng tử hóa trước khi đo
+                    while client.get_collection(collection).status != models.CollectionStatus.GREEN:
+                        time.sleep(0.5)
+                result["build_seconds"] = result.pop("seconds")
+
+                search_params = QdrantManager.get_search_params(collection)
+                latencies, recalls = [], []
+                for vector in query_vectors:
+                    exact = client.query_points(collection, query=vector, limit=k,
+                                                search_params=models.SearchParams(exact=True)).points
+                    start = time.perf_counter()
+                    approx = client.query_points(collection, query=vector, limit=k, search_params=search_params).points
+                    latencies.append(time.perf_counter() - start)
+                    expected = {point.id for point in exact}
+                    recalls.append(len(expected & {point.id for point in approx}) / len(expected) if expected else 1.0)
+                result["latency"] = percentiles(latencies)
+                result["recall_at_k"] = float(np.mean(recalls)) if recalls else 0.0
+                result["memory"] = estimate_memory(chunks, self.dim, COLLECTION_PROFILES[profile])
+                results[profile] = result
+                QdrantManager.delete_collection(collection)
+        finally:
+            QdrantManager._client = local_client
+        return results
+
+    def bench_dashboard(self, chat_logs: int) -> Dict:
+        from services import DashboardDataCache, RollupManager
+        from ui.dashboard.manage import General
+
+        mongodb = self.st.session_state.mongodb
+        chat_collection = self.st.session_state.chat_collection
+        mongodb.delete_many(chat_collection, {})
+        batch = []
+        for record in generate_chat_records(chat_logs):
+            batch.append(record)
+            if len(batch) >= 10000:
+                mongodb.insert_many(chat_collection, batch)
+                batch = []
+        if batch:
+            mongodb.insert_many(chat_collection, batch)
+
+        # Dashboard chỉ đọc bảng tổng hợp, dựng lại từ dữ liệu vừa sinh (không có ghi song song nên gồm cả hôm nay)
+        RollupManager.backfill(chat_collection, self.st.session_state.login_collection,
+                               cutoff=RollupManager.now() + timedelta(days=1))
+
+        DashboardDataCache.invalidate()
+        result = {"chat_logs": chat_logs}
+        with measure(result, self.trace_memory):
+            General.show()
+        return result
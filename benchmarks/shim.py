@@ -0,0 +1,60 @@
+import streamlit
+
+
+class SessionState(dict):
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        self[name] = value
+
+    def __delattr__(self, name):
+        del self[name]
+
+
+class _NoOp:
+    def __call__(self, *args, **kwargs):
+        return self
+
+    def __getattr__(self, name):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __iter__(self):
+        return iter(())
+
+    def __len__(self):
+        return 0
+
+    def __bool__(self):
+        return False
+
+
+class HeadlessStreamlit:
+    """Thay cho module streamlit trong các trang UI khi chạy benchmark ngoài `streamlit run`:
+    session_state là dict thường, mọi lệnh vẽ giao diện đều bỏ qua."""
+
+    _passthrough = {"secrets", "cache_resource", "cache_data"}
+
+    def __init__(self):
+        self.session_state = SessionState()
+        self._noop = _NoOp()
+
+    def columns(self, spec, **kwargs):
+        return [self._noop] * (spec if isinstance(spec, int) else len(spec))
+
+    def tabs(self, labels):
+        return [self._noop] * len(labels)
+
+    def __getattr__(self, name):
+        if name in self._passthrough:
+            return getattr(streamlit, name)
+        return self._noop
@@ -2,7 +2,14 @@ import streamlit as st
 
 QDRANT_CONFIG = {
     "URL": st.secrets["QDRANT"]["URL"],
-    "API_KEY": st.secrets["QDRANT"]["API_KEY"]
+    "API_KEY": st.secrets["QDRANT"]["API_KEY"],
+    "POLL_INTERVAL": st.secrets["QDRANT"].get("POLL_INTERVAL", 10),
+    "SEARCH_TYPE": st.secrets["QDRANT"].get("SEARCH_TYPE", "hybrid"),
+    "SEARCH_K": st.secrets["QDRANT"].get("SEARCH_K", 10),
+    "SEARCH_EF": st.secrets["QDRANT"].get("SEARCH_EF", None),
+    "OVERSAMPLING": st.secrets["QDRANT"].get("OVERSAMPLING", None),
+    "DEFAULT_PROFILE": st.secrets["QDRANT"].get("DEFAULT_PROFILE", "default"),
+    "CATALOG_TTL": st.secrets["QDRANT"].get("CATALOG_TTL", 30)
 }
 
 MONGODB_CONFIG = {
@@ -12,14 +19,20 @@ MONGODB_CONFIG = {
     "LOGIN_HISTORY": st.secrets["MONGODB"]["LOGIN_HISTORY"],
     "BAN_COLLECTION": st.secrets["MONGODB"]["BAN_COLLECTION"],
     "ACCOUNT": st.secrets["MONGODB"]["ACCOUNT"],
-    "CHAT_DB": st.secrets["MONGODB"]["CHAT_DB"]
+    "CHAT_DB": st.secrets["MONGODB"]["CHAT_DB"],
+    "ROLLUPS": st.secrets["MONGODB"].get("ROLLUPS", "stats_rollups"),
+    "TERM_STATS": st.secrets["MONGODB"].get("TERM_STATS", "chat_term_stats")
 }
 
 MODEL_CONFIG = {
     "EMBEDDED": st.secrets["MODEL"]["EMBEDED"],
     "CHAT": st.secrets["MODEL"]["CHAT"],
     "API_KEY": st.secrets["MODEL"]["API_KEY"],
-    "HUGGINGFACE": st.secrets["MODEL"]["HUGGINGFACE"]
+    "HUGGINGFACE": st.secrets["MODEL"]["HUGGINGFACE"],
+    "EMBEDDING_BACKEND": st.secrets["MODEL"].get("EMBEDDING_BACKEND", "huggingface"),
+    "EMBEDDING_THREADS": st.secrets["MODEL"].get("EMBEDDING_THREADS", None),
+    "EMBEDDING_BATCH_SIZE": st.secrets["MODEL"].get("EMBEDDING_BATCH_SIZE", 64),
+    "EMBEDDING_CACHE_DIR": st.secrets["MODEL"].get("EMBEDDING_CACHE_DIR", None)
 }
 
 LANGCHAIN = {
@@ -33,4 +46,68 @@ COHERE = {
     "API_KEY": st.secrets['COHERE']['API_KEY']
 }
 
-__all__ = ["QDRANT_CONFIG", "MONGODB_CONFIG", "MODEL_CONFIG", "LANGCHAIN", "COHERE"]
\ No newline at end of file
+RERANK_CONFIG = {
+    "BACKEND": st.secrets.get("RERANK", {}).get("BACKEND", "cohere"),
+    "FALLBACK": st.secrets.get("RERANK", {}).get("FALLBACK", "local"),
+    "TOP_N": st.secrets.get("RERANK", {}).get("TOP_N", 5),
+    "TIMEOUT": st.secrets.get("RERANK", {}).get("TIMEOUT", 3.0),
+    "LOCAL_MODEL": st.secrets.get("RERANK", {}).get("LOCAL_MODEL", "Xenova/ms-marco-MiniLM-L-6-v2"),
+    "LOCAL_MODEL_FILE": st.secrets.get("RERANK", {}).get("LOCAL_MODEL_FILE", "onnx/model.onnx"),
+    "BATCH_SIZE": st.secrets.get("RERANK", {}).get("BATCH_SIZE", 16),
+    "CACHE_SIZE": st.secrets.get("RERANK", {}).get("CACHE_SIZE", 5000),
+    "THREADS": st.secrets.get("RERANK", {}).get("THREADS", None)
+}
+
+CONTEXT_CONFIG = {
+    "MAX_TOKENS": st.secrets.get("CONTEXT", {}).get("MAX_TOKENS", 3000),
+    "CHARS_PER_TOKEN": st.secrets.get("CONTEXT", {}).get("CHARS_PER_TOKEN", 3.0),
+    "DEDUP_THRESHOLD": st.secrets.get("CONTEXT", {}).get("DEDUP_THRESHOLD", 0.85)
+}
+
+INGESTION_CONFIG = {
+    "BATCH_SIZE": st.secrets.get("INGESTION", {}).get("BATCH_SIZE", None),
+    "WORKERS": st.secrets.get("INGESTION", {}).get("WORKERS", 4),
+    "MAX_PENDING": st.secrets.get("INGESTION", {}).get("MAX_PENDING", 8),
+    "JOB_WORKERS": st.secrets.get("INGESTION", {}).get("JOB_WORKERS", 2),
+    "JOB_COLLECTION": st.secrets.get("INGESTION", {}).get("JOB_COLLECTION", "ingestion_jobs"),
+    "UPLOAD_DIR": st.secrets.get("INGESTION", {}).get("UPLOAD_DIR", "uploads"),
+    "PROGRESS_INTERVAL": st.secrets.get("INGESTION", {}).get("PROGRESS_INTERVAL", 1.0),
+    "HEARTBEAT_INTERVAL": st.secrets.get("INGESTION", {}).get("HEARTBEAT_INTERVAL", 5.0),
+    "STALE_AFTER": st.secrets.get("INGESTION", {}).get("STALE_AFTER", 60.0)
+}
+
+CACHE_CONFIG = {
+    "ENABLED": st.secrets.get("CACHE", {}).get("ENABLED", True),
+    "SIMILARITY_THRESHOLD": st.secrets.get("CACHE", {}).get("SIMILARITY_THRESHOLD", 0.95),
+    "TTL_SECONDS": st.secrets.get("CACHE", {}).get("TTL_SECONDS", 6 * 60 * 60),
+    "MAX_ENTRIES": st.secrets.get("CACHE", {}).get("MAX_ENTRIES", 1000),
+    "BAN_LIST_TTL": st.secrets.get("CACHE", {}).get("BAN_LIST_TTL", 5)
+}
+
+CRAWLER_CONFIG = {
+    "CONCURRENCY": st.secrets.get("CRAWLER", {}).get("CONCURRENCY", 8),
+    "PER_HOST": st.secrets.get("CRAWLER", {}).get("PER_HOST", 2),
+    "DELAY": st.secrets.get("CRAWLER", {}).get("DELAY", 0.5),
+    "MAX_DEPTH": st.secrets.get("CRAWLER", {}).get("MAX_DEPTH", 2),
+    "MAX_PAGES": st.secrets.get("CRAWLER", {}).get("MAX_PAGES", 200),
+    "TIMEOUT": st.secrets.get("CRAWLER", {}).get("TIMEOUT", 15),
+    "VERIFY_SSL": st.secrets.get("CRAWLER", {}).get("VERIFY_SSL", True),
+    "USER_AGENT": st.secrets.get("CRAWLER", {}).get("USER_AGENT", "IUH-CHAT-Crawler/1.0"),
+    "STATE_COLLECTION": st.secrets.get("CRAWLER", {}).get("STATE_COLLECTION", "crawl_state")
+}
+
+RELEASE_CONFIG = {
+    "SMOKE_QUERIES": st.secrets.get("RELEASE", {}).get("SMOKE_QUERIES",
+                                                      ["điểm chuẩn", "học phí", "phương thức xét tuyển"]),
+    "MIN_HITS": st.secrets.get("RELEASE", {}).get("MIN_HITS", 1),
+    "MIN_POINTS_RATIO": st.secrets.get("RELEASE", {}).get("MIN_POINTS_RATIO", 0.5),
+    "KEEP_VERSIONS": st.secrets.get("RELEASE", {}).get("KEEP_VERSIONS", 3),
+    "COLLECTION": st.secrets.get("RELEASE", {}).get("COLLECTION", "collection_releases")
+}
+
+DASHBOARD_CONFIG = {
+    "TTL": st.secrets.get("DASHBOARD", {}).get("TTL", 30),
+    "MAX_ROWS": st.secrets.get("DASHBOARD", {}).get("MAX_ROWS", 200000)
+}
+
+__all__ = ["QDRANT_CONFIG", "MONGODB_CONFIG", "MODEL_CONFIG", "LANGCHAIN", "COHERE", "RERANK_CONFIG", "CONTEXT_CONFIG", "INGESTION_CONFIG", "CACHE_CONFIG", "CRAWLER_CONFIG", "RELEASE_CONFIG", "DASHBOARD_CONFIG"]
\ No newline at end of file
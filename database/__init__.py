@@ -1,4 +1,4 @@
-from .qdrant import QdrantManager
+from .qdrant import QdrantManager, HybridRetriever, CollectionCatalog
 from .mongo import MongoManager
 
-__all__ = ["QdrantManager", "MongoManager"]
\ No newline at end of file
+__all__ = ["QdrantManager", "HybridRetriever", "CollectionCatalog", "MongoManager"]
\ No newline at end of file
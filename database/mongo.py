@@ -14,7 +14,8 @@ class MongoManager:
 
     def __init__(self, uri, db_name):
         if MongoManager._client is None:
-            MongoManager._client = MongoClient(uri)
+            # Timestamp lưu dạng datetime UTC, đọc ra cũng có múi giờ để đổi sang giờ Việt Nam khi hiển thị
+            MongoManager._client = MongoClient(uri, tz_aware=True)
             MongoManager._db = MongoManager._client[db_name]
 
     @classmethod
@@ -55,6 +56,10 @@ class MongoManager:
     def delete_many(cls, collection_name, query):
         return cls.get_collection(collection_name).delete_many(query)
 
+    @classmethod
+    def aggregate(cls, collection_name, pipeline):
+        return list(cls.get_collection(collection_name).aggregate(pipeline))
+
     @classmethod
     def close_connection(cls):
         if cls._client:
@@ -1,16 +1,177 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.documents import Document
 from langchain_qdrant import Qdrant
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 # from langchain_huggingface import HuggingFaceEmbeddings
-from qdrant_client import QdrantClient
+from qdrant_client import QdrantClient, models
 from qdrant_client.http.exceptions import UnexpectedResponse
+from qdrant_client.local.qdrant_local import QdrantLocal
 from typing import List, Dict, Optional
-from langchain.retrievers.contextual_compression import ContextualCompressionRetriever
-from langchain_cohere import CohereRerank
+from models.reranker import Reranker
+from models.sparse import VietnameseSparseEncoder
+from models.tracing import Tracer
+
+SPARSE_VECTOR_NAME = "text-sparse"
+
+# Cấu hình collection: lượng tử hóa giảm RAM cho vector, rescore bằng vector gốc (trên đĩa) để giữ độ chính xác
+COLLECTION_PROFILES = {
+    "default": {"quantization": None, "hnsw_m": 16, "hnsw_ef_construct": 100, "on_disk_vectors": False,
+                "on_disk_payload": False, "search_ef": None, "oversampling": None},
+    "accurate": {"quantization": None, "hnsw_m": 32, "hnsw_ef_construct": 256, "on_disk_vectors": False,
+                 "on_disk_payload": False, "search_ef": 128, "oversampling": None},
+    "balanced": {"quantization": "scalar", "hnsw_m": 16, "hnsw_ef_construct": 100, "on_disk_vectors": True,
+                 "on_disk_payload": False, "search_ef": 64, "oversampling": 2.0},
+    "compact": {"quantization": "binary", "hnsw_m": 16, "hnsw_ef_construct": 100, "on_disk_vectors": True,
+                "on_disk_payload": True, "search_ef": 64, "oversampling": 3.0},
+}
+
+
+class HybridRetriever:
+    def __init__(self, store: Qdrant, client: QdrantClient, encoder: VietnameseSparseEncoder, k: int = 10,
+                 prefetch_k: int = 30, score_threshold: float = 0.6, sparse: bool = True,
+                 search_params: Optional[models.SearchParams] = None):
+        self.vectorstore = store
+        self.client = client
+        self.encoder = encoder
+        self.k = k
+        self.prefetch_k = prefetch_k
+        self.score_threshold = score_threshold
+        self.sparse = sparse
+        self.search_params = search_params
+
+    def invoke(self, question: str) -> List[Document]:
+        return self.search(question, self.vectorstore.embeddings.embed_query(question))
+
+    def search(self, question: str, embedding) -> List[Document]:
+        if not self.sparse:
+            # Collection cũ chưa có vector thưa thì chỉ tìm theo vector dày
+            docs_and_scores = self.vectorstore.similarity_search_with_score_by_vector(
+                embedding, k=self.k, score_threshold=self.score_threshold, search_params=self.search_params
+            )
+            return [doc for doc, _ in docs_and_scores]
+
+        indices, values = self.encoder.encode_query(question)
+        response = self.client.query_points(
+            collection_name=self.vectorstore.collection_name,
+            prefetch=[
+                models.Prefetch(query=embedding, limit=self.prefetch_k, score_threshold=self.score_threshold,
+                                params=self.search_params),
+                models.Prefetch(query=models.SparseVector(indices=indices, values=values), using=SPARSE_VECTOR_NAME,
+                                limit=self.prefetch_k),
+            ],
+            query=models.FusionQuery(fusion=models.Fusion.RRF),
+            limit=self.k,
+            with_payload=True
+        )
+        return [self._to_document(point) for point in response.points]
+
+    def _to_document(self, point) -> Document:
+        payload = point.payload or {}
+        metadata = dict(payload.get("metadata") or {})
+        metadata["_id"] = point.id
+        metadata["_collection_name"] = self.vectorstore.collection_name
+        return Document(page_content=payload.get("page_content", ""), metadata=metadata)
+
+
+def profile_from_config(config) -> Optional[str]:
+    # Qdrant không lưu tên profile, nên suy ra từ cấu hình lượng tử hóa và HNSW của collection
+    quantization = config.quantization_config
+    quantization_type = None
+    if isinstance(quantization, models.ScalarQuantization):
+        quantization_type = "scalar"
+    elif isinstance(quantization, models.BinaryQuantization):
+        quantization_type = "binary"
+    for name, settings in COLLECTION_PROFILES.items():
+        if (settings["quantization"] == quantization_type and settings["hnsw_m"] == config.hnsw_config.m
+                and settings["hnsw_ef_construct"] == config.hnsw_config.ef_construct):
+            return name
+    return None
+
+
+def estimate_memory(points: int, dim: int, settings: Dict) -> Dict:
+    # Ước lượng theo kích thước vector dày và đồ thị HNSW, bỏ qua payload và vector thưa
+    original_mb = points * dim * 4 / (1024 ** 2)
+    quantized_mb = {"scalar": points * dim, "binary": points * dim / 8}.get(settings["quantization"], 0) / (1024 ** 2)
+    graph_mb = points * settings["hnsw_m"] * 2 * 4 / (1024 ** 2)
+    ram_mb = quantized_mb + graph_mb + (0.0 if settings["on_disk_vectors"] else original_mb)
+    return {"ram_mb": ram_mb, "disk_mb": original_mb + quantized_mb + graph_mb}
+
+
+class CollectionCatalog:
+    _lock = threading.Lock()
+    _executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="qdrant-catalog")
+    _collections: Optional[List[Dict]] = None
+    _fetched_at = 0.0
+    _generation = 0
+    ttl = 30.0
+
+    @classmethod
+    def configure(cls, ttl: float = 30.0):
+        cls.ttl = float(ttl)
+
+    @classmethod
+    def invalidate(cls):
+        with cls._lock:
+            cls._collections = None
+            cls._generation += 1
+
+    @staticmethod
+    def _describe(client: QdrantClient, name: str, aliases: List[str]) -> Dict:
+        info = client.get_collection(name)
+        vector_config = info.config.params.vectors
+        points = info.points_count or 0
+        size = getattr(vector_config, 'size', None)
+        profile = profile_from_config(info.config)
+        settings = COLLECTION_PROFILES.get(profile) or {
+            "quantization": None, "hnsw_m": info.config.hnsw_config.m,
+            "on_disk_vectors": bool(getattr(vector_config, 'on_disk', False))
+        }
+        return {
+            'name': name,
+            'vector_size': size,
+            'distance_metric': getattr(vector_config, 'distance', None),
+            'points_count': points,
+            'indexed_vectors_count': info.indexed_vectors_count,
+            'segments_count': info.segments_count,
+            'status': str(getattr(info.status, 'value', info.status)),
+            'profile': profile,
+            'aliases': aliases,
+            'memory': estimate_memory(points, size or 0, settings)
+        }
+
+    @classmethod
+    def get(cls, client: QdrantClient, force: bool = False) -> List[Dict]:
+        with cls._lock:
+            if not force and cls._collections is not None and time.monotonic() - cls._fetched_at < cls.ttl:
+                return cls._collections
+            generation = cls._generation
+
+        # Một lần liệt kê, sau đó lấy chi tiết các collection song song thay vì tuần tự N+1 lần
+        names = [collection.name for collection in client.get_collections().collections]
+        aliases: Dict[str, List[str]] = {}
+        for alias in client.get_aliases().aliases:
+            aliases.setdefault(alias.collection_name, []).append(alias.alias_name)
+        collections = list(cls._executor.map(lambda name: cls._describe(client, name, aliases.get(name, [])), names))
+
+        with cls._lock:
+            # Bỏ kết quả nếu đã bị invalidate trong lúc đang tải, tránh ghi đè bằng dữ liệu cũ
+            if generation == cls._generation:
+                cls._collections = collections
+                cls._fetched_at = time.monotonic()
+        return collections
+
+
 class QdrantManager:
     _instance = None
     _client = None
     _url = None
     _api_key = None
+    _sparse_encoder = VietnameseSparseEncoder()
+    _local_write_lock = threading.Lock()
+
     def __new__(cls, url: str, api_key: Optional[str] = None):
         if cls._instance is None:
             cls._instance = super(QdrantManager, cls).__new__(cls)
@@ -27,34 +188,195 @@ class QdrantManager:
         return cls(url, api_key)
 
     @classmethod
-    def upload_data(cls, collection: str, docs, embedded, force_recreate: bool = False) -> Qdrant:
+    def is_local(cls) -> bool:
+        # Client nhúng (":memory:" hoặc thư mục) giữ dữ liệu trong tiến trình, không an toàn khi ghi/đọc song song
+        return isinstance(getattr(cls._client, "_client", None), QdrantLocal)
+
+    @classmethod
+    def _serialized(cls, operation, **kwargs):
+        if not cls.is_local():
+            return operation(**kwargs)
+        with cls._local_write_lock:
+            return operation(**kwargs)
+
+    @classmethod
+    def has_sparse_vectors(cls, collection: str) -> bool:
+        sparse_vectors = cls._client.get_collection(cls.resolve_alias(collection)).config.params.sparse_vectors or {}
+        return SPARSE_VECTOR_NAME in sparse_vectors
+
+    @classmethod
+    def list_collection_names(cls) -> List[str]:
+        return [collection.name for collection in cls._client.get_collections().collections]
+
+    @classmethod
+    def count_points(cls, collection: str) -> int:
+        return cls._client.count(collection_name=collection).count
+
+    @classmethod
+    def get_aliases(cls) -> Dict[str, str]:
+        return {alias.alias_name: alias.collection_name for alias in cls._client.get_aliases().aliases}
+
+    @classmethod
+    def resolve_alias(cls, name: str) -> str:
+        return cls.get_aliases().get(name, name)
+
+    @classmethod
+    def switch_alias(cls, alias: str, collection: str):
+        # Xóa và tạo alias trong cùng một request nên phía truy vấn không bao giờ thấy alias rỗng
+        operations = []
+        if alias in cls.get_aliases():
+            operations.append(models.DeleteAliasOperation(delete_alias=models.DeleteAlias(alias_name=alias)))
+        operations.append(models.CreateAliasOperation(
+            create_alias=models.CreateAlias(collection_name=collection, alias_name=alias)))
+        cls._client.update_collection_aliases(change_aliases_operations=operations)
+        CollectionCatalog.invalidate()
+
+    @classmethod
+    def collection_exists(cls, collection: str) -> bool:
+        return cls._client.collection_exists(collection)
+
+    @classmethod
+    def ensure_source_index(cls, collection: str):
+        # Index theo nguồn để lọc điểm của một file/URL khi nạp lại không phải quét toàn bộ collection
+        try:
+            cls._client.create_payload_index(collection_name=collection, field_name="metadata.source",
+                                             field_schema=models.PayloadSchemaType.KEYWORD)
+        except UnexpectedResponse as e:
+            print(f"Không tạo được payload index: {str(e)}")
+
+    @classmethod
+    def get_point_ids(cls, collection: str, source: str, batch_size: int = 1000) -> set:
+        ids = set()
+        offset = None
+        source_filter = models.Filter(must=[
+            models.FieldCondition(key="metadata.source", match=models.MatchValue(value=source))
+        ])
+        while True:
+            # Pipeline đọc ID của nguồn mới trong khi các batch trước vẫn đang ghi
+            points, offset = cls._serialized(cls._client.scroll, collection_name=collection,
+                                             scroll_filter=source_filter, limit=batch_size, offset=offset,
+                                             with_payload=False, with_vectors=False)
+            ids.update(str(point.id) for point in points)
+            if offset is None:
+                return ids
+
+    @classmethod
+    def delete_points(cls, collection: str, ids, batch_size: int = 1000):
+        ids = list(ids)
+        for i in range(0, len(ids), batch_size):
+            cls._serialized(cls._client.delete, collection_name=collection,
+                       points_selector=models.PointIdsList(points=ids[i:i + batch_size]))
+
+    @staticmethod
+    def _quantization_config(quantization: Optional[str]):
+        if quantization == "scalar":
+            return models.ScalarQuantization(scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8, quantile=0.99, always_ram=True))
+        if quantization == "binary":
+            return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True))
+        if quantization:
+            raise ValueError(f"Unknown quantization '{quantization}'")
+        return None
+
+    @classmethod
+    def ensure_collection(cls, collection: str, vector_size: int, force_recreate: bool = False,
+                          profile: str = "default") -> bool:
+        exists = cls._client.collection_exists(collection)
+        if exists and force_recreate:
+            cls._client.delete_collection(collection_name=collection)
+            exists = False
+
+        if not exists:
+            settings = COLLECTION_PROFILES[profile]
+            cls._client.create_collection(
+                collection_name=collection,
+                vectors_config=models.VectorParams(size=vector_size, distance=models.Distance.COSINE,
+                                                   on_disk=settings["on_disk_vectors"]),
+                sparse_vectors_config={SPARSE_VECTOR_NAME: models.SparseVectorParams(modifier=models.Modifier.IDF)},
+                hnsw_config=models.HnswConfigDiff(m=settings["hnsw_m"], ef_construct=settings["hnsw_ef_construct"]),
+                quantization_config=cls._quantization_config(settings["quantization"]),
+                on_disk_payload=settings["on_disk_payload"]
+            )
+            cls.ensure_source_index(collection)
+            CollectionCatalog.invalidate()
+            return True
+        return cls.has_sparse_vectors(collection)
+
+    @classmethod
+    def upsert_documents(cls, collection: str, docs, vectors, sparse: bool = True, ids=None):
+        sparse_vectors = cls._sparse_encoder.encode_documents([doc.page_content for doc in docs]) if sparse else None
+        points = []
+        for i, (doc, vector) in enumerate(zip(docs, vectors)):
+            # Giữ đúng cấu trúc payload của langchain_qdrant để get_store đọc lại được
+            point_vector = vector
+            if sparse_vectors is not None:
+                indices, values = sparse_vectors[i]
+                point_vector = {"": vector,
+                                SPARSE_VECTOR_NAME: models.SparseVector(indices=indices, values=values)}
+            points.append(models.PointStruct(
+                id=ids[i] if ids else str(uuid.uuid4()),
+                vector=point_vector,
+                payload={"page_content": doc.page_content, "metadata": doc.metadata}
+            ))
+        # Embedding và mã hóa vector thưa vẫn chạy song song ở bên gọi, chỉ bước ghi bị tuần tự với client nhúng
+        cls._serialized(cls._client.upsert, collection_name=collection, points=points)
+
+    @classmethod
+    def upload_data(cls, collection: str, docs, embedded, force_recreate: bool = False, batch_size: int = 64,
+                    profile: str = "default") -> Qdrant:
         if cls._client is None:
             raise Exception("QdrantManager has not been initialized. Call get_instance() first.")
 
-        return Qdrant.from_documents(
-            docs,
-            embedding=embedded,
-            url=cls._url,
-            collection_name=collection,
-            force_recreate=force_recreate,
-            api_key=cls._api_key
-        )
+        docs = list(docs)
+        sparse = None
+        for i in range(0, len(docs), batch_size):
+            batch = docs[i:i + batch_size]
+            vectors = embedded.embed_documents([doc.page_content for doc in batch])
+            if sparse is None:
+                sparse = cls.ensure_collection(collection, len(vectors[0]), force_recreate, profile)
+            cls.upsert_documents(collection, batch, vectors, sparse)
+
+        CollectionCatalog.invalidate()
+        return Qdrant(client=cls._client, collection_name=collection, embeddings=embedded)
 
     @classmethod
     def get_store(cls, collection: str, embedded) -> Qdrant:
         if cls._client is None:
             raise Exception("QdrantManager has not been initialized. Call get_instance() first.")
 
-        return Qdrant.from_existing_collection(
-            embedding=embedded,
-            collection_name=collection,
-            url=cls._url,
-            api_key=cls._api_key
-        )
+        # Dùng lại client đã có thay vì mở thêm một kết nối cho mỗi store
+        return Qdrant(client=cls._client, collection_name=collection, embeddings=embedded)
+
+    @classmethod
+    def get_profile(cls, collection: str) -> Optional[str]:
+        return profile_from_config(cls._client.get_collection(cls.resolve_alias(collection)).config)
+
+    @classmethod
+    def get_search_params(cls, collection: str, search_ef: Optional[int] = None,
+                          oversampling: Optional[float] = None) -> Optional[models.SearchParams]:
+        settings = COLLECTION_PROFILES.get(cls.get_profile(collection), COLLECTION_PROFILES["default"])
+        search_ef = search_ef or settings["search_ef"]
+        quantization_params = None
+        if settings["quantization"]:
+            # Tìm trên vector nén rồi rescore bằng vector gốc để giữ độ chính xác
+            quantization_params = models.QuantizationSearchParams(
+                rescore=True, oversampling=oversampling or settings["oversampling"])
+        if search_ef is None and quantization_params is None:
+            return None
+        return models.SearchParams(hnsw_ef=search_ef, quantization=quantization_params)
+
+    @classmethod
+    def get_retriever(cls, store, search_type: str = 'hybrid', k: int = 10, search_ef: Optional[int] = None,
+                      oversampling: Optional[float] = None):
+        search_params = cls.get_search_params(store.collection_name, search_ef, oversampling)
+        if search_type == 'hybrid':
+            return HybridRetriever(store, cls._client, cls._sparse_encoder, k=k, prefetch_k=3 * k,
+                                   sparse=cls.has_sparse_vectors(store.collection_name),
+                                   search_params=search_params)
 
-    @staticmethod
-    def get_retriever(store, search_type: str = 'similarity_score_threshold', k: int = 15):
         search_kwargs = {'k': k}
+        if search_params is not None:
+            search_kwargs['search_params'] = search_params
         if search_type == 'mmr':
             search_kwargs['fetch_k'] = 20
             search_kwargs['lambda_mult'] = 0.5
@@ -63,27 +385,10 @@ class QdrantManager:
         return store.as_retriever(search_type=search_type, search_kwargs=search_kwargs)
 
     @classmethod
-    def get_collections(cls) -> List[Dict]:
+    def get_collections(cls, force: bool = False) -> List[Dict]:
         if cls._client is None:
             raise Exception("QdrantManager has not been initialized. Call get_instance() first.")
-
-        collections = cls._client.get_collections()
-        detailed_collections = []
-
-        for collection in collections.collections:
-            collection_info = cls._client.get_collection(collection.name)
-            vector_config = collection_info.config.params
-            points_count = cls._client.count(collection_name=collection.name).count
-
-
-            detailed_collections.append({
-                'name': collection.name,
-                'vector_size': getattr(vector_config.vectors, 'size', None),  # Using getattr for safety
-                'distance_metric': getattr(vector_config.vectors, 'distance', None),  # Adjusted this commented line
-                'points_count': points_count
-            })
-
-        return detailed_collections
+        return CollectionCatalog.get(cls._client, force)
 
     @classmethod
     def delete_collection(cls, collection_name: str) -> bool:
@@ -92,6 +397,7 @@ class QdrantManager:
 
         try:
             cls._client.delete_collection(collection_name=collection_name)
+            CollectionCatalog.invalidate()
 
             collections = cls._client.get_collections()
             return collection_name not in [col.name for col in collections.collections]
@@ -103,14 +409,35 @@ class QdrantManager:
             print(f"Lỗi không mong đợi: {str(e)}")
             return False
 
+    @classmethod
+    def retrieve(cls, retriever, question, embedding=None):
+        with Tracer.stage("retrieval"):
+            docs = cls._search(retriever, question, embedding)
+        Tracer.record("candidate_count", len(docs))
+        return docs
+
     @staticmethod
-    def get_data_from_store(retriever, question):
-        compressor = CohereRerank(top_n=7)
-        compression_retriever = ContextualCompressionRetriever(
-            base_compressor=compressor, base_retriever=retriever,
-        )
-        compressed_docs = compression_retriever.invoke(
-            question
-        )
-        return compressed_docs
-        # return retriever.invoke(question)
\ No newline at end of file
+    def _search(retriever, question, embedding=None):
+        if embedding is None:
+            return retriever.invoke(question)
+        if isinstance(retriever, HybridRetriever):
+            return retriever.search(question, embedding)
+
+        # Đã có sẵn vector của câu hỏi thì tìm kiếm trực tiếp, tránh gọi embedding thêm lần nữa
+        store = retriever.vectorstore
+        search_kwargs = dict(retriever.search_kwargs)
+        k = search_kwargs.pop('k', 4)
+        if retriever.search_type == 'mmr':
+            return store.max_marginal_relevance_search_by_vector(embedding, k=k, **search_kwargs)
+        if retriever.search_type == 'similarity_score_threshold':
+            docs_and_scores = store.similarity_search_with_score_by_vector(embedding, k=k, **search_kwargs)
+            return [doc for doc, _ in docs_and_scores]
+        return store.similarity_search_by_vector(embedding, k=k, **search_kwargs)
+
+    @classmethod
+    def get_data_from_store(cls, retriever, question, embedding=None):
+        docs = cls.retrieve(retriever, question, embedding)
+        with Tracer.stage("rerank"):
+            reranked = Reranker.rerank(question, docs)
+        Tracer.record("reranked_count", len(reranked))
+        return reranked
@@ -1,40 +1,39 @@
 import streamlit as st
-from config import QDRANT_CONFIG, MONGODB_CONFIG, MODEL_CONFIG, LANGCHAIN, COHERE
-from database import QdrantManager, MongoManager
+from config import QDRANT_CONFIG, MONGODB_CONFIG, MODEL_CONFIG, INGESTION_CONFIG
+from services import ResourceRegistry, ActiveCollectionWatcher, IngestionJobQueue
 from ui import *
-from models import Model
 from style import custom_css
-import socket
-import os
+import time
 
 class Main:
     @staticmethod
     def initialize():
         if "initialized" not in st.session_state:
-            os.environ.update({str(k): str(v) for k, v in LANGCHAIN.items()})
-            os.environ['COHERE_API_KEY'] = COHERE['API_KEY']
+            start = time.perf_counter()
+            ResourceRegistry.initialize()
+            ActiveCollectionWatcher.start(QDRANT_CONFIG["POLL_INTERVAL"])
+            IngestionJobQueue.start(INGESTION_CONFIG["JOB_WORKERS"], INGESTION_CONFIG["JOB_COLLECTION"],
+                                    INGESTION_CONFIG["PROGRESS_INTERVAL"], INGESTION_CONFIG["HEARTBEAT_INTERVAL"],
+                                    INGESTION_CONFIG["STALE_AFTER"])
             st.session_state.chat_collection = MONGODB_CONFIG["CHAT_HISTORY"]
             st.session_state.login_collection =  MONGODB_CONFIG["LOGIN_HISTORY"]
             st.session_state.ban_collection = MONGODB_CONFIG["BAN_COLLECTION"]
             st.session_state.mode_chat = MODEL_CONFIG["CHAT"]
             st.session_state.model_embed = MODEL_CONFIG["EMBEDDED"]
             st.session_state.chat_db = MONGODB_CONFIG["CHAT_DB"]
-            st.session_state.mongo_uri = MONGODB_CONFIG["URI"]
             st.session_state.mongo_database = MONGODB_CONFIG["DATABASE"]
-            st.session_state.qdrant_url = QDRANT_CONFIG["URL"]
-            st.session_state.qdrant_api_key = QDRANT_CONFIG["API_KEY"]
             st.session_state.account_collection = MONGODB_CONFIG["ACCOUNT"]
 
-            st.session_state.mongodb = MongoManager.initialize(st.session_state.mongo_uri, st.session_state.mongo_database)
-            st.session_state.qdrant_db = QdrantManager.get_instance(st.session_state.qdrant_url, st.session_state.qdrant_api_key)
+            # Các tài nguyên nặng được dùng chung trong toàn tiến trình, session chỉ giữ tham chiếu
+            st.session_state.mongodb = ResourceRegistry.get("mongodb")
+            st.session_state.qdrant_db = ResourceRegistry.get("qdrant_db")
             if "messages" not in st.session_state:
                 st.session_state.messages = []
-            st.session_state.model = Model(MODEL_CONFIG["API_KEY"], MODEL_CONFIG["HUGGINGFACE"], st.session_state.model_embed)
-            st.session_state.embedding_model = st.session_state.model.get_embedding_model()
-            st.session_state.current_data = st.session_state.mongodb.find_one(st.session_state.chat_db, {"key": "DATABASE_CONFIG"})["selected_db"]
-            st.session_state.store_qdrant = st.session_state.qdrant_db.get_store(st.session_state.current_data, st.session_state.embedding_model)
-            st.session_state.retriever = st.session_state.qdrant_db.get_retriever(st.session_state.store_qdrant)
-            st.session_state.ip = socket.gethostbyname(socket.gethostname())
+            st.session_state.model = ResourceRegistry.get("model")
+            st.session_state.embedding_model = ResourceRegistry.get("embedding_model")
+            st.session_state.ip = ResourceRegistry.get("ip")
+            ResourceRegistry.register_session()
+            st.session_state.session_init_time = time.perf_counter() - start
             st.session_state.initialized = True
 
 
@@ -67,11 +66,11 @@ class Main:
                 Home.show()
             case "Quản lý":
                     st.html("<h2 class='centered-title'>QUẢN LÝ HỆ THỐNG</h2>")
-                    tab1, tab3, tab4, tab5 = st.tabs(["Tổng quan","Tài khoản", "Tin nhắn", "Thông tin"])
+                    tab1, tab2, tab3, tab4, tab5 = st.tabs(["Tổng quan", "Thời gian xử lý", "Tài khoản", "Tin nhắn", "Thông tin"])
                     with tab1:
                         General.show()
-                    # with tab2:
-                    #     TimeProcessVisualize.show()
+                    with tab2:
+                        TimeProcessVisualize.show()
                     with tab3:
                         AccountManager.show()
                     with tab4:
@@ -1,3 +1,9 @@
 from .model import Model
+from .cache import SemanticCache
+from .embeddings import LocalEmbeddings, create_embedding_model
+from .reranker import Reranker, LocalCrossEncoder
+from .tracing import Tracer, Trace
+from .sparse import VietnameseSparseEncoder
+from .context import ContextAssembler
 
-__all__ = ["Model"]
\ No newline at end of file
+__all__ = ["Model", "SemanticCache", "LocalEmbeddings", "create_embedding_model", "Reranker", "LocalCrossEncoder", "Tracer", "Trace", "VietnameseSparseEncoder", "ContextAssembler"]
\ No newline at end of file
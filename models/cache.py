@@ -0,0 +1,133 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+class SemanticCache:
+    _instance = None
+    _lock = threading.Lock()
+    _entries = OrderedDict()
+    _collection = None
+    _threshold = 0.95
+    _ttl = 6 * 60 * 60
+    _max_entries = 1000
+    _enabled = True
+    _stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    @classmethod
+    def initialize(cls, threshold: float = 0.95, ttl: int = 6 * 60 * 60, max_entries: int = 1000,
+                   enabled: bool = True):
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = cls()
+                cls._threshold = float(threshold)
+                cls._ttl = int(ttl)
+                cls._max_entries = int(max_entries)
+                cls._enabled = bool(enabled)
+        return cls._instance
+
+    @classmethod
+    def is_enabled(cls) -> bool:
+        return cls._instance is not None and cls._enabled
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    @classmethod
+    def activate(cls, collection: str):
+        # Câu trả lời chỉ đúng với bộ dữ liệu đã sinh ra nó, đổi collection thì xóa toàn bộ cache
+        with cls._lock:
+            if collection != cls._collection:
+                cls._entries.clear()
+                cls._collection = collection
+
+    @classmethod
+    def _scope(cls, collection: str) -> bool:
+        # Câu hỏi đang xử lý có thể còn giữ phiên bản cũ: chỉ phục vụ/ghi nhận theo collection đang hoạt động,
+        # không để bên gọi tới sau xóa cache của phiên bản hiện tại
+        return collection == cls._collection
+
+    @classmethod
+    def _evict_expired(cls, now: float):
+        expired = [key for key, entry in cls._entries.items() if now - entry["created_at"] > cls._ttl]
+        for key in expired:
+            del cls._entries[key]
+        cls._stats["evictions"] += len(expired)
+
+    @classmethod
+    def lookup(cls, collection: str, embedding) -> Optional[Dict]:
+        if not cls.is_enabled():
+            return None
+
+        query = cls._normalize(embedding)
+        with cls._lock:
+            cls._evict_expired(time.time())
+
+            if cls._entries and cls._scope(collection):
+                keys = list(cls._entries.keys())
+                matrix = np.stack([cls._entries[key]["embedding"] for key in keys])
+                scores = matrix @ query
+                best = int(np.argmax(scores))
+                if scores[best] >= cls._threshold:
+                    key = keys[best]
+                    cls._entries.move_to_end(key)
+                    cls._stats["hits"] += 1
+                    entry = cls._entries[key]
+                    return {
+                        "question": entry["question"],
+                        "answer": entry["answer"],
+                        "docs": entry["docs"],
+                        "similarity": float(scores[best])
+                    }
+
+            cls._stats["misses"] += 1
+            return None
+
+    @classmethod
+    def store(cls, collection: str, question: str, embedding, answer: str, docs: List):
+        if not cls.is_enabled():
+            return
+
+        with cls._lock:
+            if not cls._scope(collection):
+                return
+            key = question.strip().lower()
+            cls._entries[key] = {
+                "question": question,
+                "embedding": cls._normalize(embedding),
+                "answer": answer,
+                "docs": docs,
+                "created_at": time.time()
+            }
+            cls._entries.move_to_end(key)
+            while len(cls._entries) > cls._max_entries:
+                cls._entries.popitem(last=False)
+                cls._stats["evictions"] += 1
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._entries.clear()
+
+    @classmethod
+    def get_stats(cls) -> Dict:
+        with cls._lock:
+            total = cls._stats["hits"] + cls._stats["misses"]
+            return {
+                "enabled": cls.is_enabled(),
+                "collection": cls._collection,
+                "size": len(cls._entries),
+                "max_entries": cls._max_entries,
+                "threshold": cls._threshold,
+                "ttl": cls._ttl,
+                "hits": cls._stats["hits"],
+                "misses": cls._stats["misses"],
+                "evictions": cls._stats["evictions"],
+                "hit_rate": cls._stats["hits"] / total if total else 0.0
+            }
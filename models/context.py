@@ -0,0 +1,152 @@
+from typing import Dict, List, Optional
+
+from langchain_core.documents import Document
+
+from .text import tokenize
+
+
+class ContextAssembler:
+    _max_tokens = 3000
+    _chars_per_token = 3.0
+    _dedup_threshold = 0.85
+    _min_overlap = 20
+    _max_overlap = 400
+
+    @classmethod
+    def configure(cls, max_tokens: int = 3000, chars_per_token: float = 3.0, dedup_threshold: float = 0.85):
+        cls._max_tokens = int(max_tokens)
+        cls._chars_per_token = float(chars_per_token)
+        cls._dedup_threshold = float(dedup_threshold)
+
+    @classmethod
+    def estimate_tokens(cls, text: str) -> int:
+        return int(len(text) / cls._chars_per_token) + 1
+
+    @staticmethod
+    def _source_key(doc: Document):
+        return doc.metadata.get("source"), doc.metadata.get("page")
+
+    @classmethod
+    def _text_overlap(cls, left: str, right: str) -> int:
+        # Độ dài đoạn cuối của left trùng với đoạn đầu của right (do chunk_overlap khi tách văn bản)
+        for size in range(min(len(left), len(right), cls._max_overlap), cls._min_overlap - 1, -1):
+            if left.endswith(right[:size]):
+                return size
+        return 0
+
+    @classmethod
+    def _merge(cls, segment: Dict, text: str, start: Optional[int], score: float, chunks: int = 1) -> bool:
+        if text in segment["text"]:
+            merged = segment["text"]
+        elif segment["text"] in text:
+            merged = text
+        elif start is not None and segment["start"] is not None and segment["start"] <= start <= segment["end"]:
+            merged = segment["text"] + text[segment["end"] - start:]
+        elif start is not None and segment["start"] is not None and start <= segment["start"] <= start + len(text):
+            merged = text + segment["text"][start + len(text) - segment["start"]:]
+            segment["start"] = start
+        elif overlap := cls._text_overlap(segment["text"], text):
+            merged = segment["text"] + text[overlap:]
+        elif overlap := cls._text_overlap(text, segment["text"]):
+            merged = text + segment["text"][overlap:]
+        else:
+            return False
+
+        segment["text"] = merged
+        if segment["start"] is not None:
+            segment["end"] = segment["start"] + len(merged)
+        segment["score"] = max(segment["score"], score)
+        segment["chunks"] += chunks
+        return True
+
+    @classmethod
+    def _coalesce(cls, segments: List[Dict]) -> List[Dict]:
+        # Chunk không có start_index chỉ gộp được theo nội dung và có thể nối hai đoạn đã tách,
+        # nên lặp đến khi không còn cặp nào gộp được
+        changed = True
+        while changed:
+            changed = False
+            for i, segment in enumerate(segments):
+                for other in segments[i + 1:]:
+                    if other["key"] == segment["key"] and cls._merge(segment, other["text"], other["start"],
+                                                                     other["score"], other["chunks"]):
+                        segments.remove(other)
+                        changed = True
+                        break
+                if changed:
+                    break
+        return segments
+
+    @staticmethod
+    def _shingles(text: str, size: int = 3) -> set:
+        words = tokenize(text)
+        if len(words) < size:
+            return {" ".join(words)}
+        return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+    @classmethod
+    def _is_duplicate(cls, shingles: set, kept: List[set]) -> bool:
+        for other in kept:
+            union = len(shingles | other)
+            if union and len(shingles & other) / union >= cls._dedup_threshold:
+                return True
+        return False
+
+    @classmethod
+    def assemble(cls, docs: List[Document], max_tokens: Optional[int] = None) -> List[Document]:
+        max_tokens = max_tokens or cls._max_tokens
+
+        # 1. Gộp các chunk chồng lấn hoặc liền kề của cùng một nguồn, duyệt theo vị trí trong nguồn
+        #    để chunk nằm giữa hai chunk khác được gộp nối tiếp thay vì tạo đoạn trùng lặp
+        scored = []
+        for rank, doc in enumerate(docs):
+            score = doc.metadata.get("relevance_score")
+            scored.append((doc, float(score) if score is not None else 1.0 / (rank + 1), rank))
+        scored.sort(key=lambda item: (str(cls._source_key(item[0])), item[0].metadata.get("start_index") is None,
+                                      item[0].metadata.get("start_index") or 0, item[2]))
+        segments: List[Dict] = []
+        for doc, score, _ in scored:
+            start = doc.metadata.get("start_index")
+            same_source = [segment for segment in segments if segment["key"] == cls._source_key(doc)]
+            if any(cls._merge(segment, doc.page_content, start, score) for segment in same_source):
+                continue
+            segments.append({
+                "key": cls._source_key(doc),
+                "text": doc.page_content,
+                "start": start,
+                "end": start + len(doc.page_content) if start is not None else None,
+                "score": score,
+                "chunks": 1,
+                "metadata": doc.metadata
+            })
+        segments = cls._coalesce(segments)
+
+        # 2. Bỏ các đoạn gần trùng nhau, giữ đoạn có điểm rerank cao hơn
+        segments.sort(key=lambda segment: segment["score"], reverse=True)
+        kept_shingles: List[set] = []
+        unique_segments = []
+        for segment in segments:
+            shingles = cls._shingles(segment["text"])
+            if cls._is_duplicate(shingles, kept_shingles):
+                continue
+            kept_shingles.append(shingles)
+            unique_segments.append(segment)
+
+        # 3. Xếp theo điểm và đóng gói vào ngân sách token
+        context = []
+        used_tokens = 0
+        for segment in unique_segments:
+            tokens = cls.estimate_tokens(segment["text"])
+            text = segment["text"]
+            if used_tokens + tokens > max_tokens:
+                if context:
+                    continue
+                text = text[:int(max_tokens * cls._chars_per_token)]
+                tokens = cls.estimate_tokens(text)
+            metadata = dict(segment["metadata"])
+            metadata["relevance_score"] = segment["score"]
+            metadata["merged_chunks"] = segment["chunks"]
+            context.append(Document(page_content=text, metadata=metadata))
+            used_tokens += tokens
+
+        return context
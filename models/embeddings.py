@@ -0,0 +1,48 @@
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+from langchain_community.embeddings import HuggingFaceInferenceAPIEmbeddings
+
+
+class LocalEmbeddings(Embeddings):
+    """Embedding chạy cục bộ trên CPU bằng ONNX (fastembed), không cần gọi HTTP."""
+
+    # Mỗi tiến trình chỉ nạp một lần cho mỗi cặp (model, threads), dùng chung giữa các session
+    _engines: Dict[Tuple[str, Optional[int]], object] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, model_name: str, threads: Optional[int] = None, batch_size: int = 64,
+                 cache_dir: Optional[str] = None):
+        self.model_name = model_name
+        self.threads = threads
+        self.batch_size = batch_size
+        self.cache_dir = cache_dir
+        self._engine = self._load_engine(model_name, threads, cache_dir)
+
+    @classmethod
+    def _load_engine(cls, model_name, threads, cache_dir):
+        key = (model_name, threads)
+        with cls._lock:
+            if key not in cls._engines:
+                from fastembed import TextEmbedding
+                cls._engines[key] = TextEmbedding(model_name=model_name, threads=threads, cache_dir=cache_dir)
+            return cls._engines[key]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        embeddings = self._engine.passage_embed(list(texts), batch_size=self.batch_size)
+        return [embedding.tolist() for embedding in embeddings]
+
+    def embed_query(self, text: str) -> List[float]:
+        return next(iter(self._engine.query_embed(text))).tolist()
+
+
+def create_embedding_model(backend: str, model_name: str, huggingface_api_key: Optional[str] = None,
+                           threads: Optional[int] = None, batch_size: int = 64,
+                           cache_dir: Optional[str] = None) -> Embeddings:
+    backend = (backend or "huggingface").lower()
+    if backend in ("fastembed", "onnx", "local"):
+        return LocalEmbeddings(model_name, threads=threads, batch_size=batch_size, cache_dir=cache_dir)
+    if backend == "huggingface":
+        return HuggingFaceInferenceAPIEmbeddings(api_key=huggingface_api_key, model_name=model_name)
+    raise ValueError(f"Unsupported embedding backend: {backend}")
@@ -1,11 +1,12 @@
 import datetime
-from typing import List, Union
+from typing import Iterator, List, Union
 from langchain_core.documents import Document
-from langchain_community.embeddings import HuggingFaceInferenceAPIEmbeddings
 from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain_core.prompts import ChatPromptTemplate, HumanMessagePromptTemplate, SystemMessagePromptTemplate
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.text_splitter import RecursiveCharacterTextSplitter
+from .embeddings import create_embedding_model
+from .tracing import Tracer
 
 
 class Model:
@@ -15,6 +16,10 @@ class Model:
     _google_api_key = None
     _huggingface_api_key = None
     _embeded_model_name = None
+    _embedding_backend = "huggingface"
+    _embedding_threads = None
+    _embedding_batch_size = 64
+    _embedding_cache_dir = None
 
     @classmethod
     def get_current_year(cls):
@@ -43,36 +48,77 @@ class Model:
 
     prompt = ChatPromptTemplate.from_messages([system_prompt, human_prompt])
 
-    def __new__(cls, google_api_key, huggingface_api_key, embed_model_name):
+    def __new__(cls, google_api_key, huggingface_api_key, embed_model_name, embedding_backend="huggingface",
+                embedding_threads=None, embedding_batch_size=64, embedding_cache_dir=None):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
             cls._google_api_key = google_api_key
             cls._huggingface_api_key = huggingface_api_key
             cls._embeded_model_name = embed_model_name
+            cls._embedding_backend = embedding_backend
+            cls._embedding_threads = embedding_threads
+            cls._embedding_batch_size = embedding_batch_size
+            cls._embedding_cache_dir = embedding_cache_dir
             cls._init_models()
         return cls._instance
 
     @classmethod
     def _init_models(cls):
-        cls._embedding_model = HuggingFaceInferenceAPIEmbeddings(
-            api_key=cls._huggingface_api_key, model_name=cls._embeded_model_name
-        )
+        cls._embedding_model = cls._init_embedding_model()
         cls._google_chain = cls._init_google_chain()
 
+    @classmethod
+    def _init_embedding_model(cls):
+        return create_embedding_model(
+            cls._embedding_backend,
+            cls._embeded_model_name,
+            huggingface_api_key=cls._huggingface_api_key,
+            threads=cls._embedding_threads,
+            batch_size=cls._embedding_batch_size,
+            cache_dir=cls._embedding_cache_dir
+        )
+
 
     @classmethod
     def chat(cls, docs: Union[str, List[Document]], question: str) -> str:
         if cls._instance is None:
             raise Exception("Model hasn't been initialized")
 
-        response = cls._google_chain.invoke({
-            "context": docs,
-            "question": question,
-            "current_year": cls.get_current_year()
-        })
+        Tracer.record("prompt_chars", cls.get_prompt_size(docs, question))
+        with Tracer.stage("llm"):
+            response = cls._google_chain.invoke({
+                "context": docs,
+                "question": question,
+                "current_year": cls.get_current_year()
+            })
+        Tracer.record("response_chars", len(response))
 
         return cls.postprocess_response(response)
 
+    @classmethod
+    def chat_stream(cls, docs: Union[str, List[Document]], question: str) -> Iterator[str]:
+        if cls._instance is None:
+            raise Exception("Model hasn't been initialized")
+
+        Tracer.record("prompt_chars", cls.get_prompt_size(docs, question))
+        response_chars = 0
+        with Tracer.stage("llm"):
+            for chunk in cls._google_chain.stream({
+                "context": docs,
+                "question": question,
+                "current_year": cls.get_current_year()
+            }):
+                if chunk:
+                    response_chars += len(chunk)
+                    yield chunk
+        Tracer.record("response_chars", response_chars)
+
+    @staticmethod
+    def get_prompt_size(docs: Union[str, List[Document]], question: str) -> int:
+        if isinstance(docs, str):
+            return len(docs) + len(question)
+        return sum(len(doc.page_content) for doc in docs) + len(question)
+
     @classmethod
     def postprocess_response(cls, response: str) -> str:
         # Loại bỏ các câu không cần thiết hoặc lặp lại
@@ -107,11 +153,13 @@ class Model:
         if cls._instance is None:
             raise Exception("Model hasn't been initialized")
         if cls._embedding_model is None:
-            cls._embedding_model = HuggingFaceInferenceAPIEmbeddings(
-                api_key=cls._huggingface_api_key, model_name=cls._embeded_model_name
-            )
+            cls._embedding_model = cls._init_embedding_model()
         return cls._embedding_model
 
+    @classmethod
+    def get_embedding_batch_size(cls):
+        return cls._embedding_batch_size
+
     @classmethod
     def get_chain(cls):
         if cls._instance is None:
@@ -121,7 +169,8 @@ class Model:
         return cls._google_chain
     @classmethod
     def embedding_query(cls, question):
-        return cls.get_embedding_model().embed_query(question)
+        with Tracer.stage("embedding"):
+            return cls.get_embedding_model().embed_query(question)
 
     @classmethod
     def embedding_document(cls, document):
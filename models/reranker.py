@@ -0,0 +1,158 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+
+
+class LocalCrossEncoder:
+    # Mỗi tiến trình chỉ nạp một lần cho mỗi model, dùng chung giữa các session
+    _models: Dict[str, tuple] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, model_name: str, model_file: str = "onnx/model.onnx", threads: Optional[int] = None,
+                 max_length: int = 512):
+        self.model_name = model_name
+        self.session, self.tokenizer = self._load(model_name, model_file, threads, max_length)
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+    @classmethod
+    def _load(cls, model_name, model_file, threads, max_length):
+        with cls._lock:
+            if model_name not in cls._models:
+                import onnxruntime as ort
+                from huggingface_hub import hf_hub_download
+                from tokenizers import Tokenizer
+
+                options = ort.SessionOptions()
+                if threads:
+                    options.intra_op_num_threads = int(threads)
+                session = ort.InferenceSession(hf_hub_download(model_name, model_file), options,
+                                               providers=["CPUExecutionProvider"])
+                tokenizer = Tokenizer.from_file(hf_hub_download(model_name, "tokenizer.json"))
+                tokenizer.enable_truncation(max_length=max_length)
+                tokenizer.enable_padding()
+                cls._models[model_name] = (session, tokenizer)
+            return cls._models[model_name]
+
+    def score(self, query: str, texts: List[str], batch_size: int = 16) -> List[float]:
+        scores = []
+        for i in range(0, len(texts), batch_size):
+            encodings = self.tokenizer.encode_batch([(query, text) for text in texts[i:i + batch_size]])
+            inputs = {
+                "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+                "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+                "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+            }
+            logits = self.session.run(None, {k: v for k, v in inputs.items() if k in self.input_names})[0]
+            scores.extend(np.asarray(logits).reshape(len(encodings), -1)[:, 0].tolist())
+        return scores
+
+
+class Reranker:
+    _instance = None
+    _backend = "cohere"
+    _fallback = "local"
+    _top_n = 7
+    _timeout = 3.0
+    _batch_size = 16
+    _cache_size = 5000
+    _cohere = None
+    _local = None
+    _executor = None
+    _scores = OrderedDict()
+    _lock = threading.Lock()
+
+    @classmethod
+    def initialize(cls, backend: str = "cohere", top_n: int = 7, timeout: float = 3.0, fallback: str = "local",
+                   local_model: Optional[str] = None, local_model_file: str = "onnx/model.onnx",
+                   batch_size: int = 16, cache_size: int = 5000, threads: Optional[int] = None):
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = cls()
+                cls._backend = (backend or "none").lower()
+                cls._fallback = (fallback or "none").lower()
+                cls._top_n = int(top_n)
+                cls._timeout = float(timeout)
+                cls._batch_size = int(batch_size)
+                cls._cache_size = int(cache_size)
+                if cls._backend == "cohere":
+                    from langchain_cohere import CohereRerank
+                    cls._cohere = CohereRerank(top_n=cls._top_n)
+                    cls._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="rerank")
+                if local_model and "local" in (cls._backend, cls._fallback):
+                    try:
+                        cls._local = LocalCrossEncoder(local_model, local_model_file, threads)
+                    except Exception as e:
+                        print(f"Error loading local reranker: {str(e)}")
+        return cls._instance
+
+    @staticmethod
+    def _chunk_id(doc: Document) -> str:
+        chunk_id = doc.metadata.get("_id")
+        if chunk_id is not None:
+            return str(chunk_id)
+        return hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def _score_cohere(cls, query: str, texts: List[str]) -> List[float]:
+        future = cls._executor.submit(cls._cohere.rerank, texts, query, top_n=len(texts))
+        results = future.result(timeout=cls._timeout)
+        scores = [0.0] * len(texts)
+        for result in results:
+            scores[result["index"]] = result["relevance_score"]
+        return scores
+
+    @classmethod
+    def _score(cls, backend: str, query: str, texts: List[str]) -> Optional[List[float]]:
+        try:
+            if backend == "cohere" and cls._cohere is not None:
+                return cls._score_cohere(query, texts)
+            if backend == "local" and cls._local is not None:
+                return cls._local.score(query, texts, cls._batch_size)
+        except FutureTimeoutError:
+            print(f"Reranker '{backend}' timed out after {cls._timeout}s")
+        except Exception as e:
+            print(f"Reranker '{backend}' failed: {str(e)}")
+        return None
+
+    @classmethod
+    def rerank(cls, query: str, docs: List[Document], top_n: Optional[int] = None) -> List[Document]:
+        if cls._instance is None:
+            raise Exception("Reranker hasn't been initialized")
+
+        top_n = top_n or cls._top_n
+        if not docs:
+            return []
+
+        for backend in (cls._backend, cls._fallback):
+            if backend == "none":
+                continue
+            keys = [(backend, query, cls._chunk_id(doc)) for doc in docs]
+            with cls._lock:
+                scores = [cls._scores.get(key) for key in keys]
+            missing = [i for i, score in enumerate(scores) if score is None]
+            if missing:
+                new_scores = cls._score(backend, query, [docs[i].page_content for i in missing])
+                if new_scores is None:
+                    continue
+                with cls._lock:
+                    for i, score in zip(missing, new_scores):
+                        scores[i] = score
+                        cls._scores[keys[i]] = score
+                    while len(cls._scores) > cls._cache_size:
+                        cls._scores.popitem(last=False)
+
+            ranked = sorted(zip(docs, scores), key=lambda pair: pair[1], reverse=True)[:top_n]
+            result = []
+            for doc, score in ranked:
+                metadata = dict(doc.metadata)
+                metadata["relevance_score"] = score
+                result.append(Document(page_content=doc.page_content, metadata=metadata))
+            return result
+
+        # Không reranker nào dùng được: giữ nguyên thứ tự của truy vấn vector
+        return docs[:top_n]
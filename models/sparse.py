@@ -0,0 +1,48 @@
+from collections import Counter
+from typing import Dict, List, Tuple
+
+import mmh3
+
+from .text import fold_diacritics, tokenize
+
+
+class VietnameseSparseEncoder:
+    """Vector thưa kiểu BM25 cho tiếng Việt; IDF do Qdrant tính qua modifier của collection."""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, avg_doc_length: float = 200.0):
+        self.k1 = k1
+        self.b = b
+        self.avg_doc_length = avg_doc_length
+
+    @staticmethod
+    def _terms(text: str) -> List[str]:
+        # Tiếng Việt tách theo âm tiết, nên thêm cặp âm tiết liền nhau để giữ từ ghép ("công nghệ"),
+        # và bản không dấu để khớp cả câu hỏi gõ không dấu. Mã ngành như "7480201" được giữ nguyên.
+        syllables = tokenize(text)
+        terms = list(syllables)
+        terms.extend(f"{a}_{b}" for a, b in zip(syllables, syllables[1:]))
+        terms.extend(fold_diacritics(syllable) for syllable in syllables if fold_diacritics(syllable) != syllable)
+        return terms
+
+    @staticmethod
+    def _index(term: str) -> int:
+        return mmh3.hash(term, signed=False)
+
+    def _to_sparse(self, weights: Dict[int, float]) -> Tuple[List[int], List[float]]:
+        indices = sorted(weights)
+        return indices, [weights[i] for i in indices]
+
+    def encode_document(self, text: str) -> Tuple[List[int], List[float]]:
+        terms = self._terms(text)
+        length_norm = self.k1 * (1 - self.b + self.b * len(terms) / self.avg_doc_length)
+        weights: Dict[int, float] = {}
+        for term, tf in Counter(terms).items():
+            index = self._index(term)
+            weights[index] = weights.get(index, 0.0) + tf * (self.k1 + 1) / (tf + length_norm)
+        return self._to_sparse(weights)
+
+    def encode_query(self, text: str) -> Tuple[List[int], List[float]]:
+        return self._to_sparse({self._index(term): 1.0 for term in set(self._terms(text))})
+
+    def encode_documents(self, texts: List[str]) -> List[Tuple[List[int], List[float]]]:
+        return [self.encode_document(text) for text in texts]
@@ -0,0 +1,21 @@
+import re
+import unicodedata
+from typing import List
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def normalize_text(text: str) -> str:
+    return unicodedata.normalize("NFC", text or "").lower()
+
+
+def fold_diacritics(text: str) -> str:
+    # Bỏ dấu tiếng Việt: "Công nghệ" -> "cong nghe", riêng "đ" không tách dấu được nên thay tay
+    decomposed = unicodedata.normalize("NFD", normalize_text(text))
+    stripped = "".join(ch for ch in decomposed if unicodedata.category(ch) != "Mn")
+    return unicodedata.normalize("NFC", stripped).replace("đ", "d")
+
+
+def tokenize(text: str, fold: bool = False) -> List[str]:
+    text = fold_diacritics(text) if fold else normalize_text(text)
+    return _TOKEN_PATTERN.findall(text)
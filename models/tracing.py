@@ -0,0 +1,60 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+
+class Trace:
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.metrics: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def record(self, key: str, value):
+        self.metrics[key] = value
+
+    def to_dict(self) -> Dict:
+        return {"stages": dict(self.stages), **self.metrics}
+
+
+class Tracer:
+    STAGES = ["embedding", "cache_lookup", "retrieval", "rerank", "context", "llm"]
+    _current: ContextVar[Optional[Trace]] = ContextVar("rag_trace", default=None)
+
+    @classmethod
+    @contextmanager
+    def start(cls):
+        trace = Trace()
+        token = cls._current.set(trace)
+        try:
+            yield trace
+        finally:
+            cls._current.reset(token)
+
+    @classmethod
+    def current(cls) -> Optional[Trace]:
+        return cls._current.get()
+
+    @classmethod
+    @contextmanager
+    def stage(cls, name: str):
+        # Ngoài một lượt hỏi đáp (ví dụ khi upload dữ liệu) thì không ghi nhận gì
+        trace = cls.current()
+        if trace is None:
+            yield None
+        else:
+            with trace.stage(name):
+                yield trace
+
+    @classmethod
+    def record(cls, key: str, value):
+        trace = cls.current()
+        if trace is not None:
+            trace.record(key, value)
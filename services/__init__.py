@@ -0,0 +1,18 @@
+from .registry import ResourceRegistry, ActiveCollection
+from .watcher import ActiveCollectionWatcher
+from .loaders import DocumentLoader
+from .crawler import WebCrawler
+from .ingestion import IngestionPipeline, IngestionCancelled
+from .releases import CollectionReleaseManager, ReleaseCheckFailed
+from .jobs import IngestionJobQueue
+from .rollups import RollupManager
+from .migrations import MongoMigrations, to_utc, utc_now
+from .search import ChatSearchIndex
+from .dashboard import DashboardDataCache
+from .bans import BanList
+
+__all__ = ["ResourceRegistry", "ActiveCollection", "ActiveCollectionWatcher", "DocumentLoader", "WebCrawler",
+           "IngestionPipeline", "IngestionCancelled", "IngestionJobQueue",
+           "CollectionReleaseManager", "ReleaseCheckFailed", "RollupManager",
+           "MongoMigrations", "to_utc", "utc_now", "ChatSearchIndex",
+           "DashboardDataCache", "BanList"]
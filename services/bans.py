@@ -0,0 +1,68 @@
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+from config import MONGODB_CONFIG
+from database import MongoManager
+from .migrations import utc_now
+
+
+class BanList:
+    _lock = threading.Lock()
+    _entries: Optional[Dict[str, datetime]] = None
+    _version = None
+    _checked_at = 0.0
+    ttl = 5.0
+
+    @classmethod
+    def configure(cls, ttl: float = 5.0):
+        cls.ttl = float(ttl)
+
+    @staticmethod
+    def _remote_version() -> int:
+        config = MongoManager.find_one(MONGODB_CONFIG["CHAT_DB"], {"key": "BAN_LIST"}) or {}
+        return config.get("version", 0)
+
+    @classmethod
+    def _bump(cls):
+        # Tăng phiên bản để các tiến trình khác tải lại danh sách ở lần kiểm tra kế tiếp
+        MongoManager.get_collection(MONGODB_CONFIG["CHAT_DB"]).update_one({"key": "BAN_LIST"},
+                                                                         {"$inc": {"version": 1}}, upsert=True)
+        cls.invalidate()
+
+    @classmethod
+    def invalidate(cls):
+        with cls._lock:
+            cls._entries = None
+
+    @classmethod
+    def snapshot(cls, force: bool = False) -> Dict[str, datetime]:
+        with cls._lock:
+            if not force and cls._entries is not None and time.monotonic() - cls._checked_at < cls.ttl:
+                return cls._entries
+            # Chỉ đọc một bản ghi phiên bản; danh sách chỉ tải lại khi phiên bản đổi
+            version = cls._remote_version()
+            if force or cls._entries is None or version != cls._version:
+                cursor = MongoManager.get_collection(MONGODB_CONFIG["BAN_COLLECTION"]).find({}, {"username": 1,
+                                                                                                 "banned_at": 1})
+                cls._entries = {doc["username"]: doc.get("banned_at") for doc in cursor}
+                cls._version = version
+            cls._checked_at = time.monotonic()
+            return cls._entries
+
+    @classmethod
+    def is_banned(cls, username: str) -> bool:
+        return username in cls.snapshot()
+
+    @classmethod
+    def ban(cls, username: str):
+        # Upsert theo username: unique index không cho chặn trùng khi hai admin bấm cùng lúc
+        MongoManager.get_collection(MONGODB_CONFIG["BAN_COLLECTION"]).update_one(
+            {"username": username}, {"$setOnInsert": {"banned_at": utc_now()}}, upsert=True)
+        cls._bump()
+
+    @classmethod
+    def unban(cls, username: str):
+        MongoManager.delete_one(MONGODB_CONFIG["BAN_COLLECTION"], {"username": username})
+        cls._bump()
@@ -0,0 +1,257 @@
+import asyncio
+import queue
+import re
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from urllib.parse import urldefrag, urljoin, urlparse
+
+import aiohttp
+from bs4 import BeautifulSoup
+from langchain_core.documents import Document
+
+from config import CRAWLER_CONFIG
+from database import MongoManager
+from .loaders import DocumentLoader
+
+SKIP_EXTENSIONS = (".pdf", ".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp", ".ico", ".css", ".js", ".zip", ".rar",
+                   ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".mp3", ".mp4", ".avi")
+_DONE = object()
+
+
+class WebCrawler:
+    def __init__(self, concurrency: int = 8, per_host: int = 2, delay: float = 0.5, max_depth: int = 2,
+                 max_pages: int = 200, timeout: float = 15, verify_ssl: bool = True,
+                 user_agent: str = "IUH-CHAT-Crawler/1.0", state_collection: Optional[str] = None,
+                 state_key: str = ""):
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.delay = delay
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.timeout = timeout
+        self.verify_ssl = verify_ssl
+        self.user_agent = user_agent
+        self.state_collection = state_collection
+        self.state_key = state_key
+        self.stats = {"fetched": 0, "unchanged": 0, "failed": 0, "skipped": 0}
+        self._pending_state: Dict[str, Dict] = {}
+        self._host_locks: Dict[str, asyncio.Semaphore] = {}
+        self._host_last: Dict[str, float] = {}
+        self._stop = threading.Event()
+
+    @classmethod
+    def from_config(cls, state_key: str = "", **overrides) -> "WebCrawler":
+        options = {
+            "concurrency": CRAWLER_CONFIG["CONCURRENCY"],
+            "per_host": CRAWLER_CONFIG["PER_HOST"],
+            "delay": CRAWLER_CONFIG["DELAY"],
+            "max_depth": CRAWLER_CONFIG["MAX_DEPTH"],
+            "max_pages": CRAWLER_CONFIG["MAX_PAGES"],
+            "timeout": CRAWLER_CONFIG["TIMEOUT"],
+            "verify_ssl": CRAWLER_CONFIG["VERIFY_SSL"],
+            "user_agent": CRAWLER_CONFIG["USER_AGENT"],
+            "state_collection": CRAWLER_CONFIG["STATE_COLLECTION"],
+        }
+        options.update(overrides)
+        return cls(state_key=state_key, **options)
+
+    @staticmethod
+    def normalize_url(url: str) -> str:
+        url = urldefrag(url.strip())[0]
+        parsed = urlparse(url)
+        return parsed._replace(netloc=parsed.netloc.lower(), path=parsed.path or "/").geturl()
+
+    @staticmethod
+    def is_sitemap(url: str) -> bool:
+        return urlparse(url).path.lower().endswith(".xml")
+
+    def _allowed(self, url: str, domain: str) -> bool:
+        parsed = urlparse(url)
+        return (parsed.scheme in ("http", "https") and parsed.netloc == domain
+                and not parsed.path.lower().endswith(SKIP_EXTENSIONS))
+
+    def _load_state(self) -> Dict[str, Dict]:
+        if not self.state_collection:
+            return {}
+        # Trạng thái cũ chưa lưu link đi ra thì tải lại đầy đủ một lần, để 304 không chặn việc duyệt trang con
+        return {doc["url"]: doc for doc in MongoManager.find_many(self.state_collection,
+                                                                  {"collection": self.state_key,
+                                                                   "links": {"$exists": True}})}
+
+    def commit_state(self):
+        # Chỉ lưu ETag/Last-Modified sau khi nội dung đã được nạp, tránh bỏ qua trang ở lần crawl sau nếu lần này lỗi
+        if not self.state_collection:
+            return
+        collection = MongoManager.get_collection(self.state_collection)
+        for url, state in self._pending_state.items():
+            collection.update_one({"collection": self.state_key, "url": url},
+                                  {"$set": {**state, "collection": self.state_key, "url": url}}, upsert=True)
+        self._pending_state = {}
+
+    async def _polite(self, host: str):
+        # Mỗi host tối đa per_host request đồng thời và cách nhau ít nhất delay giây
+        semaphore = self._host_locks.setdefault(host, asyncio.Semaphore(self.per_host))
+        await semaphore.acquire()
+        wait = self._host_last.get(host, 0.0) + self.delay - time.monotonic()
+        self._host_last[host] = time.monotonic() + max(wait, 0.0)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return semaphore
+
+    async def _fetch(self, session: aiohttp.ClientSession, url: str,
+                     state: Optional[Dict]) -> Tuple[int, Optional[str], Dict]:
+        headers = {}
+        if state:
+            if state.get("etag"):
+                headers["If-None-Match"] = state["etag"]
+            if state.get("last_modified"):
+                headers["If-Modified-Since"] = state["last_modified"]
+        semaphore = await self._polite(urlparse(url).netloc)
+        try:
+            async with session.get(url, headers=headers, allow_redirects=True) as response:
+                if response.status == 304:
+                    return 304, None, {}
+                content_type = response.headers.get("Content-Type", "text/html")
+                if response.status != 200 or ("html" not in content_type and "xml" not in content_type):
+                    return response.status, None, {}
+                body = await response.text(errors="replace")
+                validators = {"etag": response.headers.get("ETag"),
+                              "last_modified": response.headers.get("Last-Modified")}
+                return response.status, body, validators
+        finally:
+            semaphore.release()
+
+    @staticmethod
+    def _parse_page(url: str, body: str) -> Tuple[str, List[str]]:
+        soup = BeautifulSoup(body, "html.parser")
+        links = [urljoin(url, a["href"]) for a in soup.find_all("a", href=True)]
+        return DocumentLoader.html_to_text(soup), links
+
+    @staticmethod
+    def _parse_sitemap(body: str) -> List[str]:
+        return [loc.strip() for loc in re.findall(r"<loc>\s*(.*?)\s*</loc>", body, re.S)]
+
+    async def _expand_sitemap(self, session: aiohttp.ClientSession, url: str, depth: int = 0) -> List[str]:
+        status, body, _ = await self._fetch(session, url, None)
+        if body is None:
+            raise ValueError(f"Unable to read sitemap {url} (HTTP {status})")
+        urls = []
+        for loc in self._parse_sitemap(body):
+            if self.is_sitemap(loc) and depth < 3:
+                urls.extend(await self._expand_sitemap(session, loc, depth + 1))
+            else:
+                urls.append(loc)
+        return urls
+
+    async def _crawl(self, seed: str, emit):
+        seed = self.normalize_url(seed)
+        domain = urlparse(seed).netloc
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        connector = aiohttp.TCPConnector(limit=self.concurrency, ssl=self.verify_ssl)
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector,
+                                         headers={"User-Agent": self.user_agent}) as session:
+            if self.is_sitemap(seed):
+                start_urls = [self.normalize_url(u) for u in await self._expand_sitemap(session, seed)]
+                start_urls = [u for u in start_urls if self._allowed(u, domain)]
+            else:
+                start_urls = [seed]
+
+            states = self._load_state()
+            seen: Set[str] = set(start_urls)
+            frontier: asyncio.Queue = asyncio.Queue()
+            for url in start_urls[:self.max_pages]:
+                frontier.put_nowait((url, 0))
+            budget = [self.max_pages - frontier.qsize()]
+            loop = asyncio.get_running_loop()
+
+            def follow(links: List[str], depth: int):
+                if depth >= self.max_depth:
+                    return
+                for link in links:
+                    link = self.normalize_url(link)
+                    if budget[0] > 0 and link not in seen and self._allowed(link, domain):
+                        seen.add(link)
+                        budget[0] -= 1
+                        frontier.put_nowait((link, depth + 1))
+
+            async def worker():
+                while True:
+                    url, depth = await frontier.get()
+                    if self._stop.is_set():
+                        frontier.task_done()
+                        continue
+                    try:
+                        status, body, validators = await self._fetch(session, url, states.get(url))
+                        if status == 304:
+                            # Trang không đổi vẫn phải đi tiếp theo các link đã lưu, nếu không trang con đổi sẽ bị bỏ sót
+                            self.stats["unchanged"] += 1
+                            follow(states[url].get("links") or [], depth)
+                        elif body is None:
+                            self.stats["skipped"] += 1
+                        else:
+                            # Phân tích HTML tốn CPU nên đẩy sang thread để không chặn các request khác
+                            text, links = await loop.run_in_executor(None, self._parse_page, url, body)
+                            self.stats["fetched"] += 1
+                            if text:
+                                await loop.run_in_executor(None, emit, Document(page_content=text,
+                                                                                metadata={"source": url}))
+                            if any(validators.values()):
+                                # Lưu cả link đi ra để lần crawl sau nhận 304 vẫn duyệt được các trang con
+                                same_domain = sorted({self.normalize_url(link) for link in links
+                                                      if self._allowed(self.normalize_url(link), domain)})
+                                self._pending_state[url] = {**validators, "links": same_domain,
+                                                            "crawled_at": time.time()}
+                            follow(links, depth)
+                    except Exception as e:
+                        # Lỗi của một trang (mạng, parse, emit) không được làm chết worker: worker chết thì
+                        # frontier.join() chờ mãi các URL còn lại trong hàng đợi
+                        self.stats["failed"] += 1
+                        print(f"Crawl failed for {url}: {type(e).__name__}: {str(e)}")
+                    finally:
+                        frontier.task_done()
+
+            workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+            try:
+                await frontier.join()
+            finally:
+                for task in workers:
+                    task.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+
+    def crawl(self, seed: str, buffer: int = 32) -> Iterator[Document]:
+        # Vòng lặp asyncio chạy trên thread riêng, trang tải xong được đưa ngay sang pipeline đồng bộ qua hàng đợi
+        pages: queue.Queue = queue.Queue(maxsize=buffer)
+        error: List[BaseException] = []
+        self._stop.clear()
+
+        def emit(item):
+            while not self._stop.is_set():
+                try:
+                    pages.put(item, timeout=0.5)
+                    return
+                except queue.Full:
+                    continue
+
+        def run():
+            try:
+                asyncio.run(self._crawl(seed, emit))
+            except BaseException as e:
+                error.append(e)
+            finally:
+                emit(_DONE)
+
+        thread = threading.Thread(target=run, name="web-crawler", daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = pages.get()
+                if item is _DONE:
+                    break
+                yield item
+        finally:
+            # Bên nhận dừng sớm (lỗi hoặc hủy) thì báo crawler dừng để thread không treo ở hàng đợi đầy
+            self._stop.set()
+            thread.join()
+        if error:
+            raise error[0]
@@ -0,0 +1,91 @@
+import threading
+import time
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+import pandas as pd
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+
+from config import MONGODB_CONFIG
+from database import MongoManager
+
+
+class DashboardDataCache:
+    # Bản ghi chèn gần như cùng lúc từ nhiều tiến trình có thể có _id lệch thứ tự, nên đọc lùi lại một khoảng
+    OVERLAP_SECONDS = 5
+
+    _lock = threading.Lock()
+    _states: Dict[str, Dict] = {}
+    ttl = 30.0
+    max_rows = 200000
+
+    @classmethod
+    def configure(cls, ttl: float = 30.0, max_rows: int = 200000):
+        cls.ttl = float(ttl)
+        cls.max_rows = int(max_rows)
+
+    @staticmethod
+    def sources() -> Dict[str, Dict]:
+        # Chỉ lấy các cột dashboard cần, không kéo theo nội dung câu trả lời
+        return {
+            "chat": {"collection": MONGODB_CONFIG["CHAT_HISTORY"], "fields": ["timestamp", "processing_time"]},
+        }
+
+    @classmethod
+    def invalidate(cls, name: Optional[str] = None):
+        with cls._lock:
+            if name is None:
+                cls._states.clear()
+            else:
+                cls._states.pop(name, None)
+
+    @classmethod
+    def _state(cls, name: str) -> Dict:
+        with cls._lock:
+            if name not in cls._states:
+                source = cls.sources()[name]
+                cls._states[name] = {"collection": source["collection"], "fields": source["fields"],
+                                     "lock": threading.Lock(), "rows": [], "recent": set(), "watermark": None,
+                                     "frame": None, "fetched_at": 0.0}
+            return cls._states[name]
+
+    @classmethod
+    def _fetch(cls, state: Dict) -> List[Dict]:
+        collection = MongoManager.get_collection(state["collection"])
+        projection = {field: 1 for field in state["fields"]}
+        if state["watermark"] is None:
+            # Lần đầu chỉ nạp max_rows bản ghi mới nhất
+            docs = list(collection.find({}, projection).sort("_id", DESCENDING).limit(cls.max_rows))
+            docs.reverse()
+            return docs
+        since = ObjectId.from_datetime(state["watermark"] - timedelta(seconds=cls.OVERLAP_SECONDS))
+        cursor = collection.find({"_id": {"$gt": since}}, projection).sort("_id", ASCENDING)
+        return [doc for doc in cursor if doc["_id"] not in state["recent"]]
+
+    @classmethod
+    def _append(cls, state: Dict, docs: List[Dict]):
+        if not docs:
+            return
+        rows = state["rows"] + docs
+        state["rows"] = rows[-cls.max_rows:]
+        watermark = max(doc["_id"].generation_time for doc in docs)
+        if state["watermark"] is not None:
+            watermark = max(watermark, state["watermark"])
+        state["watermark"] = watermark
+        cutoff = watermark - timedelta(seconds=cls.OVERLAP_SECONDS)
+        state["recent"] = {_id for _id in state["recent"] | {doc["_id"] for doc in docs}
+                           if _id.generation_time >= cutoff}
+        state["frame"] = None
+
+    @classmethod
+    def get(cls, name: str, force: bool = False) -> pd.DataFrame:
+        """DataFrame dùng chung cho mọi phiên admin, bên gọi không được sửa tại chỗ."""
+        state = cls._state(name)
+        with state["lock"]:
+            if force or time.monotonic() - state["fetched_at"] >= cls.ttl:
+                cls._append(state, cls._fetch(state))
+                state["fetched_at"] = time.monotonic()
+            if state["frame"] is None:
+                state["frame"] = pd.DataFrame(state["rows"], columns=["_id"] + state["fields"])
+            return state["frame"]
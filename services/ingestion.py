@@ -0,0 +1,230 @@
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from langchain_core.documents import Document
+
+from config import INGESTION_CONFIG, QDRANT_CONFIG
+from database import QdrantManager, CollectionCatalog
+from .crawler import WebCrawler
+from .loaders import DocumentLoader
+from .registry import ResourceRegistry
+
+
+class IngestionCancelled(Exception):
+    pass
+
+
+class IngestionPipeline:
+    STAGES = ["parsed", "split", "skipped", "embedded", "upserted", "removed"]
+    ID_NAMESPACE = uuid.UUID("6f1c2a4e-3b7d-5e8f-9a0b-1c2d3e4f5a6b")
+
+    def __init__(self, collection: str, embedding_model, batch_size: int = 64, workers: int = 4,
+                 max_pending: int = 8, force_recreate: bool = False, profile: str = "default",
+                 progress_callback: Optional[Callable[[Dict], None]] = None,
+                 should_cancel: Optional[Callable[[], bool]] = None):
+        self.collection = collection
+        self.embedding_model = embedding_model
+        self.batch_size = batch_size
+        self.workers = workers
+        self.max_pending = max_pending
+        self.force_recreate = force_recreate
+        self.profile = profile
+        self.progress_callback = progress_callback
+        self.should_cancel = should_cancel
+        self.progress = {stage: 0 for stage in self.STAGES}
+        self.timings = {"embed": 0.0, "upsert": 0.0}
+        self._lock = threading.Lock()
+        self._sparse = None
+        self._ready = False
+        self._existing: Dict[str, set] = {}
+        self._seen: Dict[str, set] = {}
+
+    def _add(self, stage: str, count: int = 1, seconds: Optional[float] = None, timing: Optional[str] = None):
+        with self._lock:
+            self.progress[stage] += count
+            if timing:
+                self.timings[timing] += seconds
+
+    def _report(self):
+        # Chỉ gọi từ luồng chính: Streamlit không cho cập nhật giao diện từ worker thread
+        if self.progress_callback:
+            with self._lock:
+                snapshot = dict(self.progress)
+            self.progress_callback(snapshot)
+
+    def _check_cancel(self):
+        if self.should_cancel and self.should_cancel():
+            raise IngestionCancelled("Ingestion cancelled")
+
+    def count_parsed(self, documents: Iterable[Document]) -> Iterator[Document]:
+        for doc in documents:
+            self._add("parsed")
+            yield doc
+
+    def count_split(self, chunks: Iterable[Document]) -> Iterator[Document]:
+        for chunk in chunks:
+            self._add("split")
+            yield chunk
+
+    @classmethod
+    def chunk_id(cls, doc: Document) -> str:
+        # ID cố định theo nguồn + nội dung đã chuẩn hóa: nạp lại cùng nội dung sẽ trùng ID thay vì nhân đôi
+        content = re.sub(r'\s+', ' ', unicodedata.normalize("NFC", doc.page_content)).strip()
+        digest = hashlib.sha256(f"{doc.metadata.get('source', '')}\n{content}".encode("utf-8")).hexdigest()
+        return str(uuid.uuid5(cls.ID_NAMESPACE, digest))
+
+    def _dedup(self, chunks: Iterable[Document]) -> Iterator[Document]:
+        for chunk in chunks:
+            source = str(chunk.metadata.get("source", ""))
+            if source not in self._existing:
+                self._existing[source] = (QdrantManager.get_point_ids(self.collection, source)
+                                          if self._ready else set())
+                self._seen[source] = set()
+            point_id = self.chunk_id(chunk)
+            if point_id in self._seen[source] or point_id in self._existing[source]:
+                self._seen[source].add(point_id)
+                self._add("skipped")
+                continue
+            self._seen[source].add(point_id)
+            chunk.metadata["_point_id"] = point_id
+            yield chunk
+
+    def _remove_stale(self):
+        # Chỉ xóa các chunk không còn trong nguồn vừa nạp lại, sau khi mọi batch đã upsert xong
+        for source, existing in self._existing.items():
+            stale = existing - self._seen[source]
+            if stale:
+                QdrantManager.delete_points(self.collection, stale)
+                self._add("removed", len(stale))
+
+    @staticmethod
+    def _ids(batch: List[Document]) -> List[str]:
+        return [doc.metadata.pop("_point_id") for doc in batch]
+
+    def _batches(self, chunks: Iterable[Document]) -> Iterator[List[Document]]:
+        batch = []
+        for chunk in chunks:
+            batch.append(chunk)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _process_batch(self, batch: List[Document]):
+        start = time.perf_counter()
+        vectors = self.embedding_model.embed_documents([doc.page_content for doc in batch])
+        self._add("embedded", len(batch), time.perf_counter() - start, "embed")
+
+        start = time.perf_counter()
+        QdrantManager.upsert_documents(self.collection, batch, vectors, self._sparse, ids=self._ids(batch))
+        self._add("upserted", len(batch), time.perf_counter() - start, "upsert")
+
+    def _process_first_batch(self, batch: List[Document]):
+        # Batch đầu chạy tuần tự để tạo collection đúng kích thước vector trước khi upsert song song
+        start = time.perf_counter()
+        vectors = self.embedding_model.embed_documents([doc.page_content for doc in batch])
+        self._add("embedded", len(batch), time.perf_counter() - start, "embed")
+        self._sparse = QdrantManager.ensure_collection(self.collection, len(vectors[0]), self.force_recreate,
+                                                       self.profile)
+        self._ready = True
+
+        start = time.perf_counter()
+        QdrantManager.upsert_documents(self.collection, batch, vectors, self._sparse, ids=self._ids(batch))
+        self._add("upserted", len(batch), time.perf_counter() - start, "upsert")
+
+    def _prepare(self):
+        # Collection đã có thì lấy danh sách ID theo nguồn để bỏ qua chunk không đổi; tạo lại thì nạp toàn bộ
+        if not self.force_recreate and QdrantManager.collection_exists(self.collection):
+            self._sparse = QdrantManager.has_sparse_vectors(self.collection)
+            QdrantManager.ensure_source_index(self.collection)
+            self._ready = True
+
+    def _summary(self, start: float) -> Dict:
+        return {
+            "collection": self.collection,
+            "added": self.progress["upserted"],
+            "skipped": self.progress["skipped"],
+            "removed": self.progress["removed"],
+            "progress": dict(self.progress),
+            "timings": dict(self.timings),
+            "total_time": time.perf_counter() - start
+        }
+
+    def run(self, chunks: Iterable[Document], allow_empty: bool = False) -> Dict:
+        start = time.perf_counter()
+        self._prepare()
+        batches = self._batches(self._dedup(chunks))
+        if not self._ready:
+            first = next(batches, None)
+            if first is None:
+                if allow_empty:
+                    return self._summary(start)
+                raise ValueError("No content extracted")
+            self._process_first_batch(first)
+            self._report()
+
+        pending = set()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ingest") as executor:
+            try:
+                for batch in batches:
+                    self._check_cancel()
+                    # Giới hạn số batch đang chờ để bộ nhớ không phụ thuộc kích thước file
+                    while len(pending) >= self.max_pending:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            future.result()
+                        self._report()
+                    pending.add(executor.submit(self._process_batch, batch))
+                    self._report()
+
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+                    self._report()
+            except BaseException:
+                for future in pending:
+                    future.cancel()
+                raise
+
+        if not self._seen and not allow_empty:
+            raise ValueError("No content extracted")
+        self._remove_stale()
+        CollectionCatalog.invalidate()
+        self._report()
+        return self._summary(start)
+
+    @classmethod
+    def ingest(cls, upload_type: str, source, collection: str, force_recreate: bool = False,
+               source_name: Optional[str] = None, profile: Optional[str] = None,
+               progress_callback: Optional[Callable[[Dict], None]] = None,
+               should_cancel: Optional[Callable[[], bool]] = None) -> Dict:
+        model = ResourceRegistry.get("model")
+        pipeline = cls(
+            collection,
+            model.get_embedding_model(),
+            batch_size=INGESTION_CONFIG["BATCH_SIZE"] or model.get_embedding_batch_size(),
+            workers=INGESTION_CONFIG["WORKERS"],
+            max_pending=INGESTION_CONFIG["MAX_PENDING"],
+            force_recreate=force_recreate,
+            profile=profile or QDRANT_CONFIG["DEFAULT_PROFILE"],
+            progress_callback=progress_callback,
+            should_cancel=should_cancel
+        )
+        if upload_type == "crawl":
+            # Trang không đổi (HTTP 304) không sinh chunk nào, nên lần crawl lại không có gì mới vẫn là hợp lệ
+            crawler = WebCrawler.from_config(state_key=collection)
+            documents = pipeline.count_parsed(crawler.crawl(source))
+            result = pipeline.run(pipeline.count_split(DocumentLoader.split(documents)), allow_empty=True)
+            crawler.commit_state()
+            result["crawl"] = dict(crawler.stats)
+            return result
+        documents = pipeline.count_parsed(DocumentLoader.iter_documents(upload_type, source, source_name))
+        return pipeline.run(pipeline.count_split(DocumentLoader.split(documents)))
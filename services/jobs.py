@@ -0,0 +1,225 @@
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from pymongo import ReturnDocument
+
+from database import MongoManager
+from models import SemanticCache
+from .ingestion import IngestionCancelled, IngestionPipeline
+from .registry import ResourceRegistry
+from .releases import CollectionReleaseManager
+
+
+class IngestionJobQueue:
+    STATUSES = ["queued", "running", "done", "failed", "cancelled"]
+
+    _executor: Optional[ThreadPoolExecutor] = None
+    _lock = threading.Lock()
+    _cancel_events: Dict[str, threading.Event] = {}
+    _collection = "ingestion_jobs"
+    _progress_interval = 1.0
+    _heartbeat_interval = 5.0
+    _stale_after = 60.0
+    _owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    _heartbeat_thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def start(cls, workers: int = 2, collection: str = "ingestion_jobs", progress_interval: float = 1.0,
+              heartbeat_interval: float = 5.0, stale_after: float = 60.0):
+        with cls._lock:
+            if cls._executor is not None:
+                return
+            cls._collection = collection
+            cls._progress_interval = progress_interval
+            cls._heartbeat_interval = float(heartbeat_interval)
+            cls._stale_after = float(stale_after)
+            cls._reap_stale()
+            cls._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingestion-job")
+            cls._heartbeat_thread = threading.Thread(target=cls._heartbeat, name="ingestion-heartbeat",
+                                                     daemon=True)
+            cls._heartbeat_thread.start()
+
+    @classmethod
+    def _reap_stale(cls):
+        # Collection job dùng chung giữa các replica: chỉ đánh lỗi job mà tiến trình sở hữu đã ngừng heartbeat
+        now = time.time()
+        MongoManager.update_many(cls._collection, {
+            "status": {"$in": ["queued", "running"]},
+            "$or": [{"heartbeat_at": {"$lt": now - cls._stale_after}}, {"heartbeat_at": {"$exists": False}}]
+        }, {"status": "failed", "error": "Worker stopped responding", "finished_at": now})
+
+    @classmethod
+    def _beat(cls):
+        MongoManager.update_many(cls._collection, {"owner": cls._owner, "status": {"$in": ["queued", "running"]}},
+                                 {"heartbeat_at": time.time()})
+        # Yêu cầu hủy có thể đến từ tiến trình khác, chỉ thấy được qua cờ trên Mongo
+        for job in MongoManager.find_many(cls._collection, {"owner": cls._owner, "status": "running",
+                                                            "cancel_requested": True}):
+            event = cls._cancel_events.get(job["_id"])
+            if event is not None:
+                event.set()
+        cls._reap_stale()
+
+    @classmethod
+    def _heartbeat(cls):
+        while True:
+            time.sleep(cls._heartbeat_interval)
+            try:
+                cls._beat()
+            except Exception as e:
+                print(f"Ingestion heartbeat failed: {str(e)}")
+
+    @classmethod
+    def submit(cls, upload_type: str, source: str, collection: str, source_name: Optional[str] = None,
+               username: Optional[str] = None, temp_file: Optional[str] = None,
+               release: Optional[str] = None, profile: Optional[str] = None) -> str:
+        job_id = uuid.uuid4().hex
+        MongoManager.insert_one(cls._collection, {
+            "_id": job_id,
+            "upload_type": upload_type,
+            "source": source,
+            "source_name": source_name,
+            "collection": collection,
+            "release": release,
+            "profile": profile,
+            "temp_file": temp_file,
+            "username": username,
+            "status": "queued",
+            "owner": cls._owner,
+            "heartbeat_at": time.time(),
+            "cancel_requested": False,
+            "attempts": 1,
+            "progress": {},
+            "result": None,
+            "error": None,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+        })
+        cls._enqueue(job_id)
+        return job_id
+
+    @classmethod
+    def _enqueue(cls, job_id: str):
+        if cls._executor is None:
+            raise RuntimeError("IngestionJobQueue has not been started. Call start() first.")
+        cls._cancel_events[job_id] = threading.Event()
+        cls._executor.submit(cls._run, job_id)
+
+    @classmethod
+    def _update(cls, job_id: str, values: Dict):
+        MongoManager.update_one(cls._collection, {"_id": job_id}, values)
+
+    @classmethod
+    def _transition(cls, job_id: str, statuses: List[str], values: Dict,
+                    query: Optional[Dict] = None) -> Optional[Dict]:
+        # Đổi trạng thái có điều kiện: worker, nút hủy và heartbeat của tiến trình khác có thể ghi cùng lúc
+        return MongoManager.get_collection(cls._collection).find_one_and_update(
+            {"_id": job_id, "status": {"$in": statuses}, **(query or {})}, {"$set": values},
+            return_document=ReturnDocument.AFTER)
+
+    @classmethod
+    def _run(cls, job_id: str):
+        event = cls._cancel_events.get(job_id) or threading.Event()
+        start = time.time()
+        job = None
+        if not event.is_set():
+            job = cls._transition(job_id, ["queued"], {"status": "running", "started_at": start, "error": None,
+                                                       "owner": cls._owner, "heartbeat_at": start},
+                                  {"cancel_requested": {"$ne": True}})
+        if job is None:
+            # Job đã bị hủy hoặc được worker khác nhận trước
+            cls._cancel_events.pop(job_id, None)
+            return
+
+        last_write = [0.0]
+
+        def save_progress(progress):
+            # Ghi tiến độ vào Mongo có giới hạn tần suất, tránh mỗi batch một lần ghi
+            now = time.time()
+            if now - last_write[0] >= cls._progress_interval:
+                last_write[0] = now
+                cls._update(job_id, {"progress": progress})
+
+        try:
+            result = IngestionPipeline.ingest(job["upload_type"], job["source"], job["collection"],
+                                              source_name=job.get("source_name"), profile=job.get("profile"),
+                                              progress_callback=save_progress, should_cancel=event.is_set)
+            if job.get("release"):
+                # Bản dựng mới chỉ được gắn alias sau khi vượt qua smoke test
+                result["release"] = CollectionReleaseManager.release(job["release"], job["collection"])
+            cls._transition(job_id, ["running"], {"status": "done", "progress": result["progress"],
+                                                  "result": result, "finished_at": time.time()})
+            active = ResourceRegistry.get_active_collection()
+            if active is not None and active.name == job["collection"]:
+                SemanticCache.clear()
+            cls._remove_temp_file(job)
+        except IngestionCancelled:
+            cls._transition(job_id, ["running"], {"status": "cancelled", "finished_at": time.time()})
+            if job.get("release"):
+                CollectionReleaseManager.mark_failed(job["collection"], "Build cancelled")
+        except Exception as e:
+            cls._transition(job_id, ["running"], {"status": "failed", "error": str(e), "finished_at": time.time()})
+            if job.get("release"):
+                # Bản dựng dở không bao giờ được promote và sẽ bị garbage_collect dọn
+                CollectionReleaseManager.mark_failed(job["collection"], str(e))
+        finally:
+            cls._cancel_events.pop(job_id, None)
+
+    @staticmethod
+    def _remove_temp_file(job: Dict):
+        temp_file = job.get("temp_file")
+        if temp_file and os.path.exists(temp_file):
+            try:
+                os.remove(temp_file)
+            except OSError as e:
+                print(f"Could not delete temporary file: {str(e)}")
+
+    @classmethod
+    def cancel(cls, job_id: str) -> bool:
+        event = cls._cancel_events.get(job_id)
+        if event is not None:
+            event.set()
+        # Job chưa được worker nhận thì hủy luôn; worker nhận sau đó sẽ thấy trạng thái đã đổi và bỏ qua
+        if cls._transition(job_id, ["queued"], {"status": "cancelled", "cancel_requested": True,
+                                                "finished_at": time.time()}):
+            return True
+        # Job đang chạy, có thể ở tiến trình khác: ghi cờ để heartbeat của tiến trình sở hữu dừng nó
+        return cls._transition(job_id, ["running"], {"cancel_requested": True}) is not None
+
+    @classmethod
+    def retry(cls, job_id: str) -> bool:
+        job = MongoManager.find_one(cls._collection, {"_id": job_id})
+        if job is None or job["status"] not in ("failed", "cancelled"):
+            return False
+        if job.get("temp_file") and not os.path.exists(job["temp_file"]):
+            cls._update(job_id, {"error": "Uploaded file is no longer available"})
+            return False
+        # Hai admin bấm thử lại cùng lúc thì chỉ một lần được đưa vào hàng đợi
+        if cls._transition(job_id, ["failed", "cancelled"], {
+            "status": "queued", "attempts": job.get("attempts", 1) + 1, "progress": {}, "result": None,
+            "error": None, "started_at": None, "finished_at": None, "owner": cls._owner,
+            "heartbeat_at": time.time(), "cancel_requested": False
+        }) is None:
+            return False
+        cls._enqueue(job_id)
+        return True
+
+    @classmethod
+    def delete(cls, job_id: str) -> bool:
+        job = MongoManager.find_one(cls._collection, {"_id": job_id})
+        if job is None or job["status"] in ("queued", "running"):
+            return False
+        cls._remove_temp_file(job)
+        MongoManager.delete_one(cls._collection, {"_id": job_id})
+        return True
+
+    @classmethod
+    def list_jobs(cls, limit: int = 50) -> List[Dict]:
+        cursor = MongoManager.get_collection(cls._collection).find({}, {"result.progress": 0})
+        return list(cursor.sort("created_at", -1).limit(limit))
@@ -0,0 +1,119 @@
+import codecs
+import os
+import re
+from typing import Iterable, Iterator, Optional
+
+import pandas as pd
+from langchain_community.document_loaders import PyPDFLoader, WebBaseLoader
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from config import CRAWLER_CONFIG
+
+
+class DocumentLoader:
+    CHUNK_SIZE = 1000
+    CHUNK_OVERLAP = 200
+    SEPARATORS = ["\n\n", "\n", " ", ".", ",", "\u200b", "\uff0c", "\u3001", "\uff0e", "\u3002", ""]
+    CSV_ENCODINGS = ["utf-8-sig", "cp1258", "cp1252", "latin-1"]
+    CSV_BATCH_ROWS = 5000
+    ENCODING_SAMPLE_BYTES = 1024 * 1024
+
+    @classmethod
+    def iter_documents(cls, upload_type: str, source, source_name: Optional[str] = None) -> Iterator[Document]:
+        if upload_type == "pdf":
+            documents = cls.iter_pdf(source)
+        elif upload_type == "web":
+            documents = cls.iter_web(source)
+        elif upload_type == "csv":
+            documents = cls.iter_csv(source)
+        else:
+            raise ValueError("Invalid upload type")
+        return cls.with_source(documents, source_name) if source_name else documents
+
+    @staticmethod
+    def with_source(documents: Iterable[Document], source_name: str) -> Iterator[Document]:
+        # File tải lên được lưu tạm với tên thay đổi mỗi lần, nên gán lại tên gốc để nhận ra lần nạp lại
+        for doc in documents:
+            doc.metadata["source"] = source_name
+            yield doc
+
+    @staticmethod
+    def iter_pdf(file_path: str) -> Iterator[Document]:
+        # Đọc từng trang một thay vì nạp cả file vào bộ nhớ
+        return PyPDFLoader(file_path).lazy_load()
+
+    @classmethod
+    def iter_web(cls, url: str) -> Iterator[Document]:
+        os.environ["USER_AGENT"] = "MyAgent"
+        loader = WebBaseLoader(url)
+        loader.requests_kwargs = {'verify': CRAWLER_CONFIG["VERIFY_SSL"]}
+        html_content = loader.scrape('html.parser')
+        yield Document(page_content=cls.html_to_text(html_content), metadata={"source": url})
+
+    @classmethod
+    def html_to_text(cls, html_content) -> str:
+        for element in html_content(['script', 'style', 'meta', 'link', 'comment', 'a']):
+            element.decompose()
+
+        text = html_content.get_text(separator='\n', strip=True)
+        return cls.clean_text(text)
+
+    @classmethod
+    def detect_encoding(cls, file_path: str) -> str:
+        # Chỉ đọc một mẫu đầu file; decoder tăng dần để ký tự UTF-8 bị cắt ở cuối mẫu không gây lỗi giả
+        with open(file_path, 'rb') as f:
+            sample = f.read(cls.ENCODING_SAMPLE_BYTES)
+        for encoding in cls.CSV_ENCODINGS:
+            try:
+                codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+                return encoding
+            except UnicodeDecodeError:
+                continue
+        raise ValueError("Unable to read the CSV file with supported encodings")
+
+    @classmethod
+    def iter_csv(cls, file_path: str, batch_rows: int = CSV_BATCH_ROWS) -> Iterator[Document]:
+        encoding = cls.detect_encoding(file_path)
+        # Dòng thừa ô (thường do dấu phẩy cuối dòng) làm C parser báo lỗi; chỉ đọc các cột có trong header,
+        # dòng thiếu ô nhận chuỗi rỗng
+        header = pd.read_csv(file_path, encoding=encoding, nrows=0).columns
+        reader = pd.read_csv(file_path, encoding=encoding, dtype=str, keep_default_na=False,
+                             skipinitialspace=True, usecols=range(len(header)), chunksize=batch_rows)
+        row = 0
+        for frame in reader:
+            if frame.empty:
+                continue
+            frame.columns = [str(column).strip() for column in frame.columns]
+            frame = frame.apply(lambda column: column.str.strip())
+            # Ghép "cột: giá trị" theo cả cột một lúc thay vì tách từng dòng bằng dấu phẩy
+            content = None
+            for column in frame.columns:
+                line = column + ": " + frame[column]
+                content = line if content is None else content + "\n" + line
+            for text, fields in zip(content.tolist(), frame.to_dict("records")):
+                yield Document(page_content=text, metadata={**fields, "source": file_path, "row": row})
+                row += 1
+
+    @staticmethod
+    def clean_text(text: str) -> str:
+        text = re.sub(r'\s+', ' ', text)
+        text = re.sub(r'[^a-zA-Z0-9À-ỹ\s.,!?]', '', text)
+        text = re.sub(r'\n\s*\n', '\n', text)
+        return text.strip()
+
+    @classmethod
+    def get_splitter(cls, chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP):
+        return RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            add_start_index=True,
+            separators=cls.SEPARATORS
+        )
+
+    @classmethod
+    def split(cls, documents: Iterable[Document], chunk_size: int = CHUNK_SIZE,
+              chunk_overlap: int = CHUNK_OVERLAP) -> Iterator[Document]:
+        text_splitter = cls.get_splitter(chunk_size, chunk_overlap)
+        for doc in documents:
+            yield from text_splitter.split_documents([doc])
@@ -0,0 +1,130 @@
+"""Index và chuyển đổi dữ liệu Mongo.
+
+    python -m services.migrations indexes          # tạo index (cũng chạy tự động khi khởi động)
+    python -m services.migrations timestamps       # đổi timestamp dạng chuỗi sang datetime UTC, chạy lại được
+"""
+import argparse
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import pytz
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import OperationFailure
+
+from config import MONGODB_CONFIG
+from database import MongoManager
+
+VIETNAM_TZ = pytz.timezone('Asia/Ho_Chi_Minh')
+LEGACY_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def utc_now() -> datetime:
+    return datetime.now(pytz.utc)
+
+
+def to_utc(value) -> Optional[datetime]:
+    # Chuỗi cũ là giờ Việt Nam ("%Y-%m-%d %H:%M:%S", bản đăng nhập có thêm " +07"); datetime naive từ Mongo là UTC
+    if isinstance(value, datetime):
+        return pytz.utc.localize(value) if value.tzinfo is None else value.astimezone(pytz.utc)
+    if not value:
+        return None
+    try:
+        return VIETNAM_TZ.localize(datetime.strptime(str(value)[:19], LEGACY_FORMAT)).astimezone(pytz.utc)
+    except ValueError:
+        return None
+
+
+class MongoMigrations:
+    @staticmethod
+    def indexes() -> Dict[str, List[Tuple[str, Dict]]]:
+        return {
+            MONGODB_CONFIG["CHAT_HISTORY"]: [("timestamp", {}), ("username", {}), ("search_tokens", {})],
+            MONGODB_CONFIG["LOGIN_HISTORY"]: [("timestamp", {})],
+            MONGODB_CONFIG["ACCOUNT"]: [("username", {"unique": True})],
+            MONGODB_CONFIG["BAN_COLLECTION"]: [("username", {"unique": True})],
+        }
+
+    @staticmethod
+    def timestamp_fields() -> List[Tuple[str, str]]:
+        return [
+            (MONGODB_CONFIG["CHAT_HISTORY"], "timestamp"),
+            (MONGODB_CONFIG["LOGIN_HISTORY"], "timestamp"),
+            (MONGODB_CONFIG["ACCOUNT"], "created_at"),
+            (MONGODB_CONFIG["BAN_COLLECTION"], "banned_at"),
+        ]
+
+    @classmethod
+    def ensure_indexes(cls) -> List[str]:
+        # create_index không làm gì nếu index đã có, nên gọi mỗi lần khởi động là an toàn
+        created = []
+        for collection, fields in cls.indexes().items():
+            for field, options in fields:
+                try:
+                    created.append(MongoManager.get_collection(collection).create_index([(field, ASCENDING)],
+                                                                                         **options))
+                except OperationFailure as e:
+                    print(f"Không tạo được index {collection}.{field}: {str(e)}")
+        return created
+
+    @staticmethod
+    def dedupe_bans() -> int:
+        # Danh sách chặn cũ có thể trùng username, phải gộp trước khi tạo unique index
+        collection = MongoManager.get_collection(MONGODB_CONFIG["BAN_COLLECTION"])
+        removed = 0
+        for group in collection.aggregate([{"$group": {"_id": "$username", "ids": {"$push": "$_id"},
+                                                       "count": {"$sum": 1}}},
+                                           {"$match": {"count": {"$gt": 1}}}]):
+            removed += collection.delete_many({"_id": {"$in": group["ids"][1:]}}).deleted_count
+        return removed
+
+    @staticmethod
+    def migrate_timestamps(collection: str, field: str, batch_size: int = 1000) -> Dict[str, int]:
+        # Chỉ quét bản ghi còn là chuỗi: bản đã đổi tự rơi khỏi truy vấn nên dừng giữa chừng thì chạy lại là tiếp tục
+        source = MongoManager.get_collection(collection)
+        counts = {"converted": 0, "invalid": 0}
+        last_id = None
+        while True:
+            query = {field: {"$type": "string"}}
+            if last_id is not None:
+                query["_id"] = {"$gt": last_id}
+            batch = list(source.find(query, {field: 1}).sort("_id", ASCENDING).limit(batch_size))
+            if not batch:
+                return counts
+            operations = []
+            for doc in batch:
+                value = to_utc(doc[field])
+                if value is None:
+                    counts["invalid"] += 1
+                else:
+                    operations.append(UpdateOne({"_id": doc["_id"], field: doc[field]}, {"$set": {field: value}}))
+            if operations:
+                counts["converted"] += source.bulk_write(operations, ordered=False).modified_count
+            last_id = batch[-1]["_id"]
+
+    @classmethod
+    def migrate(cls, batch_size: int = 1000) -> Dict[str, Dict[str, int]]:
+        return {f"{collection}.{field}": cls.migrate_timestamps(collection, field, batch_size)
+                for collection, field in cls.timestamp_fields()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m services.migrations", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["indexes", "timestamps"])
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    MongoManager.initialize(MONGODB_CONFIG["URI"], MONGODB_CONFIG["DATABASE"])
+    if args.command == "indexes":
+        removed = MongoMigrations.dedupe_bans()
+        if removed:
+            print(f"Removed {removed:,} duplicate ban entries")
+        for name in MongoMigrations.ensure_indexes():
+            print(f"Index ready: {name}")
+    else:
+        for target, counts in MongoMigrations.migrate(args.batch_size).items():
+            print(f"{target}: converted {counts['converted']:,}, unparseable {counts['invalid']:,}")
+
+
+if __name__ == "__main__":
+    main()
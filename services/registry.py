@@ -0,0 +1,143 @@
+import os
+import socket
+import threading
+import time
+from typing import Dict, NamedTuple, Optional
+
+from config import QDRANT_CONFIG, MONGODB_CONFIG, MODEL_CONFIG, LANGCHAIN, COHERE, CACHE_CONFIG, RERANK_CONFIG, \
+    CONTEXT_CONFIG, DASHBOARD_CONFIG
+from database import QdrantManager, MongoManager, CollectionCatalog
+from models import Model, SemanticCache, Reranker, ContextAssembler
+from .migrations import MongoMigrations
+from .dashboard import DashboardDataCache
+from .bans import BanList
+
+
+class ActiveCollection(NamedTuple):
+    version: int
+    name: Optional[str]
+    store: object
+    retriever: object
+
+    @property
+    def cache_key(self) -> str:
+        # Alias có thể trỏ sang bản dựng mới mà tên không đổi, nên cache gắn với cả phiên bản retriever
+        return f"{self.name}#{self.version}"
+
+
+class ResourceRegistry:
+    _lock = threading.Lock()
+    _refresh_lock = threading.Lock()
+    _initialized = False
+    _resources: Dict[str, object] = {}
+    _active: Optional[ActiveCollection] = None
+    _active_fingerprint = None
+    _init_time = None
+    _session_count = 0
+
+    @classmethod
+    def initialize(cls):
+        # Kiểm tra hai lần để các session khởi tạo đồng thời chỉ chạy phần tốn kém một lần
+        if cls._initialized:
+            return
+        with cls._lock:
+            if cls._initialized:
+                return
+            start = time.perf_counter()
+            os.environ.update({str(k): str(v) for k, v in LANGCHAIN.items()})
+            os.environ['COHERE_API_KEY'] = COHERE['API_KEY']
+
+            mongodb = MongoManager.initialize(MONGODB_CONFIG["URI"], MONGODB_CONFIG["DATABASE"])
+            MongoMigrations.ensure_indexes()
+            DashboardDataCache.configure(DASHBOARD_CONFIG["TTL"], DASHBOARD_CONFIG["MAX_ROWS"])
+            BanList.configure(CACHE_CONFIG["BAN_LIST_TTL"])
+            qdrant_db = QdrantManager.get_instance(QDRANT_CONFIG["URL"], QDRANT_CONFIG["API_KEY"])
+            CollectionCatalog.configure(QDRANT_CONFIG["CATALOG_TTL"])
+            model = Model(MODEL_CONFIG["API_KEY"], MODEL_CONFIG["HUGGINGFACE"], MODEL_CONFIG["EMBEDDED"],
+                          MODEL_CONFIG["EMBEDDING_BACKEND"], MODEL_CONFIG["EMBEDDING_THREADS"],
+                          MODEL_CONFIG["EMBEDDING_BATCH_SIZE"], MODEL_CONFIG["EMBEDDING_CACHE_DIR"])
+            embedding_model = model.get_embedding_model()
+            SemanticCache.initialize(CACHE_CONFIG["SIMILARITY_THRESHOLD"], CACHE_CONFIG["TTL_SECONDS"],
+                                     CACHE_CONFIG["MAX_ENTRIES"], CACHE_CONFIG["ENABLED"])
+            Reranker.initialize(RERANK_CONFIG["BACKEND"], RERANK_CONFIG["TOP_N"], RERANK_CONFIG["TIMEOUT"],
+                                RERANK_CONFIG["FALLBACK"], RERANK_CONFIG["LOCAL_MODEL"], RERANK_CONFIG["LOCAL_MODEL_FILE"],
+                                RERANK_CONFIG["BATCH_SIZE"], RERANK_CONFIG["CACHE_SIZE"], RERANK_CONFIG["THREADS"])
+            ContextAssembler.configure(CONTEXT_CONFIG["MAX_TOKENS"], CONTEXT_CONFIG["CHARS_PER_TOKEN"],
+                                       CONTEXT_CONFIG["DEDUP_THRESHOLD"])
+
+            cls._resources = {
+                "mongodb": mongodb,
+                "qdrant_db": qdrant_db,
+                "model": model,
+                "embedding_model": embedding_model,
+                "ip": socket.gethostbyname(socket.gethostname())
+            }
+            fingerprint = cls._read_active_config()
+            cls._set_active(cls._build_active_collection(1, fingerprint[0]), fingerprint)
+            cls._init_time = time.perf_counter() - start
+            cls._initialized = True
+
+    @staticmethod
+    def _read_active_config():
+        config = MongoManager.find_one(MONGODB_CONFIG["CHAT_DB"], {"key": "DATABASE_CONFIG"}) or {}
+        return config.get("selected_db"), config.get("update_time")
+
+    @classmethod
+    def _build_active_collection(cls, version: int, name: Optional[str]) -> ActiveCollection:
+        if not name:
+            return ActiveCollection(version, name, None, None)
+        store = QdrantManager.get_store(name, cls._resources["embedding_model"])
+        retriever = QdrantManager.get_retriever(store, QDRANT_CONFIG["SEARCH_TYPE"], QDRANT_CONFIG["SEARCH_K"],
+                                                QDRANT_CONFIG["SEARCH_EF"], QDRANT_CONFIG["OVERSAMPLING"])
+        return ActiveCollection(version, name, store, retriever)
+
+    @classmethod
+    def _set_active(cls, active: ActiveCollection, fingerprint=None):
+        # Câu hỏi đang xử lý vẫn giữ tham chiếu tới phiên bản cũ nên hoàn tất bình thường
+        cls._active = active
+        cls._active_fingerprint = fingerprint
+        SemanticCache.activate(active.cache_key)
+
+    @classmethod
+    def refresh_active_collection(cls, wait: bool = False) -> ActiveCollection:
+        # Chỉ một luồng dựng retriever mới. Lần kiểm tra định kỳ bỏ qua nếu đang có luồng khác làm,
+        # còn thao tác chuyển collection của admin (wait=True) phải chờ rồi đọc lại cấu hình mới nhất
+        if not cls._refresh_lock.acquire(blocking=wait):
+            return cls._active
+        try:
+            fingerprint = cls._read_active_config()
+            if fingerprint == cls._active_fingerprint:
+                return cls._active
+            active = cls._build_active_collection(cls._active.version + 1, fingerprint[0])
+            cls._set_active(active, fingerprint)
+            return active
+        except Exception as e:
+            print(f"Error refreshing active collection: {str(e)}")
+            return cls._active
+        finally:
+            cls._refresh_lock.release()
+
+    @classmethod
+    def get(cls, name: str):
+        if not cls._initialized:
+            raise Exception("ResourceRegistry has not been initialized. Call initialize() first.")
+        return cls._resources[name]
+
+    @classmethod
+    def get_active_collection(cls) -> ActiveCollection:
+        if not cls._initialized:
+            raise Exception("ResourceRegistry has not been initialized. Call initialize() first.")
+        return cls._active
+
+    @classmethod
+    def register_session(cls):
+        with cls._lock:
+            cls._session_count += 1
+
+    @classmethod
+    def get_stats(cls) -> Dict:
+        return {
+            "initialized": cls._initialized,
+            "init_time": cls._init_time,
+            "session_count": cls._session_count
+        }
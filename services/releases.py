@@ -0,0 +1,168 @@
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from config import MONGODB_CONFIG, QDRANT_CONFIG, RELEASE_CONFIG
+from database import MongoManager, QdrantManager
+from models import SemanticCache
+from .registry import ResourceRegistry
+
+
+class ReleaseCheckFailed(Exception):
+    pass
+
+
+class CollectionReleaseManager:
+    VERSION_SEPARATOR = "__v"
+    STATUSES = ["building", "passed", "failed"]
+
+    @staticmethod
+    def _records():
+        return MongoManager.get_collection(RELEASE_CONFIG["COLLECTION"])
+
+    @classmethod
+    def _set_status(cls, version: str, status: str, **fields):
+        cls._records().update_one({"_id": version}, {"$set": {"status": status, "updated_at": time.time(), **fields}},
+                                  upsert=True)
+
+    @classmethod
+    def mark_failed(cls, version: str, error: str):
+        cls._set_status(version, "failed", error=error)
+
+    @classmethod
+    def new_version(cls, alias: str) -> str:
+        # Giữ chỗ tên phiên bản bằng insert theo _id: hai bản dựng trong cùng một giây sẽ nhận hậu tố khác nhau
+        stamp = datetime.now().strftime('%Y%m%d%H%M%S')
+        existing = set(QdrantManager.list_collection_names())
+        for suffix in range(100):
+            version = f"{alias}{cls.VERSION_SEPARATOR}{stamp}{suffix:02d}"
+            if version in existing:
+                continue
+            try:
+                cls._records().insert_one({"_id": version, "alias": alias, "status": "building",
+                                           "created_at": time.time()})
+                return version
+            except DuplicateKeyError:
+                continue
+        raise ValueError(f"Could not allocate a new version name for '{alias}'")
+
+    @classmethod
+    def alias_of(cls, collection: str) -> Optional[str]:
+        alias, separator, version = collection.rpartition(cls.VERSION_SEPARATOR)
+        return alias if separator and alias and version.isdigit() else None
+
+    @classmethod
+    def validate_alias(cls, alias: str):
+        if not alias or cls.VERSION_SEPARATOR in alias:
+            raise ValueError(f"Invalid release name '{alias}'")
+        # Qdrant không cho alias trùng tên một collection thật
+        if alias in QdrantManager.list_collection_names():
+            raise ValueError(f"'{alias}' is already a regular collection, choose another release name")
+
+    @classmethod
+    def list_releases(cls) -> Dict[str, Dict]:
+        aliases = QdrantManager.get_aliases()
+        statuses = {doc["_id"]: doc.get("status") for doc in cls._records().find({}, {"status": 1})}
+        releases: Dict[str, Dict] = {}
+        for name in QdrantManager.list_collection_names():
+            alias = cls.alias_of(name)
+            if alias:
+                release = releases.setdefault(alias, {"current": aliases.get(alias), "versions": [], "status": {}})
+                release["versions"].append(name)
+                # Phiên bản đang live từ trước khi có bản ghi trạng thái coi như đã qua kiểm tra
+                default = "passed" if name == release["current"] else None
+                release["status"][name] = statuses.get(name, default)
+        for alias, release in releases.items():
+            # Tên phiên bản chứa timestamp nên sắp xếp chuỗi cũng là sắp xếp theo thời gian
+            release["versions"].sort(reverse=True)
+        return releases
+
+    @staticmethod
+    def passed_versions(release: Dict) -> List[str]:
+        return [version for version in release["versions"] if release["status"].get(version) == "passed"]
+
+    @classmethod
+    def smoke_test(cls, alias: str, version: str) -> Dict:
+        problems = []
+        points = QdrantManager.count_points(version)
+        current = QdrantManager.get_aliases().get(alias)
+        if points == 0:
+            problems.append("collection is empty")
+        elif current and current != version:
+            baseline = QdrantManager.count_points(current)
+            if points < baseline * RELEASE_CONFIG["MIN_POINTS_RATIO"]:
+                problems.append(f"only {points} points vs {baseline} in {current}")
+
+        store = QdrantManager.get_store(version, ResourceRegistry.get("embedding_model"))
+        retriever = QdrantManager.get_retriever(store, QDRANT_CONFIG["SEARCH_TYPE"], QDRANT_CONFIG["SEARCH_K"],
+                                                QDRANT_CONFIG["SEARCH_EF"], QDRANT_CONFIG["OVERSAMPLING"])
+        hits = {}
+        for query in RELEASE_CONFIG["SMOKE_QUERIES"]:
+            hits[query] = len(retriever.invoke(query))
+            if hits[query] < RELEASE_CONFIG["MIN_HITS"]:
+                problems.append(f"query '{query}' returned {hits[query]} results")
+        if problems:
+            raise ReleaseCheckFailed("Smoke test failed: " + "; ".join(problems))
+        return {"points": points, "hits": hits}
+
+    @classmethod
+    def promote(cls, alias: str, version: str):
+        # Chỉ bản đã qua smoke test mới được gắn alias; bản chưa kiểm tra phải đi qua release()
+        release = cls.list_releases().get(alias)
+        if not release or version not in cls.passed_versions(release):
+            raise ReleaseCheckFailed(f"{version} has not passed its smoke test")
+        QdrantManager.switch_alias(alias, version)
+        cls._set_status(version, "passed", promoted_at=time.time())
+        cls._notify(alias)
+
+    @classmethod
+    def rollback(cls, alias: str) -> Optional[str]:
+        release = cls.list_releases().get(alias)
+        if not release or not release["current"]:
+            return None
+        older = [version for version in cls.passed_versions(release) if version < release["current"]]
+        if not older:
+            return None
+        cls.promote(alias, older[0])
+        return older[0]
+
+    @classmethod
+    def garbage_collect(cls, alias: str, keep: Optional[int] = None) -> List[str]:
+        # Giữ phiên bản đang dùng và `keep` bản đã qua kiểm tra mới nhất để rollback; bản lỗi luôn bị dọn,
+        # bản đang dựng (chưa có kết quả kiểm tra) không bị đụng tới
+        keep = RELEASE_CONFIG["KEEP_VERSIONS"] if keep is None else keep
+        release = cls.list_releases().get(alias)
+        if not release:
+            return []
+        failed = [version for version in release["versions"] if release["status"].get(version) == "failed"]
+        removed = []
+        for version in cls.passed_versions(release)[keep:] + failed:
+            if version != release["current"] and QdrantManager.delete_collection(version):
+                cls._records().delete_one({"_id": version})
+                removed.append(version)
+        return removed
+
+    @classmethod
+    def release(cls, alias: str, version: str) -> Dict:
+        try:
+            checks = cls.smoke_test(alias, version)
+        except ReleaseCheckFailed as e:
+            cls._set_status(version, "failed", alias=alias, error=str(e))
+            raise
+        cls._set_status(version, "passed", alias=alias, checks=checks)
+        previous = QdrantManager.get_aliases().get(alias)
+        cls.promote(alias, version)
+        return {"alias": alias, "version": version, "previous": previous, "checks": checks,
+                "removed_versions": cls.garbage_collect(alias)}
+
+    @staticmethod
+    def _notify(alias: str):
+        # Alias đã trỏ sang bản mới ngay; cập nhật update_time để mọi tiến trình dựng lại retriever và bỏ cache cũ
+        config = MongoManager.find_one(MONGODB_CONFIG["CHAT_DB"], {"key": "DATABASE_CONFIG"}) or {}
+        if config.get("selected_db") == alias:
+            MongoManager.update_one(MONGODB_CONFIG["CHAT_DB"], {"key": "DATABASE_CONFIG"},
+                                    {"update_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")})
+            SemanticCache.clear()
+            ResourceRegistry.refresh_active_collection(wait=True)
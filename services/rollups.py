@@ -0,0 +1,298 @@
+"""Bảng tổng hợp theo giờ/ngày cho dashboard, cập nhật tăng dần mỗi khi lưu câu hỏi hoặc lượt đăng nhập.
+
+    python -m services.rollups backfill                   # dựng lại các ngày trước hôm nay từ chat/login history
+    python -m services.rollups backfill --include-today   # dựng cả hôm nay, chỉ khi không có tiến trình nào đang ghi
+"""
+import argparse
+import bisect
+import math
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import mmh3
+import pytz
+from pymongo import ReplaceOne, UpdateOne
+from pymongo.errors import PyMongoError
+
+from config import MONGODB_CONFIG
+from database import MongoManager
+from models import Tracer
+from .migrations import to_utc, utc_now
+
+GRANULARITIES = ["hour", "day"]
+# Biên các khoảng histogram (giây), tăng dần theo cấp số để percentile có sai số tương đối ổn định
+LATENCY_BOUNDS = [0.01, 0.02, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 4.0, 5.0, 6.0, 8.0, 10.0, 15.0,
+                  20.0, 30.0, 60.0, 120.0]
+CHAT_METRICS = ["processing_time", "time_to_first_token"] + Tracer.STAGES
+HLL_PRECISION = 10
+HLL_REGISTERS = 1 << HLL_PRECISION
+
+
+def hll_register(value: str) -> Tuple[int, int]:
+    # HyperLogLog: 10 bit đầu chọn register, vị trí bit 1 đầu tiên của phần còn lại là giá trị register
+    hashed = mmh3.hash64(value, signed=False)[0]
+    index = hashed >> (64 - HLL_PRECISION)
+    remainder = hashed & ((1 << (64 - HLL_PRECISION)) - 1)
+    rank = (64 - HLL_PRECISION) - remainder.bit_length() + 1
+    return index, rank
+
+
+def hll_estimate(registers: Dict[str, int]) -> int:
+    if not registers:
+        return 0
+    m = HLL_REGISTERS
+    alpha = 0.7213 / (1 + 1.079 / m)
+    zeros = m - len(registers)
+    estimate = alpha * m * m / (sum(2.0 ** -rank for rank in registers.values()) + zeros)
+    if estimate <= 2.5 * m and zeros:
+        estimate = m * math.log(m / zeros)
+    return int(round(estimate))
+
+
+def histogram_bin(seconds: float) -> str:
+    return str(bisect.bisect_left(LATENCY_BOUNDS, seconds))
+
+
+def histogram_percentile(histogram: Dict[str, int], q: float, maximum: Optional[float] = None) -> Optional[float]:
+    total = sum(histogram.values())
+    if not total:
+        return None
+    target = q * total
+    seen = 0
+    for index in sorted(histogram, key=int):
+        count = histogram[index]
+        if seen + count >= target:
+            i = int(index)
+            lower = LATENCY_BOUNDS[i - 1] if i > 0 else 0.0
+            upper = LATENCY_BOUNDS[i] if i < len(LATENCY_BOUNDS) else (maximum or lower)
+            if maximum is not None:
+                # Không nội suy vượt giá trị lớn nhất đã ghi nhận
+                lower, upper = min(lower, maximum), min(upper, maximum)
+            # Nội suy tuyến tính trong khoảng chứa phân vị
+            return lower + (upper - lower) * ((target - seen) / count)
+        seen += count
+    return maximum
+
+
+class RollupManager:
+    _vietnam_tz = pytz.timezone('Asia/Ho_Chi_Minh')
+
+    @staticmethod
+    def collection() -> str:
+        return MONGODB_CONFIG["ROLLUPS"]
+
+    @classmethod
+    def bucket_start(cls, moment: datetime, granularity: str) -> str:
+        # Bucket chia theo ngày giờ Việt Nam; timestamp lưu UTC nên đổi múi giờ trước khi cắt
+        moment = to_utc(moment).astimezone(cls._vietnam_tz)
+        if granularity == "hour":
+            return moment.strftime("%Y-%m-%d %H:00:00")
+        return moment.strftime("%Y-%m-%d 00:00:00")
+
+    @classmethod
+    def now(cls) -> datetime:
+        return utc_now().astimezone(cls._vietnam_tz)
+
+    @staticmethod
+    def _chat_update(record: Dict) -> Tuple[Dict, Dict]:
+        inc = {"count": 1, "input_words": record.get("input_word_count", 0),
+               "output_words": record.get("output_word_count", 0), "cache_hits": int(bool(record.get("cache_hit")))}
+        maximum = {}
+        values = dict(record.get("stages") or {})
+        for metric in ("processing_time", "time_to_first_token"):
+            values[metric] = record.get(metric)
+        for metric, seconds in values.items():
+            if metric not in CHAT_METRICS or seconds is None:
+                continue
+            inc[f"sum.{metric}"] = inc.get(f"sum.{metric}", 0) + seconds
+            inc[f"n.{metric}"] = 1
+            inc[f"hist.{metric}.{histogram_bin(seconds)}"] = 1
+            maximum[f"max.{metric}"] = seconds
+        if record.get("username"):
+            index, rank = hll_register(record["username"])
+            maximum[f"hll.{index}"] = rank
+        return inc, maximum
+
+    @staticmethod
+    def _login_update(record: Dict) -> Tuple[Dict, Dict]:
+        inc = {"count": 1, f"roles.{record.get('role') or 'unknown'}": 1}
+        maximum = {}
+        if record.get("username"):
+            index, rank = hll_register(record["username"])
+            maximum[f"hll.{index}"] = rank
+        return inc, maximum
+
+    @classmethod
+    def _buckets(cls, kind: str, moment: datetime) -> List[Tuple[str, Dict]]:
+        buckets = []
+        for granularity in GRANULARITIES:
+            bucket = cls.bucket_start(moment, granularity)
+            buckets.append((f"{kind}:{granularity}:{bucket}", {"kind": kind, "granularity": granularity,
+                                                                "bucket": bucket}))
+        return buckets
+
+    @staticmethod
+    def _update(inc: Dict, maximum: Dict, meta: Dict) -> Dict:
+        update = {"$inc": inc, "$setOnInsert": meta}
+        if maximum:
+            update["$max"] = maximum
+        return update
+
+    @classmethod
+    def _operations(cls, kind: str, moment: datetime, inc: Dict, maximum: Dict) -> List[UpdateOne]:
+        return [UpdateOne({"_id": bucket_id}, cls._update(inc, maximum, meta), upsert=True)
+                for bucket_id, meta in cls._buckets(kind, moment)]
+
+    @classmethod
+    def _record(cls, kind: str, moment: datetime, inc: Dict, maximum: Dict):
+        # $inc/$max trên từng bucket là nguyên tử, nhiều tiến trình ghi đồng thời không mất số liệu
+        try:
+            MongoManager.get_collection(cls.collection()).bulk_write(cls._operations(kind, moment, inc, maximum),
+                                                                     ordered=False)
+        except PyMongoError as e:
+            print(f"Không cập nhật được rollup: {str(e)}")
+
+    @classmethod
+    def record_chat(cls, record: Dict, moment: Optional[datetime] = None):
+        cls._record("chat", moment or cls.now(), *cls._chat_update(record))
+
+    @classmethod
+    def record_login(cls, record: Dict, moment: Optional[datetime] = None):
+        cls._record("login", moment or cls.now(), *cls._login_update(record))
+
+    @classmethod
+    def get_buckets(cls, kind: str, granularity: str, start: Optional[datetime] = None,
+                    end: Optional[datetime] = None) -> List[Dict]:
+        query = {"kind": kind, "granularity": granularity}
+        if start is not None or end is not None:
+            query["bucket"] = {}
+            if start is not None:
+                query["bucket"]["$gte"] = cls.bucket_start(start, granularity)
+            if end is not None:
+                query["bucket"]["$lt"] = cls.bucket_start(end, granularity)
+        return list(MongoManager.get_collection(cls.collection()).find(query).sort("bucket", 1))
+
+    @staticmethod
+    def merge(buckets: Iterable[Dict]) -> Dict:
+        merged = {"count": 0, "input_words": 0, "output_words": 0, "cache_hits": 0, "sum": {}, "n": {}, "max": {},
+                  "hist": {}, "hll": {}, "roles": {}}
+        for bucket in buckets:
+            for key in ("count", "input_words", "output_words", "cache_hits"):
+                merged[key] += bucket.get(key, 0)
+            for key in ("sum", "n", "roles"):
+                for metric, value in (bucket.get(key) or {}).items():
+                    merged[key][metric] = merged[key].get(metric, 0) + value
+            for metric, value in (bucket.get("max") or {}).items():
+                merged["max"][metric] = max(merged["max"].get(metric, value), value)
+            for metric, histogram in (bucket.get("hist") or {}).items():
+                target = merged["hist"].setdefault(metric, {})
+                for index, count in histogram.items():
+                    target[index] = target.get(index, 0) + count
+            for index, rank in (bucket.get("hll") or {}).items():
+                merged["hll"][index] = max(merged["hll"].get(index, 0), rank)
+        return merged
+
+    @classmethod
+    def summarize(cls, buckets: Iterable[Dict]) -> Dict:
+        merged = cls.merge(buckets)
+        count = merged["count"]
+        summary = {
+            "count": count,
+            "input_words": merged["input_words"],
+            "output_words": merged["output_words"],
+            "cache_hits": merged["cache_hits"],
+            "users": hll_estimate(merged["hll"]),
+            "roles": merged["roles"],
+            "metrics": {}
+        }
+        for metric, total in merged["sum"].items():
+            samples = merged["n"].get(metric, 0)
+            histogram = merged["hist"].get(metric, {})
+            maximum = merged["max"].get(metric)
+            summary["metrics"][metric] = {
+                "samples": samples,
+                "sum": total,
+                "mean": total / samples if samples else 0.0,
+                "max": maximum or 0.0,
+                "p50": histogram_percentile(histogram, 0.5, maximum),
+                "p95": histogram_percentile(histogram, 0.95, maximum),
+                "p99": histogram_percentile(histogram, 0.99, maximum),
+            }
+        return summary
+
+    @staticmethod
+    def _document(bucket_id: str, inc: Dict, maximum: Dict, meta: Dict) -> Dict:
+        # Dựng bản ghi đầy đủ từ các khóa dạng "hist.processing_time.3" như khi $inc/$max tạo ra
+        document = {"_id": bucket_id, **meta}
+        for key, value in list(inc.items()) + list(maximum.items()):
+            *parents, leaf = key.split(".")
+            target = document
+            for part in parents:
+                target = target.setdefault(part, {})
+            target[leaf] = value
+        return document
+
+    @classmethod
+    def backfill(cls, chat_collection: str, login_collection: str, batch_size: int = 1000,
+                 cutoff: Optional[datetime] = None) -> Dict:
+        """Dựng lại các bucket trước ngày chứa cutoff (mặc định hôm nay).
+
+        Bucket từ ngày cutoff trở đi vẫn đang nhận $inc từ record_chat/record_login nên không bị ghi đè;
+        bucket cũ hơn được thay thế từng bản ghi, không xóa cả collection trước khi ghi.
+        """
+        boundary = cls.bucket_start(cutoff or cls.now(), "day")
+        rollups = MongoManager.get_collection(cls.collection())
+        counts = {}
+        for kind, source, builder, projection in [
+            ("chat", chat_collection, cls._chat_update,
+             {"timestamp": 1, "username": 1, "input_word_count": 1, "output_word_count": 1, "cache_hit": 1,
+              "processing_time": 1, "time_to_first_token": 1, "stages": 1}),
+            ("login", login_collection, cls._login_update, {"timestamp": 1, "username": 1, "role": 1}),
+        ]:
+            buckets: Dict[str, Dict] = {}
+            cursor = MongoManager.get_collection(source).find({}, projection, batch_size=batch_size)
+            counts[kind] = 0
+            for record in cursor:
+                moment = to_utc(record.get("timestamp"))
+                if moment is None or cls.bucket_start(moment, "day") >= boundary:
+                    continue
+                inc, maximum = builder(record)
+                for bucket_id, meta in cls._buckets(kind, moment):
+                    bucket = buckets.setdefault(bucket_id, {"inc": {}, "max": {}, "meta": meta})
+                    for field, value in inc.items():
+                        bucket["inc"][field] = bucket["inc"].get(field, 0) + value
+                    for field, value in maximum.items():
+                        bucket["max"][field] = max(bucket["max"].get(field, value), value)
+                counts[kind] += 1
+
+            operations = [ReplaceOne({"_id": bucket_id},
+                                     cls._document(bucket_id, bucket["inc"], bucket["max"], bucket["meta"]),
+                                     upsert=True)
+                          for bucket_id, bucket in buckets.items()]
+            for i in range(0, len(operations), batch_size):
+                rollups.bulk_write(operations[i:i + batch_size], ordered=False)
+            # Bucket cũ không còn bản ghi gốc nào (dữ liệu đã bị xóa) thì bỏ đi
+            stale = [doc["_id"] for doc in rollups.find({"kind": kind, "bucket": {"$lt": boundary}}, {"_id": 1})
+                     if doc["_id"] not in buckets]
+            for i in range(0, len(stale), batch_size):
+                rollups.delete_many({"_id": {"$in": stale[i:i + batch_size]}})
+        return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m services.rollups", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["backfill"])
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--include-today", action="store_true")
+    args = parser.parse_args(argv)
+
+    MongoManager.initialize(MONGODB_CONFIG["URI"], MONGODB_CONFIG["DATABASE"])
+    cutoff = RollupManager.now() + timedelta(days=1) if args.include_today else None
+    counts = RollupManager.backfill(MONGODB_CONFIG["CHAT_HISTORY"], MONGODB_CONFIG["LOGIN_HISTORY"], args.batch_size,
+                                    cutoff)
+    print(f"Rolled up {counts['chat']:,} chat records and {counts['login']:,} logins")
+
+
+if __name__ == "__main__":
+    main()
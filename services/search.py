@@ -0,0 +1,185 @@
+"""Tìm kiếm lịch sử chat qua chỉ mục từ khóa (search_tokens, không dấu) và thống kê từ theo ngày.
+
+    python -m services.search backfill                    # gắn search_tokens cho bản ghi cũ, dựng lại thống kê từ
+                                                          # các ngày trước hôm nay
+    python -m services.search backfill --include-today    # dựng cả hôm nay, chỉ khi không có tiến trình nào đang ghi
+"""
+import argparse
+import re
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING, ReplaceOne, UpdateOne
+from pymongo.errors import PyMongoError
+
+from config import MONGODB_CONFIG
+from database import MongoManager
+from models.text import tokenize
+from .migrations import to_utc
+from .rollups import RollupManager
+
+SEARCH_FIELDS = ["question", "answer"]
+
+
+class ChatSearchIndex:
+    PAGE_SIZE = 50
+
+    @staticmethod
+    def collection() -> str:
+        return MONGODB_CONFIG["TERM_STATS"]
+
+    @staticmethod
+    def tokens(record: Dict) -> List[str]:
+        # Bỏ dấu để "hoc phi" khớp "học phí"; mỗi từ một lần, index multikey trên mảng này
+        return sorted({token for field in SEARCH_FIELDS for token in tokenize(record.get(field) or "", fold=True)})
+
+    @classmethod
+    def prepare(cls, record: Dict) -> Dict:
+        record["search_tokens"] = cls.tokens(record)
+        return record
+
+    @staticmethod
+    def _term_update(record: Dict) -> Dict[str, Dict]:
+        # Thống kê giữ nguyên dấu để bảng "từ hỏi nhiều nhất" dễ đọc như trước
+        updates = {}
+        for field in SEARCH_FIELDS:
+            counts = Counter(tokenize(record.get(field) or ""))
+            if counts:
+                inc = {f"terms.{term}": count for term, count in counts.items()}
+                inc["total"] = sum(counts.values())
+                updates[field] = inc
+        return updates
+
+    @classmethod
+    def record_terms(cls, record: Dict, moment: Optional[datetime] = None):
+        day = RollupManager.bucket_start(moment or record.get("timestamp") or RollupManager.now(), "day")
+        operations = [UpdateOne({"_id": f"{field}:{day}"}, {"$inc": inc, "$setOnInsert": {"field": field, "day": day}},
+                                upsert=True)
+                      for field, inc in cls._term_update(record).items()]
+        if not operations:
+            return
+        try:
+            MongoManager.get_collection(cls.collection()).bulk_write(operations, ordered=False)
+        except PyMongoError as e:
+            print(f"Không cập nhật được thống kê từ: {str(e)}")
+
+    @staticmethod
+    def build_query(text: str = "", start: Optional[datetime] = None, end: Optional[datetime] = None,
+                    username: Optional[str] = None) -> Dict:
+        conditions = []
+        terms = tokenize(text, fold=True)
+        if terms:
+            # Từ cuối có thể đang gõ dở nên khớp theo tiền tố; regex neo đầu vẫn dùng được index
+            if len(terms) > 1:
+                conditions.append({"search_tokens": {"$all": terms[:-1]}})
+            conditions.append({"search_tokens": {"$regex": f"^{re.escape(terms[-1])}"}})
+        if start is not None or end is not None:
+            timestamp = {}
+            if start is not None:
+                timestamp["$gte"] = start
+            if end is not None:
+                timestamp["$lt"] = end
+            conditions.append({"timestamp": timestamp})
+        if username:
+            conditions.append({"username": username})
+        if not conditions:
+            return {}
+        return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+    @classmethod
+    def count(cls, collection: str, text: str = "", start: Optional[datetime] = None,
+              end: Optional[datetime] = None, username: Optional[str] = None) -> int:
+        return MongoManager.get_collection(collection).count_documents(cls.build_query(text, start, end, username))
+
+    @classmethod
+    def search(cls, collection: str, text: str = "", start: Optional[datetime] = None,
+               end: Optional[datetime] = None, username: Optional[str] = None, page: int = 0,
+               page_size: Optional[int] = None, projection: Optional[Dict] = None) -> List[Dict]:
+        page_size = page_size or cls.PAGE_SIZE
+        cursor = MongoManager.get_collection(collection).find(cls.build_query(text, start, end, username), projection)
+        return list(cursor.sort("timestamp", DESCENDING).skip(page * page_size).limit(page_size))
+
+    @classmethod
+    def top_terms(cls, field: str, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                  limit: int = 10) -> Tuple[List[Tuple[str, int]], int]:
+        query = {"field": field}
+        if start is not None or end is not None:
+            query["day"] = {}
+            if start is not None:
+                query["day"]["$gte"] = RollupManager.bucket_start(start, "day")
+            if end is not None:
+                query["day"]["$lt"] = RollupManager.bucket_start(end, "day")
+        counts, total = Counter(), 0
+        for doc in MongoManager.get_collection(cls.collection()).find(query):
+            counts.update(doc.get("terms") or {})
+            total += doc.get("total", 0)
+        return counts.most_common(limit), total
+
+    @classmethod
+    def backfill(cls, chat_collection: str, batch_size: int = 1000,
+                 cutoff: Optional[datetime] = None) -> Dict[str, int]:
+        # Gắn search_tokens theo lô, tiếp tục theo _id nên chạy lại sau khi dừng giữa chừng vẫn đúng
+        source = MongoManager.get_collection(chat_collection)
+        counts = {"indexed": 0, "days": 0}
+        last_id = None
+        while True:
+            query = {"search_tokens": {"$exists": False}}
+            if last_id is not None:
+                query["_id"] = {"$gt": last_id}
+            batch = list(source.find(query, {field: 1 for field in SEARCH_FIELDS})
+                         .sort("_id", ASCENDING).limit(batch_size))
+            if not batch:
+                break
+            result = source.bulk_write([UpdateOne({"_id": doc["_id"]}, {"$set": {"search_tokens": cls.tokens(doc)}})
+                                        for doc in batch], ordered=False)
+            counts["indexed"] += result.modified_count
+            last_id = batch[-1]["_id"]
+
+        # Thống kê từ chỉ dựng lại các ngày trước ngày chứa cutoff (mặc định hôm nay): ngày hiện tại vẫn đang
+        # nhận $inc từ record_terms nên giữ nguyên, ngày cũ được thay từng bản ghi giống RollupManager.backfill
+        boundary = RollupManager.bucket_start(cutoff or RollupManager.now(), "day")
+        days: Dict[str, Dict] = {}
+        for record in source.find({}, {"timestamp": 1, **{field: 1 for field in SEARCH_FIELDS}},
+                                  batch_size=batch_size):
+            moment = to_utc(record.get("timestamp"))
+            if moment is None:
+                continue
+            day = RollupManager.bucket_start(moment, "day")
+            if day >= boundary:
+                continue
+            for field, inc in cls._term_update(record).items():
+                target = days.setdefault(f"{field}:{day}", {"field": field, "day": day, "terms": Counter(),
+                                                            "total": 0})
+                target["total"] += inc.pop("total")
+                target["terms"].update({key.split(".", 1)[1]: count for key, count in inc.items()})
+        stats = MongoManager.get_collection(cls.collection())
+        operations = [ReplaceOne({"_id": key}, {"_id": key, "field": doc["field"], "day": doc["day"],
+                                                "terms": dict(doc["terms"]), "total": doc["total"]}, upsert=True)
+                      for key, doc in days.items()]
+        for i in range(0, len(operations), batch_size):
+            stats.bulk_write(operations[i:i + batch_size], ordered=False)
+        # Ngày cũ không còn câu hỏi nào (dữ liệu đã bị xóa) thì bỏ thống kê
+        stale = [doc["_id"] for doc in stats.find({"day": {"$lt": boundary}}, {"_id": 1}) if doc["_id"] not in days]
+        for i in range(0, len(stale), batch_size):
+            stats.delete_many({"_id": {"$in": stale[i:i + batch_size]}})
+        counts["days"] = len({doc["day"] for doc in days.values()})
+        return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m services.search", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["backfill"])
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--include-today", action="store_true")
+    args = parser.parse_args(argv)
+
+    MongoManager.initialize(MONGODB_CONFIG["URI"], MONGODB_CONFIG["DATABASE"])
+    cutoff = RollupManager.now() + timedelta(days=1) if args.include_today else None
+    counts = ChatSearchIndex.backfill(MONGODB_CONFIG["CHAT_HISTORY"], args.batch_size, cutoff)
+    print(f"Indexed {counts['indexed']:,} chat records, term statistics for {counts['days']:,} days")
+
+
+if __name__ == "__main__":
+    main()
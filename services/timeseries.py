@@ -0,0 +1,107 @@
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Tuple
+
+import numpy as np
+import pandas as pd
+import pytz
+
+from .rollups import GRANULARITIES, RollupManager, histogram_percentile
+
+POINT_BUDGET = 2000
+GRANULARITY_STEPS = {"minute": timedelta(minutes=1), "hour": timedelta(hours=1), "day": timedelta(days=1)}
+BAND_COLUMNS = ["timestamp", "count", "p50", "p95", "max"]
+_vietnam_tz = pytz.timezone('Asia/Ho_Chi_Minh')
+
+
+def day_bounds(start_date: date, end_date: date) -> Tuple[datetime, datetime]:
+    # Ngày theo giờ Việt Nam, trả về [đầu ngày bắt đầu, đầu ngày sau ngày kết thúc) ở UTC để so với timestamp
+    start = _vietnam_tz.localize(datetime.combine(start_date, datetime.min.time()))
+    end = _vietnam_tz.localize(datetime.combine(end_date + timedelta(days=1), datetime.min.time()))
+    return start.astimezone(pytz.utc), end.astimezone(pytz.utc)
+
+
+def pick_granularity(start: datetime, end: datetime) -> str:
+    # Giữ số bucket trong khoảng vài trăm đến vài nghìn điểm
+    span = end - start
+    if span <= timedelta(days=1):
+        return "minute"
+    if span <= timedelta(days=31):
+        return "hour"
+    return "day"
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int = POINT_BUDGET) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: trả về chỉ số các điểm giữ lại, luôn gồm điểm đầu và cuối."""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.floor(np.linspace(1, n - 1, threshold - 1)).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_lo, next_hi = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        avg_x, avg_y = x[next_lo:next_hi].mean(), y[next_lo:next_hi].mean()
+        # Chọn điểm tạo tam giác lớn nhất với điểm đã chọn trước đó và trung bình bucket kế tiếp
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def local_times(timestamps: pd.Series) -> pd.Series:
+    return pd.to_datetime(timestamps, utc=True).dt.tz_convert(_vietnam_tz).dt.tz_localize(None)
+
+
+def raw_bands(timestamps: pd.Series, values: pd.Series, granularity: str) -> pd.DataFrame:
+    # Phân vị theo bucket hoàn toàn bằng NumPy: sắp theo (bucket, giá trị) rồi lấy phần tử theo hạng
+    values = np.asarray(values, dtype=float)
+    mask = ~np.isnan(values)
+    if not mask.any():
+        return pd.DataFrame(columns=BAND_COLUMNS)
+    step = np.int64(GRANULARITY_STEPS[granularity] // timedelta(microseconds=1) * 1000)
+    keys = local_times(timestamps).to_numpy(dtype="datetime64[ns]").astype(np.int64)[mask] // step
+    values = values[mask]
+    order = np.lexsort((values, keys))
+    keys, values = keys[order], values[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    counts = np.diff(np.r_[starts, len(keys)])
+
+    def rank(q):
+        return values[starts + np.floor(q * (counts - 1)).astype(int)]
+
+    return pd.DataFrame({
+        "timestamp": pd.to_datetime(keys[starts] * step),
+        "count": counts,
+        "p50": rank(0.5),
+        "p95": rank(0.95),
+        "max": values[starts + counts - 1],
+    })
+
+
+def rollup_bands(buckets: Iterable[Dict], metric: str = "processing_time") -> pd.DataFrame:
+    # Bucket giờ/ngày đã có sẵn histogram nên không cần đọc bản ghi gốc
+    rows = []
+    for bucket in buckets:
+        histogram = (bucket.get("hist") or {}).get(metric) or {}
+        maximum = (bucket.get("max") or {}).get(metric)
+        if not histogram:
+            continue
+        rows.append({
+            "timestamp": pd.to_datetime(bucket["bucket"]),
+            "count": (bucket.get("n") or {}).get(metric, 0),
+            "p50": histogram_percentile(histogram, 0.5, maximum),
+            "p95": histogram_percentile(histogram, 0.95, maximum),
+            "max": maximum,
+        })
+    return pd.DataFrame(rows, columns=BAND_COLUMNS)
+
+
+def load_bands(granularity: str, start: datetime, end: datetime, raw: pd.DataFrame,
+               metric: str = "processing_time") -> pd.DataFrame:
+    if granularity in GRANULARITIES:
+        return rollup_bands(RollupManager.get_buckets("chat", granularity, start, end), metric)
+    return raw_bands(raw["timestamp"], raw[metric], granularity)
@@ -0,0 +1,29 @@
+import threading
+
+from .registry import ResourceRegistry
+
+
+class ActiveCollectionWatcher:
+    _thread = None
+    _stop_event = threading.Event()
+    _lock = threading.Lock()
+    _interval = 10
+
+    @classmethod
+    def start(cls, interval: float = 10):
+        with cls._lock:
+            if cls._thread is not None and cls._thread.is_alive():
+                return
+            cls._interval = float(interval)
+            cls._stop_event.clear()
+            cls._thread = threading.Thread(target=cls._run, name="active-collection-watcher", daemon=True)
+            cls._thread.start()
+
+    @classmethod
+    def _run(cls):
+        while not cls._stop_event.wait(cls._interval):
+            ResourceRegistry.refresh_active_collection()
+
+    @classmethod
+    def stop(cls):
+        cls._stop_event.set()
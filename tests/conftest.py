@@ -0,0 +1,12 @@
+import pytest
+
+from benchmarks.harness import BenchmarkEnvironment, install_secrets
+
+# config đọc st.secrets ngay lúc import, nên phải cài secrets giả trước khi test import services/models
+install_secrets()
+
+
+@pytest.fixture
+def env():
+    # Mỗi test một MongoDB (mongomock) và Qdrant (:memory:) riêng
+    return BenchmarkEnvironment(dim=32, llm_latency=0.0, first_token_latency=0.0, rerank_latency=0.0).setup()
@@ -0,0 +1,29 @@
+import pytest
+
+from models import SemanticCache
+
+
+@pytest.fixture
+def cache():
+    SemanticCache.initialize()
+    SemanticCache._enabled = True
+    SemanticCache.activate("docs#1")
+    SemanticCache.clear()
+    yield SemanticCache
+    SemanticCache.clear()
+
+
+def test_stale_scope_does_not_reset_cache(cache):
+    cache.store("docs#1", "Học phí?", [1.0, 0.0], "answer", [])
+    cache.store("docs#0", "Học phí?", [0.0, 1.0], "stale", [])
+    assert cache.lookup("docs#0", [1.0, 0.0]) is None
+    assert cache.lookup("docs#1", [1.0, 0.0])["answer"] == "answer"
+    assert cache.get_stats()["size"] == 1
+
+
+def test_activate_clears_previous_version(cache):
+    cache.store("docs#1", "Học phí?", [1.0, 0.0], "answer", [])
+    cache.activate("docs#2")
+    assert cache.lookup("docs#1", [1.0, 0.0]) is None
+    assert cache.lookup("docs#2", [1.0, 0.0]) is None
+    assert cache.get_stats()["size"] == 0
@@ -0,0 +1,50 @@
+import pytest
+from langchain_core.documents import Document
+
+from models import ContextAssembler
+
+SOURCE = " ".join(f"câu{i}" for i in range(200))
+
+
+def chunk(start, end, source="quy-che.pdf", indexed=True, score=None):
+    metadata = {"source": source}
+    if indexed:
+        metadata["start_index"] = start
+    if score is not None:
+        metadata["relevance_score"] = score
+    return Document(page_content=SOURCE[start:end], metadata=metadata)
+
+
+def assemble(*docs):
+    return ContextAssembler.assemble(list(docs), max_tokens=10000)
+
+
+def test_adjacent_chunks_are_joined():
+    [doc] = assemble(chunk(0, 300), chunk(300, 600))
+    assert doc.page_content == SOURCE[0:600]
+    assert doc.metadata["merged_chunks"] == 2
+
+
+def test_overlapping_chunks_are_joined():
+    [doc] = assemble(chunk(250, 550), chunk(0, 300))
+    assert doc.page_content == SOURCE[0:550]
+
+
+@pytest.mark.parametrize("indexed", [True, False])
+def test_bridging_chunk_merges_both_sides(indexed):
+    [doc] = assemble(chunk(0, 300, indexed=indexed), chunk(500, 800, indexed=indexed),
+                     chunk(250, 550, indexed=indexed))
+    assert doc.page_content == SOURCE[0:800]
+    assert doc.metadata["merged_chunks"] == 3
+
+
+def test_chunks_without_start_index_merge_by_text():
+    [doc] = assemble(chunk(250, 550, indexed=False), chunk(0, 300, indexed=False))
+    assert doc.page_content == SOURCE[0:550]
+
+
+def test_other_sources_and_gaps_stay_separate():
+    docs = assemble(chunk(0, 300, score=0.9), chunk(600, 900, score=0.5),
+                    chunk(0, 300, source="khac.pdf", indexed=False, score=0.2))
+    assert [doc.page_content for doc in docs] == [SOURCE[0:300], SOURCE[600:900]]
+    assert [doc.metadata["relevance_score"] for doc in docs] == [0.9, 0.5]
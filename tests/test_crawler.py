@@ -0,0 +1,81 @@
+import threading
+
+from benchmarks.datasets import serve_html
+from services import WebCrawler
+
+
+def page(*links, text="Nội dung"):
+    anchors = "".join(f'<a href="{link}">{link}</a>' for link in links)
+    return f"<html><body><p>{text}</p>{anchors}</body></html>"
+
+
+def crawl(seed, **options):
+    crawler = WebCrawler(**{"delay": 0.0, **options})
+    return crawler, sorted(doc.metadata["source"].rsplit("/", 1)[-1] for doc in crawler.crawl(seed))
+
+
+def test_depth_limit():
+    pages = {"/": page("/a"), "/a": page("/b"), "/b": page("/c"), "/c": page()}
+    with serve_html(pages) as base:
+        _, fetched = crawl(f"{base}/", max_depth=1)
+    assert fetched == ["", "a"]
+
+
+def test_same_domain_and_extension_filter():
+    pages = {"/": page("/a", "http://example.invalid/x", "/file.pdf"), "/a": page()}
+    requests = []
+    with serve_html(pages, requests=requests) as base:
+        _, fetched = crawl(f"{base}/")
+    assert fetched == ["", "a"]
+    assert sorted(path for path, _ in requests) == ["/", "/a"]
+
+
+def test_per_host_politeness():
+    pages = {"/": page("/a", "/b", "/c"), "/a": page(), "/b": page(), "/c": page()}
+    requests = []
+    with serve_html(pages, requests=requests) as base:
+        crawl(f"{base}/", concurrency=4, per_host=1, delay=0.2)
+    times = sorted(moment for _, moment in requests)
+    assert len(times) == 4
+    assert all(later - earlier >= 0.18 for earlier, later in zip(times, times[1:]))
+
+
+def test_etag_recrawl_follows_unchanged_pages(env):
+    pages = {"/": page("/a", "/b"), "/a": page(text="A"), "/b": page(text="B")}
+    with serve_html(pages, etag=True) as base:
+        first = WebCrawler(delay=0.0, state_collection="crawl_state", state_key="test")
+        assert len(list(first.crawl(f"{base}/"))) == 3
+        first.commit_state()
+
+        # Trang gốc không đổi (304) nhưng trang con /b đổi nội dung thì vẫn phải được tải lại
+        pages["/b"] = page(text="B mới")
+        second = WebCrawler(delay=0.0, state_collection="crawl_state", state_key="test")
+        docs = list(second.crawl(f"{base}/"))
+
+    assert [doc.metadata["source"] for doc in docs] == [f"{base}/b"]
+    assert "B mới" in docs[0].page_content
+    assert second.stats["unchanged"] == 2
+    assert second.stats["fetched"] == 1
+
+
+def test_page_error_does_not_stall_crawl(monkeypatch):
+    pages = {"/": page("/a", "/bad", "/c"), "/a": page(), "/bad": page(), "/c": page()}
+    parse_page = WebCrawler._parse_page
+
+    def flaky(url, body):
+        if url.endswith("/bad"):
+            raise RuntimeError("parser bug")
+        return parse_page(url, body)
+
+    monkeypatch.setattr(WebCrawler, "_parse_page", staticmethod(flaky))
+    result = {}
+    with serve_html(pages) as base:
+        # Worker chết thì crawl treo ở frontier.join(), nên chạy trên thread có giới hạn thời gian
+        thread = threading.Thread(target=lambda: result.update(zip(("crawler", "fetched"),
+                                                                   crawl(f"{base}/", concurrency=1))),
+                                  daemon=True)
+        thread.start()
+        thread.join(timeout=10)
+    assert not thread.is_alive()
+    assert result["fetched"] == ["", "a", "c"]
+    assert result["crawler"].stats["failed"] == 1
@@ -0,0 +1,57 @@
+from langchain_core.documents import Document
+
+from database import QdrantManager
+from services import IngestionPipeline
+
+COLLECTION = "ingest_test"
+
+
+def chunks(source, *texts):
+    return [Document(page_content=text, metadata={"source": source}) for text in texts]
+
+
+def run(env, docs, **options):
+    return IngestionPipeline(COLLECTION, env.embeddings, **{"batch_size": 2, "workers": 1, **options}).run(docs)
+
+
+def test_reingesting_unchanged_file_writes_nothing(env):
+    texts = [f"Điều {i}: sinh viên đóng học phí theo tín chỉ." for i in range(5)]
+    first = run(env, chunks("quy-che.pdf", *texts))
+    assert first["added"] == 5
+    ids = QdrantManager.get_point_ids(COLLECTION, "quy-che.pdf")
+
+    second = run(env, chunks("quy-che.pdf", *texts))
+    assert second["added"] == 0
+    assert second["skipped"] == 5
+    assert second["removed"] == 0
+    assert QdrantManager.get_point_ids(COLLECTION, "quy-che.pdf") == ids
+    assert QdrantManager.count_points(COLLECTION) == 5
+
+
+def test_changed_file_replaces_stale_chunks(env):
+    run(env, chunks("quy-che.pdf", "Điều 1: giữ nguyên.", "Điều 2: bản cũ."))
+    run(env, chunks("tuyen-sinh.pdf", "Chỉ tiêu tuyển sinh."))
+    old_ids = QdrantManager.get_point_ids(COLLECTION, "quy-che.pdf")
+
+    result = run(env, chunks("quy-che.pdf", "Điều 1: giữ nguyên.", "Điều 2: bản mới."))
+    assert result["added"] == 1
+    assert result["skipped"] == 1
+    assert result["removed"] == 1
+
+    new_ids = QdrantManager.get_point_ids(COLLECTION, "quy-che.pdf")
+    assert len(new_ids) == 2
+    stale = old_ids - new_ids
+    assert len(stale) == 1
+    assert not QdrantManager._client.retrieve(COLLECTION, list(stale))
+    # Nguồn khác trong cùng collection không bị ảnh hưởng
+    assert len(QdrantManager.get_point_ids(COLLECTION, "tuyen-sinh.pdf")) == 1
+
+
+def test_concurrent_batches_land_every_point(env):
+    sources = [f"nguon-{i % 4}.pdf" for i in range(400)]
+    docs = [Document(page_content=f"Đoạn {i} của {source}.", metadata={"source": source})
+            for i, source in enumerate(sources)]
+    result = run(env, docs, workers=4, max_pending=16)
+    assert result["added"] == 400
+    assert QdrantManager.count_points(COLLECTION) == 400
+    assert sum(len(QdrantManager.get_point_ids(COLLECTION, f"nguon-{i}.pdf")) for i in range(4)) == 400
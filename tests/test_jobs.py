@@ -0,0 +1,130 @@
+import threading
+import time
+
+import pytest
+
+from database import MongoManager
+from services import IngestionCancelled, IngestionJobQueue, IngestionPipeline
+
+
+@pytest.fixture
+def jobs(env, monkeypatch):
+    monkeypatch.setattr(IngestionJobQueue, "_collection", "ingestion_jobs_test")
+    monkeypatch.setattr(IngestionJobQueue, "_stale_after", 60.0)
+    monkeypatch.setattr(IngestionJobQueue, "_cancel_events", {})
+    return IngestionJobQueue
+
+
+def insert(jobs, job_id, status, owner="other-host:1:abc", heartbeat=0.0, **fields):
+    job = {"_id": job_id, "status": status, "owner": owner, "cancel_requested": False, **fields}
+    if heartbeat is not None:
+        job["heartbeat_at"] = time.time() - heartbeat
+    MongoManager.insert_one(jobs._collection, job)
+
+
+def status(jobs, job_id):
+    return MongoManager.find_one(jobs._collection, {"_id": job_id})["status"]
+
+
+def test_only_stale_jobs_are_failed(jobs):
+    insert(jobs, "alive", "running", heartbeat=5)
+    insert(jobs, "queued-alive", "queued", heartbeat=5)
+    insert(jobs, "dead", "running", heartbeat=600)
+    insert(jobs, "legacy", "queued", owner=None, heartbeat=None)
+    insert(jobs, "finished", "done", heartbeat=600)
+
+    jobs._reap_stale()
+
+    assert [status(jobs, job_id) for job_id in ("alive", "queued-alive", "dead", "legacy", "finished")] == \
+        ["running", "queued", "failed", "failed", "done"]
+
+
+def test_heartbeat_keeps_own_jobs_alive(jobs):
+    insert(jobs, "mine", "running", owner=jobs._owner, heartbeat=600)
+    jobs._beat()
+    assert status(jobs, "mine") == "running"
+    assert time.time() - MongoManager.find_one(jobs._collection, {"_id": "mine"})["heartbeat_at"] < 5
+
+
+def test_cancel_reaches_owning_process(jobs):
+    insert(jobs, "mine", "running", owner=jobs._owner)
+    event = threading.Event()
+    # Yêu cầu hủy đến từ tiến trình khác: chỉ có cờ trên Mongo, không chạm được tới event
+    assert jobs.cancel("mine")
+    assert MongoManager.find_one(jobs._collection, {"_id": "mine"})["cancel_requested"]
+    jobs._cancel_events["mine"] = event
+    jobs._beat()
+    assert event.is_set()
+
+
+def test_cancel_queued_job(jobs):
+    insert(jobs, "waiting", "queued")
+    assert jobs.cancel("waiting")
+    assert status(jobs, "waiting") == "cancelled"
+    assert not jobs.cancel("waiting")
+
+
+def fake_ingest(monkeypatch, during=None):
+    calls = []
+
+    def ingest(*args, should_cancel=None, **kwargs):
+        calls.append(args)
+        if during:
+            during()
+        if should_cancel():
+            raise IngestionCancelled("Ingestion cancelled")
+        return {"progress": {}}
+
+    monkeypatch.setattr(IngestionPipeline, "ingest", ingest)
+    return calls
+
+
+@pytest.mark.parametrize("cancel_at", [1, 2, 3])
+def test_cancel_from_another_process_is_never_lost(jobs, monkeypatch, cancel_at):
+    calls = fake_ingest(monkeypatch)
+    insert(jobs, "raced", "queued", owner=jobs._owner, upload_type="pdf", source="a.pdf", collection="docs")
+    jobs._cancel_events["raced"] = threading.Event()
+    get_collection = MongoManager.get_collection
+    accesses, cancels = [], []
+
+    def interleave(name):
+        # Nút hủy ở tiến trình khác chen vào giữa các lần worker truy cập Mongo; nó chỉ ghi được lên Mongo
+        accesses.append(name)
+        if len(accesses) == cancel_at:
+            monkeypatch.setattr(MongoManager, "get_collection", get_collection)
+            with monkeypatch.context() as m:
+                m.setattr(IngestionJobQueue, "_cancel_events", {})
+                cancels.append((not calls, jobs.cancel("raced")))
+        return get_collection(name)
+
+    monkeypatch.setattr(MongoManager, "get_collection", interleave)
+    jobs._run("raced")
+    monkeypatch.setattr(MongoManager, "get_collection", get_collection)
+    job = MongoManager.find_one(jobs._collection, {"_id": "raced"})
+    if cancels == [(True, True)]:
+        assert calls == []
+        assert job["status"] == "cancelled"
+    elif cancels and cancels[0][1]:
+        # Hủy khi pipeline đã chạy xong thì job vẫn hoàn tất, nhưng yêu cầu hủy phải được ghi nhận
+        assert job["status"] in ("done", "cancelled") and job["cancel_requested"]
+    else:
+        assert job["status"] == "done"
+
+
+def test_cancel_after_claim_stops_run(jobs, monkeypatch):
+    calls = fake_ingest(monkeypatch, during=lambda: jobs.cancel("claimed"))
+    insert(jobs, "claimed", "queued", owner=jobs._owner, upload_type="pdf", source="a.pdf", collection="docs")
+    jobs._cancel_events["claimed"] = threading.Event()
+    jobs._run("claimed")
+    assert len(calls) == 1
+    assert status(jobs, "claimed") == "cancelled"
+
+
+def test_claimed_job_runs_once(jobs, monkeypatch):
+    calls = fake_ingest(monkeypatch)
+    insert(jobs, "once", "queued", owner=jobs._owner, upload_type="pdf", source="a.pdf", collection="docs")
+    jobs._run("once")
+    jobs._run("once")
+    assert len(calls) == 1
+    assert status(jobs, "once") == "done"
+    assert not jobs.cancel("once")
@@ -0,0 +1,32 @@
+from services import DocumentLoader
+
+
+def load(tmp_path, text, encoding="utf-8", **options):
+    path = tmp_path / "data.csv"
+    path.write_bytes(text.encode(encoding))
+    return list(DocumentLoader.iter_csv(str(path), **options))
+
+
+def test_quoted_commas_stay_in_one_field(tmp_path):
+    [doc] = load(tmp_path, 'Ngành,Mô tả\n"Công nghệ thông tin","Lập trình, mạng máy tính, dữ liệu"\n')
+    assert doc.page_content == "Ngành: Công nghệ thông tin\nMô tả: Lập trình, mạng máy tính, dữ liệu"
+    assert doc.metadata["Mô tả"] == "Lập trình, mạng máy tính, dữ liệu"
+    assert doc.metadata["row"] == 0
+
+
+def test_ragged_rows(tmp_path):
+    docs = load(tmp_path, "Ngành,Mã,Học phí\nKế toán,7340301\nLuật,7380101,25000000,\n Marketing , 7340115 ,30000000\n")
+    assert [doc.page_content for doc in docs] == [
+        "Ngành: Kế toán\nMã: 7340301\nHọc phí: ",
+        "Ngành: Luật\nMã: 7380101\nHọc phí: 25000000",
+        "Ngành: Marketing\nMã: 7340115\nHọc phí: 30000000",
+    ]
+    assert [doc.metadata["row"] for doc in docs] == [0, 1, 2]
+
+
+def test_batches_keep_row_numbers(tmp_path):
+    rows = "".join(f"Ngành {i},Mô tả {i}\n" for i in range(7))
+    docs = load(tmp_path, "Ngành,Mô tả\n" + rows, encoding="utf-8-sig", batch_rows=3)
+    assert [doc.metadata["row"] for doc in docs] == list(range(7))
+    assert docs[6].page_content == "Ngành: Ngành 6\nMô tả: Mô tả 6"
+    assert all(doc.metadata["source"].endswith("data.csv") for doc in docs)
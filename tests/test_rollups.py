@@ -0,0 +1,99 @@
+from datetime import timedelta
+
+import pytest
+
+from config import MONGODB_CONFIG
+from database import MongoManager
+from services import RollupManager
+from services.rollups import LATENCY_BOUNDS, hll_estimate, hll_register, histogram_bin, histogram_percentile
+
+
+def registers(usernames):
+    result = {}
+    for username in usernames:
+        index, rank = hll_register(username)
+        result[str(index)] = max(result.get(str(index), 0), rank)
+    return result
+
+
+def chat_bucket(*records):
+    inc, maximum = {}, {}
+    for record in records:
+        record_inc, record_max = RollupManager._chat_update(record)
+        for field, value in record_inc.items():
+            inc[field] = inc.get(field, 0) + value
+        for field, value in record_max.items():
+            maximum[field] = max(maximum.get(field, value), value)
+    return RollupManager._document("chat:hour:x", inc, maximum, {"kind": "chat"})
+
+
+def test_histogram_percentile_interpolates_within_bin():
+    histogram = {histogram_bin(0.15): 10}
+    assert histogram_percentile(histogram, 0.5) == pytest.approx(0.15)
+    assert histogram_percentile(histogram, 1.0) == pytest.approx(0.2)
+
+
+def test_histogram_percentile_uses_maximum_above_last_bound():
+    histogram = {histogram_bin(0.05): 1, histogram_bin(500.0): 1}
+    assert histogram_percentile(histogram, 1.0, maximum=500.0) == pytest.approx(500.0)
+    assert histogram_percentile({}, 0.5) is None
+
+
+def test_histogram_percentile_close_to_exact():
+    values = [0.01 * i for i in range(1, 1001)]
+    histogram = {}
+    for value in values:
+        histogram[histogram_bin(value)] = histogram.get(histogram_bin(value), 0) + 1
+    for q in (0.5, 0.95, 0.99):
+        exact = values[int(q * len(values)) - 1]
+        upper = LATENCY_BOUNDS[int(histogram_bin(exact))]
+        assert abs(histogram_percentile(histogram, q, max(values)) - exact) <= upper * 0.5
+
+
+@pytest.mark.parametrize("count", [50, 5000])
+def test_hll_estimate(count):
+    estimate = hll_estimate(registers(f"user{i}" for i in range(count)))
+    assert abs(estimate - count) <= max(2, count * 0.1)
+    assert hll_estimate(registers(f"user{i}" for i in range(count) for _ in range(3))) == estimate
+
+
+def test_merge_and_summarize():
+    first = chat_bucket({"username": "a", "processing_time": 1.2, "input_word_count": 3},
+                        {"username": "b", "processing_time": 0.4, "cache_hit": True})
+    second = chat_bucket({"username": "a", "processing_time": 9.0, "time_to_first_token": 0.3})
+    merged = RollupManager.merge([first, second])
+    assert merged["count"] == 3
+    assert merged["cache_hits"] == 1
+    assert sum(merged["hist"]["processing_time"].values()) == 3
+    assert merged["max"]["processing_time"] == 9.0
+
+    summary = RollupManager.summarize([first, second])
+    assert summary["users"] == 2
+    assert summary["input_words"] == 3
+    metric = summary["metrics"]["processing_time"]
+    assert metric["samples"] == 3
+    assert metric["mean"] == pytest.approx((1.2 + 0.4 + 9.0) / 3)
+    assert metric["p50"] <= metric["p95"] <= metric["max"] == 9.0
+    assert summary["metrics"]["time_to_first_token"]["samples"] == 1
+
+
+def test_backfill_keeps_live_buckets(env):
+    chats = MONGODB_CONFIG["CHAT_HISTORY"]
+    now = RollupManager.now()
+    yesterday = now - timedelta(days=1)
+    MongoManager.insert_many(chats, [{"timestamp": yesterday, "username": "a", "processing_time": 1.0},
+                                     {"timestamp": yesterday, "username": "b", "processing_time": 2.0}])
+    rollups = MongoManager.get_collection(RollupManager.collection())
+    rollups.insert_one({"_id": "chat:day:2000-01-01 00:00:00", "kind": "chat", "granularity": "day",
+                        "bucket": "2000-01-01 00:00:00", "count": 7})
+    # Câu hỏi hôm nay đã được ghi trực tiếp vào rollup nhưng chưa có trong chat history
+    RollupManager.record_chat({"username": "c", "processing_time": 3.0}, now)
+
+    counts = RollupManager.backfill(chats, MONGODB_CONFIG["LOGIN_HISTORY"])
+
+    assert counts["chat"] == 2
+    days = {bucket["bucket"]: bucket for bucket in RollupManager.get_buckets("chat", "day")}
+    assert set(days) == {RollupManager.bucket_start(yesterday, "day"), RollupManager.bucket_start(now, "day")}
+    assert days[RollupManager.bucket_start(yesterday, "day")]["count"] == 2
+    assert days[RollupManager.bucket_start(now, "day")]["count"] == 1
+    assert RollupManager.summarize([days[RollupManager.bucket_start(yesterday, "day")]])["users"] == 2
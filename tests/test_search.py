@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from config import MONGODB_CONFIG
+from database import MongoManager
+from services import ChatSearchIndex, RollupManager
+
+
+def test_backfill_keeps_live_term_stats(env):
+    chats = MONGODB_CONFIG["CHAT_HISTORY"]
+    now = RollupManager.now()
+    yesterday = now - timedelta(days=1)
+    MongoManager.insert_many(chats, [{"timestamp": yesterday, "question": "Học phí ngành luật", "answer": "Có"},
+                                     {"timestamp": yesterday, "question": "Học phí", "answer": "Không"}])
+    stats = MongoManager.get_collection(ChatSearchIndex.collection())
+    stats.insert_one({"_id": "question:2000-01-01 00:00:00", "field": "question", "day": "2000-01-01 00:00:00",
+                      "terms": {"cũ": 3}, "total": 3})
+    # Câu hỏi hôm nay đã được thống kê trực tiếp nhưng chưa có trong chat history
+    ChatSearchIndex.record_terms({"question": "Điểm chuẩn", "answer": "Xem"}, now)
+
+    counts = ChatSearchIndex.backfill(chats)
+
+    assert counts == {"indexed": 2, "days": 1}
+    assert sorted(doc["search_tokens"] for doc in MongoManager.find_many(chats, {})) == \
+        [["co", "hoc", "luat", "nganh", "phi"], ["hoc", "khong", "phi"]]
+    previous = stats.find_one({"_id": f"question:{RollupManager.bucket_start(yesterday, 'day')}"})
+    assert previous["terms"] == {"học": 2, "phí": 2, "ngành": 1, "luật": 1}
+    assert previous["total"] == 6
+    assert stats.find_one({"_id": "question:2000-01-01 00:00:00"}) is None
+    terms, total = ChatSearchIndex.top_terms("question", now, now + timedelta(days=1))
+    assert total == 2 and dict(terms) == {"điểm": 1, "chuẩn": 1}
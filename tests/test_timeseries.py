@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.timeseries import lttb, local_times, raw_bands
+
+
+@pytest.mark.parametrize("n, threshold", [(10000, 500), (1001, 3), (257, 100)])
+def test_lttb_keeps_endpoints_within_budget(n, threshold):
+    rng = np.random.default_rng(7)
+    x = np.arange(n, dtype=float)
+    y = np.cumsum(rng.normal(size=n))
+    indices = lttb(x, y, threshold)
+    assert len(indices) <= threshold
+    assert indices[0] == 0 and indices[-1] == n - 1
+    assert np.all(np.diff(indices) > 0)
+
+
+def test_lttb_keeps_spike():
+    y = np.zeros(1000)
+    y[537] = 50.0
+    assert 537 in lttb(np.arange(1000), y, 50)
+
+
+def test_lttb_small_input_returned_whole():
+    assert list(lttb(np.arange(5), np.arange(5), 10)) == list(range(5))
+
+
+def test_raw_bands_match_pandas_groupby():
+    rng = np.random.default_rng(3)
+    timestamps = pd.Series(pd.Timestamp("2024-05-01", tz="UTC")
+                           + pd.to_timedelta(rng.uniform(0, 6 * 3600, 5000), unit="s"))
+    values = pd.Series(rng.gamma(2.0, 1.5, 5000))
+    values[::97] = np.nan
+
+    bands = raw_bands(timestamps, values, "minute")
+
+    frame = pd.DataFrame({"minute": local_times(timestamps).dt.floor("min"), "value": values}).dropna()
+    grouped = frame.groupby("minute")["value"]
+    # Nearest-rank floor(q * (n - 1)) tương ứng interpolation="lower" của pandas
+    expected = pd.DataFrame({
+        "timestamp": grouped.size().index,
+        "count": grouped.size().to_numpy(),
+        "p50": grouped.quantile(0.5, interpolation="lower").to_numpy(),
+        "p95": grouped.quantile(0.95, interpolation="lower").to_numpy(),
+        "max": grouped.max().to_numpy(),
+    })
+    pd.testing.assert_frame_equal(bands.reset_index(drop=True), expected, check_dtype=False, check_names=False)
+
+
+def test_raw_bands_all_missing():
+    bands = raw_bands(pd.Series(pd.to_datetime(["2024-05-01"], utc=True)), pd.Series([np.nan]), "hour")
+    assert bands.empty
@@ -1,39 +1,120 @@
 import streamlit as st
 import os
 import time
-from datetime import datetime
-import pytz
+from models import SemanticCache, Tracer, ContextAssembler
+from services import ResourceRegistry, RollupManager, ChatSearchIndex, utc_now
 
 class Chat:
+    STREAM_FLUSH_TOKENS = 8
+    STREAM_FLUSH_INTERVAL = 0.1
+
+    RETRY_MESSAGE = "Hệ thống đang cập nhật dữ liệu, vui lòng thử lại sau ít phút"
+
+    @staticmethod
+    def _lookup_cache(question, collection):
+        embedding = st.session_state.model.embedding_query(question)
+        with Tracer.stage("cache_lookup"):
+            cached = SemanticCache.lookup(collection, embedding)
+        return collection, embedding, cached
+
+    @staticmethod
+    def _build_context(docs):
+        with Tracer.stage("context"):
+            context = ContextAssembler.assemble(docs)
+        Tracer.record("context_chunks", len(context))
+        Tracer.record("context_tokens", sum(ContextAssembler.estimate_tokens(doc.page_content) for doc in context))
+        return context
 
     @classmethod
     def get_answer(cls, question):
         try:
-            start = time.time()
-            docs = st.session_state.qdrant_db.get_data_from_store(st.session_state.retriever, question)
-            result = st.session_state.model.chat(docs, question)
-            processing_time = time.time() - start
-            cls.save_chat_result(question, result, processing_time)
-            return result, processing_time, docs
+            with Tracer.start() as trace:
+                start = time.time()
+                # Giữ nguyên phiên bản collection trong suốt câu hỏi, kể cả khi admin vừa đổi dữ liệu
+                active = ResourceRegistry.get_active_collection()
+                collection, embedding, cached = cls._lookup_cache(question, active.cache_key)
+                if cached is not None:
+                    processing_time = time.time() - start
+                    cls.save_chat_result(question, cached["answer"], processing_time, cache_hit=True, trace=trace)
+                    return cached["answer"], processing_time, cached["docs"]
+
+                docs = st.session_state.qdrant_db.get_data_from_store(active.retriever, question, embedding)
+                result = st.session_state.model.chat(cls._build_context(docs), question)
+                SemanticCache.store(collection, question, embedding, result, docs)
+                processing_time = time.time() - start
+                cls.save_chat_result(question, result, processing_time, trace=trace)
+                return result, processing_time, docs
         except Exception as e:
             st.write(e)
-            return "Hệ thống vừa cập nhật vui lòng đăng nhập lại", 0, ""
-
+            return cls.RETRY_MESSAGE, 0, ""
 
+    @classmethod
+    def stream_answer(cls, question, message_placeholder):
+        try:
+            with Tracer.start() as trace:
+                start = time.time()
+                with st.spinner('Đang xử lý câu hỏi...'):
+                    active = ResourceRegistry.get_active_collection()
+                    collection, embedding, cached = cls._lookup_cache(question, active.cache_key)
+                    if cached is None:
+                        docs = st.session_state.qdrant_db.get_data_from_store(active.retriever, question, embedding)
+                        context = cls._build_context(docs)
+
+                if cached is not None:
+                    message_placeholder.markdown(cached["answer"])
+                    processing_time = time.time() - start
+                    cls.save_chat_result(question, cached["answer"], processing_time, processing_time,
+                                         cache_hit=True, trace=trace)
+                    return cached["answer"], processing_time, cached["docs"]
+
+                # Gom nhiều token rồi mới vẽ lại, tránh re-render markdown sau từng token
+                full_response = ""
+                time_to_first_token = None
+                pending_tokens = 0
+                last_flush = time.time()
+                for chunk in st.session_state.model.chat_stream(context, question):
+                    if time_to_first_token is None:
+                        time_to_first_token = time.time() - start
+                    full_response += chunk
+                    pending_tokens += 1
+                    now = time.time()
+                    if pending_tokens >= cls.STREAM_FLUSH_TOKENS or now - last_flush >= cls.STREAM_FLUSH_INTERVAL:
+                        message_placeholder.markdown(full_response + "|")
+                        pending_tokens = 0
+                        last_flush = now
+
+                answer = st.session_state.model.postprocess_response(full_response)
+                message_placeholder.markdown(answer)
+                processing_time = time.time() - start
+                SemanticCache.store(collection, question, embedding, answer, docs)
+                cls.save_chat_result(question, answer, processing_time, time_to_first_token, trace=trace)
+                return answer, processing_time, docs
+        except Exception as e:
+            st.write(e)
+            answer = cls.RETRY_MESSAGE
+            message_placeholder.markdown(answer)
+            return answer, 0, ""
 
     @staticmethod
-    def save_chat_result(question, answer, processing_time):
-        vietnam_tz = pytz.timezone('Asia/Ho_Chi_Minh')
+    def save_chat_result(question, answer, processing_time, time_to_first_token=None, cache_hit=False, trace=None):
+        now = utc_now()
         chat_record = {
             "question": question,
             "answer": answer,
             "processing_time": processing_time,
+            "time_to_first_token": time_to_first_token,
             "input_word_count": len(question.split()),
             "output_word_count": len(answer.split()),
-            "timestamp": datetime.now(vietnam_tz).strftime("%Y-%m-%d %H:%M:%S"),
+            "timestamp": now,
             "username": st.session_state.username,
+            "cache_hit": cache_hit,
         }
+        if trace is not None:
+            chat_record.update(trace.to_dict())
+        ChatSearchIndex.prepare(chat_record)
         st.session_state.mongodb.insert_one(st.session_state.chat_collection, chat_record)
+        RollupManager.record_chat(chat_record, now)
+        ChatSearchIndex.record_terms(chat_record, now)
 
     @staticmethod
     def display_chat_history():
@@ -49,17 +130,7 @@ class Chat:
 
         with st.chat_message("assistant"):
             message_placeholder = st.empty()
-            full_response = ""
-            with st.spinner('Đang xử lý câu hỏi...'):
-                answer, processing_time, docs = cls.get_answer(prompt)
-
-            # Stream the response
-            for char in answer:
-                full_response += char
-                time.sleep(0.01)  # Adjust this value to control the speed of streaming
-                message_placeholder.markdown(full_response + "|")
-            message_placeholder.markdown(full_response)
-
+            answer, processing_time, docs = cls.stream_answer(prompt, message_placeholder)
             st.caption(f"Xử lý hoàn tất trong {processing_time:.2f} giây!")
 
         st.session_state.messages.append({"role": "assistant", "content": answer, "processing_time": processing_time})
@@ -85,7 +156,8 @@ class Chat:
 
     @classmethod
     def show(cls):
-        if st.session_state.current_data == "" or st.session_state.current_data is None:
+        active = ResourceRegistry.get_active_collection()
+        if active.name == "" or active.name is None:
             cls.maintenance()
         else:
             cls.normal()
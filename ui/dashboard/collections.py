@@ -1,5 +1,6 @@
 import streamlit as st
 from datetime import datetime
+from services import ResourceRegistry, CollectionReleaseManager, ReleaseCheckFailed
 
 
 class Collections:
@@ -11,7 +12,13 @@ class Collections:
                 'DatabaseName': col['name'],
                 'Document Count': col['points_count'],
                 'Vector Size': col['vector_size'],
-                'Distance Metric': col['distance_metric']
+                'Distance Metric': col['distance_metric'],
+                'Indexed Vectors': col['indexed_vectors_count'],
+                'Segments': col['segments_count'],
+                'Status': col['status'],
+                'Profile': col['profile'] or 'custom',
+                'Aliases': col['aliases'],
+                'Memory': col['memory']
             } for col in st.session_state.qdrant_db.get_collections()]
         except Exception as e:
             st.error(f"Lỗi khi lấy thông tin collections: {str(e)}")
@@ -29,6 +36,8 @@ class Collections:
                     "update_time": current_time
                 }
             )
+            # Đổi retriever dùng chung ngay, không chờ chu kỳ kiểm tra kế tiếp
+            ResourceRegistry.refresh_active_collection(wait=True)
             if result.modified_count > 0:
                 st.success(f"Đã cập nhật SELECTED_DATABASE thành {database_name}")
             elif result.upserted_id:
@@ -62,14 +71,60 @@ class Collections:
             return None
 
     @staticmethod
-    def display_collection(col, current_collection):
+    def display_releases(releases, current_collection):
+        st.subheader("Releases (blue/green)")
+        for alias, release in releases.items():
+            with st.expander(f"{alias} → {release['current'] or 'chưa có phiên bản'}"):
+                col1, col2, col3 = st.columns([4, 3, 3])
+                if current_collection != alias:
+                    if col1.button("Chọn làm Database cho Chatbot", key=f"select_release_{alias}"):
+                        Collections.update_selected_database(alias)
+                        st.rerun()
+                else:
+                    col1.info("Đang được sử dụng cho Chatbot")
+                if col2.button("Rollback", key=f"rollback_{alias}"):
+                    previous = CollectionReleaseManager.rollback(alias)
+                    if previous:
+                        st.success(f"Đã chuyển {alias} về {previous}")
+                        st.rerun()
+                    else:
+                        st.warning("Không có phiên bản cũ hơn để rollback")
+                if col3.button("Dọn phiên bản cũ", key=f"gc_{alias}"):
+                    removed = CollectionReleaseManager.garbage_collect(alias)
+                    st.success(f"Đã xóa {len(removed)} phiên bản")
+                    st.rerun()
+
+                for version in release["versions"]:
+                    info, action = st.columns([7, 3])
+                    status = release["status"].get(version) or "không rõ"
+                    if version == release["current"]:
+                        info.write(f"**{version}** (đang dùng)")
+                    else:
+                        info.write(f"{version} · {status}")
+                        if action.button("Promote", key=f"promote_{version}"):
+                            # Luôn chạy lại smoke test trước khi chuyển alias
+                            try:
+                                CollectionReleaseManager.release(alias, version)
+                                st.rerun()
+                            except ReleaseCheckFailed as e:
+                                st.error(str(e))
+
+    @staticmethod
+    def display_collection(col, current_collection, live_versions=()):
         with st.expander(f"{col['DatabaseName']} - {col['Document Count']} documents"):
             st.write(f"Vector Size: {col['Vector Size']}")
             st.write(f"Distance Metric: {col['Distance Metric']}")
+            st.caption(f"Profile: {col['Profile']} · Status: {col['Status']} · Segments: {col['Segments']} · "
+                       f"Indexed vectors: {col['Indexed Vectors']} · "
+                       f"RAM ≈ {col['Memory']['ram_mb']:.1f} MB · Disk ≈ {col['Memory']['disk_mb']:.1f} MB")
+            if col['Aliases']:
+                st.caption(f"Aliases: {', '.join(col['Aliases'])}")
 
             col1, col2, col3 = st.columns([6, 3, 3])
 
-            if current_collection != col['DatabaseName']:
+            if col['DatabaseName'] in live_versions:
+                col1.info("Phiên bản đang được alias trỏ tới, dùng Rollback/Promote để thay đổi")
+            elif current_collection != col['DatabaseName']:
                 if col1.button("Chọn làm Database cho Chatbot", key=f"select_{col['DatabaseName']}"):
                     result = Collections.update_selected_database(col['DatabaseName'])
                     if result.modified_count > 0 or result.upserted_id:
@@ -137,6 +192,11 @@ class Collections:
             st.warning("Không có cơ sỡ dữ liệu")
         else:
             current_collection = Collections.get_selected_database()
+            releases = CollectionReleaseManager.list_releases()
+            if releases:
+                Collections.display_releases(releases, current_collection)
+                st.subheader("Collections")
+            live_versions = {release["current"] for release in releases.values()}
             for col in collections:
-                Collections.display_collection(col, current_collection)
+                Collections.display_collection(col, current_collection, live_versions)
             st.write(f"Database hiện tại cho Chatbot: **{current_collection}**")
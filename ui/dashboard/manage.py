@@ -3,29 +3,46 @@ from pymongo import MongoClient
 import pandas as pd
 from datetime import datetime, timedelta
 import plotly.express as px
-from collections import Counter
 import plotly.graph_objects as go
 import psutil
 import platform
 import time
-import re
 import pytz
+from models import SemanticCache, Tracer
+from services import ResourceRegistry, RollupManager, ChatSearchIndex, DashboardDataCache, BanList
+from services.timeseries import POINT_BUDGET, day_bounds, load_bands, local_times, lttb, pick_granularity
 class General:
     _vietnam_tz = pytz.timezone('Asia/Ho_Chi_Minh')
     @staticmethod
-    def calculate_metrics(df):
-        if df.empty:
-            return {metric: 0 for metric in
-                    ['total_questions', 'total_input_words', 'total_output_words', 'avg_processing_time',
-                     'max_processing_time']}
+    def _metrics(summary):
+        count = summary['count']
+        latency = summary['metrics'].get('processing_time', {})
         return {
-            'total_questions': len(df),
-            'total_input_words': df['input_word_count'].sum(),
-            'total_output_words': df['output_word_count'].sum(),
-            'avg_processing_time': df['processing_time'].mean(),
-            'max_processing_time': df['processing_time'].max()
+            'total_questions': count,
+            'total_input_words': summary['input_words'],
+            'total_output_words': summary['output_words'],
+            'avg_processing_time': latency.get('mean', 0.0),
+            'max_processing_time': latency.get('max', 0.0),
+            'total_processing_time': latency.get('sum', 0.0),
+            'avg_input_words': summary['input_words'] / count if count else 0.0,
+            'avg_output_words': summary['output_words'] / count if count else 0.0
         }
 
+    @classmethod
+    def calculate_metrics(cls):
+        # Chỉ đọc bucket theo ngày (vài trăm bản ghi), không phụ thuộc số câu hỏi đã lưu
+        today_start = RollupManager.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        today = RollupManager.bucket_start(today_start, "day")
+        yesterday = RollupManager.bucket_start(today_start - timedelta(days=1), "day")
+        week = RollupManager.bucket_start(today_start - timedelta(days=6), "day")
+        days = RollupManager.get_buckets("chat", "day")
+
+        summary_today = RollupManager.summarize(b for b in days if b['bucket'] == today)
+        summary_yesterday = RollupManager.summarize(b for b in days if b['bucket'] == yesterday)
+        summary_week = RollupManager.summarize(b for b in days if b['bucket'] >= week)
+        return (cls._metrics(RollupManager.summarize(days)), cls._metrics(summary_today),
+                cls._metrics(summary_yesterday), summary_today['users'], summary_week['users'])
+
     @staticmethod
     def calc_percent_change(today_value, yesterday_value):
         total_value = today_value + yesterday_value
@@ -42,33 +59,11 @@ class General:
 
     @classmethod
     def show(cls):
-        if "data" not in st.session_state:
-            st.session_state.data = list(st.session_state.mongodb.find_many(
-                st.session_state.chat_collection, {}
-            ))
-
-        if "login_data" not in st.session_state:
-            st.session_state.login_data = list(st.session_state.mongodb.find_many(
-                st.session_state.login_collection, {}
-            ))
-
-        data = st.session_state.data
-        df = pd.DataFrame(data)
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        metrics_all, metrics_today, metrics_yesterday, active_users_today, active_users_week = \
+            cls.calculate_metrics()
 
         col1, col2, col3, col4, col5 = st.columns(5)
 
-        today = datetime.now(cls._vietnam_tz).date()
-        yesterday = today - timedelta(days=1)
-
-        df_today = df[df['timestamp'].dt.date == today]
-        df_yesterday = df[df['timestamp'].dt.date == yesterday]
-
-
-        metrics_all = cls.calculate_metrics(df)
-        metrics_today = cls.calculate_metrics(df_today)
-        metrics_yesterday = cls.calculate_metrics(df_yesterday)
-
         col1.metric(
             label="Tổng Số Câu Hỏi",
             value=f"{metrics_all['total_questions']:,}",
@@ -106,66 +101,104 @@ class General:
 
 
         # Thời gian sử dụng
-        total_usage_time = df['processing_time'].sum() / 60  # in minutes
+        total_usage_time = metrics_all['total_processing_time'] / 60  # in minutes
         col1, col2, col3, col4 = st.columns(4)
         col1.metric("Tổng thời gian xử lý (phút)", f"{total_usage_time:.2f}")
 
-        # Thống kê người dùng
-        active_users_today = df_today['username'].nunique()
-        active_users_week = df[df['timestamp'].dt.tz_localize('UTC').dt.tz_convert(cls._vietnam_tz) > (datetime.now(cls._vietnam_tz) - timedelta(days=7))]['username'].nunique()
-        avg_question_length = df['input_word_count'].mean()
-        avg_answer_length = df['output_word_count'].mean()
-
-
-        col2.metric("Độ dài TB câu hỏi (từ)", f"{avg_question_length:.2f}")
-
-
-        col3.metric("Độ dài TB câu trả lời (từ)", f"{avg_answer_length:.2f}")
+        col2.metric("Độ dài TB câu hỏi (từ)", f"{metrics_all['avg_input_words']:.2f}")
 
+        col3.metric("Độ dài TB câu trả lời (từ)", f"{metrics_all['avg_output_words']:.2f}")
 
+        col4.metric("Người dùng 7 ngày", f"{active_users_week:,}", help=f"Hôm nay: {active_users_today:,}")
 
 
+class TimeProcessVisualize:
+    _vietnam_tz = pytz.timezone('Asia/Ho_Chi_Minh')
+    PERCENTILE_METRICS = Tracer.STAGES + ['time_to_first_token', 'processing_time']
 
+    @staticmethod
+    def rollup_frame(buckets):
+        rows = []
+        for bucket in buckets:
+            summary = RollupManager.summarize([bucket])
+            row = {'timestamp': pd.to_datetime(bucket['bucket']), 'count': summary['count']}
+            for metric, values in summary['metrics'].items():
+                row[f'{metric}_mean'] = values['mean']
+                row[f'{metric}_max'] = values['max']
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+    GRANULARITY_LABELS = {'auto': 'Tự động', 'minute': 'Phút', 'hour': 'Giờ', 'day': 'Ngày'}
 
+    @staticmethod
+    def raw_series(start, end):
+        # Bản ghi gốc lấy từ cache dùng chung, chỉ giữ khoảng đã chọn
+        df = DashboardDataCache.get("chat")
+        if df.empty:
+            return df.assign(local_time=pd.Series(dtype='datetime64[ns]'))
+        timestamps = pd.to_datetime(df['timestamp'], utc=True)
+        df = df[(timestamps >= start) & (timestamps < end) & df['processing_time'].notna()]
+        df = df.assign(local_time=local_times(df['timestamp'])).sort_values('local_time')
+        return df
 
+    @classmethod
+    def show_series(cls):
+        col1, col2 = st.columns([2, 1])
+        today = datetime.now(cls._vietnam_tz).date()
+        with col1:
+            date_range = st.date_input("Khoảng thời gian", [today - timedelta(days=6), today], key="latency_range")
+        with col2:
+            choice = st.selectbox("Độ chi tiết", list(cls.GRANULARITY_LABELS),
+                                  format_func=cls.GRANULARITY_LABELS.get, key="latency_granularity")
+        start_date, end_date = (date_range[0], date_range[-1]) if date_range else (today, today)
+        start, end = day_bounds(start_date, end_date)
+        granularity = pick_granularity(start, end) if choice == 'auto' else choice
 
+        raw = cls.raw_series(start, end)
+        bands = load_bands(granularity, start, end, raw)
+        # Đường gốc giảm còn tối đa POINT_BUDGET điểm bằng LTTB, vẫn giữ các đỉnh
+        points = raw.iloc[lttb(raw['local_time'].astype('int64').to_numpy(), raw['processing_time'].to_numpy())]
 
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(x=bands['timestamp'], y=bands['p50'], name='p50', mode='lines',
+                                 line=dict(width=1)))
+        fig.add_trace(go.Scatter(x=bands['timestamp'], y=bands['p95'], name='p95', mode='lines', fill='tonexty',
+                                 line=dict(width=1)))
+        fig.add_trace(go.Scatter(x=bands['timestamp'], y=bands['max'], name='Tối đa', mode='lines',
+                                 line=dict(dash='dot', width=1)))
+        fig.add_trace(go.Scattergl(x=points['local_time'], y=points['processing_time'], name='Câu hỏi',
+                                   mode='lines', line=dict(width=1), opacity=0.5))
+        fig.update_layout(
+            title=f'Thời Gian Xử Lý Theo Thời Gian ({cls.GRANULARITY_LABELS[granularity].lower()})',
+            xaxis_title="Thời Gian",
+            yaxis_title="Thời Gian Xử Lý (giây)"
+        )
+        st.plotly_chart(fig, use_container_width=True)
+        st.caption(f"{len(raw):,} câu hỏi, hiển thị {len(points):,} điểm (tối đa {POINT_BUDGET:,}) "
+                   f"và {len(bands):,} bucket phân vị.")
 
-class TimeProcessVisualize:
-    _vietnam_tz = pytz.timezone('Asia/Ho_Chi_Minh')
     @classmethod
     def show(cls):
-        if "data" not in st.session_state:
-            st.session_state.data = list(st.session_state.mongodb.find_many(
-                st.session_state.chat_collection, {}
-            ))
+        days = RollupManager.get_buckets("chat", "day")
+        if not days:
+            st.info("Chưa có dữ liệu thống kê.")
+            return
 
-        data = st.session_state.data
-        df = pd.DataFrame(data)
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        df['date'] = df['timestamp'].dt.date
+        df_daily = cls.rollup_frame(days)
 
         # st.html('<p class="medium-font">Biểu Đồ Thống Kê</p>')
 
-        fig_line = px.line(df, x='timestamp', y='processing_time', title='Thời Gian Xử Lý Theo Thời Gian')
-        fig_line.update_layout(xaxis_title="Thời Gian", yaxis_title="Thời Gian Xử Lý (giây)")
-        st.plotly_chart(fig_line, use_container_width=True)
-
-        df_daily = df.groupby('date').agg({
-            'processing_time': ['mean', 'max']
-        }).reset_index()
-
-        # Rename columns for easier access
-        df_daily.columns = ['date', 'avg_processing_time', 'max_processing_time']
+        cls.show_series()
 
         # Create the figure
         fig = go.Figure()
 
         # Add the bar trace for average processing time
-        fig.add_trace(go.Bar(x=df_daily['date'], y=df_daily['avg_processing_time'], name='Trung bình'))
+        fig.add_trace(go.Bar(x=df_daily['timestamp'], y=df_daily['processing_time_mean'], name='Trung bình'))
 
         # Add the line trace for maximum processing time
-        fig.add_trace(go.Scatter(x=df_daily['date'], y=df_daily['max_processing_time'], name='Tối đa', mode='lines'))
+        fig.add_trace(go.Scatter(x=df_daily['timestamp'], y=df_daily['processing_time_max'], name='Tối đa',
+                                 mode='lines'))
 
         # Update the layout
         fig.update_layout(
@@ -177,47 +210,98 @@ class TimeProcessVisualize:
         # Display the figure in Streamlit
         st.plotly_chart(fig, use_container_width=True)
 
+        cls.show_stage_breakdown(df_daily, RollupManager.summarize(days))
+
+    @classmethod
+    def percentile_table(cls, summary):
+        rows = []
+        for metric in cls.PERCENTILE_METRICS:
+            values = summary['metrics'].get(metric)
+            if not values or not values['samples']:
+                continue
+            rows.append({
+                'Giai đoạn': metric,
+                'Số mẫu': values['samples'],
+                'p50 (giây)': values['p50'],
+                'p95 (giây)': values['p95'],
+                'p99 (giây)': values['p99']
+            })
+        return pd.DataFrame(rows)
+
+    @classmethod
+    def show_stage_breakdown(cls, df_daily, summary):
+        stage_columns = [stage for stage in Tracer.STAGES if f'{stage}_mean' in df_daily.columns]
+        if not stage_columns:
+            st.info("Chưa có dữ liệu thời gian theo từng giai đoạn.")
+            return
+
+        fig_stages = go.Figure()
+        for stage in stage_columns:
+            fig_stages.add_trace(go.Bar(x=df_daily['timestamp'], y=df_daily[f'{stage}_mean'].fillna(0), name=stage))
+        fig_stages.update_layout(
+            barmode='stack',
+            title='Thời gian xử lý trung bình theo giai đoạn',
+            xaxis_title='Ngày',
+            yaxis_title='Thời gian (giây)'
+        )
+        st.plotly_chart(fig_stages, use_container_width=True)
+
+        st.markdown("### Phân vị thời gian xử lý")
+        st.dataframe(cls.percentile_table(summary), use_container_width=True)
+        st.caption("Phân vị được ước lượng từ histogram của bảng tổng hợp.")
+
 
 class AccountManager:
     _vietnam_tz = pytz.timezone('Asia/Ho_Chi_Minh')
+    PAGE_SIZES = [5, 10, 20, 50]
+
+    @staticmethod
+    def _group_stages(exclude):
+        return [
+            {"$match": {"username": {"$nin": list(exclude)}}},
+            {"$group": {"_id": "$username", "count": {"$sum": 1}}}
+        ]
+
     @classmethod
-    def show(cls):
+    def account_count(cls, exclude):
+        result = st.session_state.mongodb.aggregate(st.session_state.login_collection,
+                                                    cls._group_stages(exclude) + [{"$count": "value"}])
+        return result[0]["value"] if result else 0
 
-        if "login_data" not in st.session_state:
-            st.session_state.login_data = list(st.session_state.mongodb.find_many(
-                st.session_state.login_collection, {}
-            ))
+    @classmethod
+    def account_activity(cls, exclude, page, page_size):
+        # Đếm, sắp xếp và phân trang ngay trên Mongo, chỉ trả về một trang username
+        return st.session_state.mongodb.aggregate(st.session_state.login_collection, cls._group_stages(exclude) + [
+            {"$sort": {"count": -1, "_id": 1}},
+            {"$skip": page * page_size},
+            {"$limit": page_size}
+        ])
 
-        login_data = st.session_state.login_data
-        login_df = pd.DataFrame(login_data)
-        data = st.session_state.data
-        df = pd.DataFrame(data)
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        banned_usernames = set(
-        doc['username'] for doc in st.session_state.mongodb.find_many(st.session_state.ban_collection, {}))
+    @classmethod
+    def show(cls):
+        bans = BanList.snapshot()
 
-        total_accounts = len(login_df['username'].unique())
-        active_accounts = total_accounts - len(banned_usernames)
+        # Đếm chính xác trên collection tài khoản (username có unique index), gồm cả tài khoản chưa đăng nhập lần nào
+        accounts_collection = st.session_state.mongodb.get_collection(st.session_state.account_collection)
+        total_accounts = accounts_collection.count_documents({})
+        active_accounts = total_accounts - accounts_collection.count_documents({"username": {"$in": list(bans)}})
 
         col1, col2, col3 = st.columns(3)
         col1.metric("Tổng số tài khoản", total_accounts)
         col2.metric("Tài khoản đang hoạt động", active_accounts)
-        col3.metric("Tài khoản bị chặn", len(banned_usernames))
+        col3.metric("Tài khoản bị chặn", len(bans))
         # st.html('<p class="medium-font">IP Gửi Nhiều Request Nhất</p>')
 
-        banned_usernames = set(doc['username'] for doc in st.session_state.mongodb.find_many(st.session_state.ban_collection, {}))
         st.markdown('<h4>QUẢN LÝ TÀI KHOẢN</h4>', unsafe_allow_html=True)
-        if login_df is not None and not login_df.empty:
-            non_banned_usernames = login_df[~login_df['username'].isin(banned_usernames)]['username']
-            username_counts = Counter(non_banned_usernames)
-
-            num_usernames = st.selectbox("Chọn số lượng username muốn hiển thị",
-                                         options=range(1, min(11, len(username_counts) + 1)),
-                                         index=min(4, len(username_counts) - 1))
-
-            top_usernames = username_counts.most_common(num_usernames)
-
-            for username, count in top_usernames:
+        col1, col2 = st.columns(2)
+        page_size = col1.selectbox("Số username mỗi trang", options=cls.PAGE_SIZES, index=0)
+        pages = max(1, -(-cls.account_count(bans) // page_size))
+        page = col2.number_input(f"Trang (tổng {pages})", min_value=1, max_value=pages, value=1, step=1)
+        accounts = cls.account_activity(bans, page - 1, page_size)
+
+        if accounts:
+            for account in accounts:
+                username, count = account['_id'], account['count']
                 col1, col2, col3 = st.columns([2, 1, 1])
 
                 if username == st.session_state.username:
@@ -225,83 +309,86 @@ class AccountManager:
                                   unsafe_allow_html=True)
                     col2.markdown(f"<span style='color: #1E90FF;'><strong>Số lượng: {count}</strong></span>",
                                   unsafe_allow_html=True)
-                elif username in banned_usernames:
-                    col1.markdown(f"<span style='color: #DC143C;'>Username: {username}</span>", unsafe_allow_html=True)
-                    col2.write(f"Số lượng: {count}")
                 else:
                     col1.write(f"Username: {username}")
                     col2.write(f"Số lượng: {count}")
 
                 if username == st.session_state.username:
                     col3.markdown("<span style='color: #1E90FF;'>(Tài khoản của bạn)</span>", unsafe_allow_html=True)
-                elif username in banned_usernames:
-                    col3.markdown("<span style='color: #DC143C;'>(Đã bị chặn)</span>", unsafe_allow_html=True)
                 else:
                     if col3.button("Chặn", key=f"ban_{username}"):
-                        st.session_state.mongodb.insert_one(st.session_state.ban_collection,
-                                                            {"username": username, "banned_at": datetime.now(cls._vietnam_tz)})
+                        BanList.ban(username)
                         st.success(f"Đã chặn username {username}")
                         st.rerun()
             # username_df = pd.DataFrame(top_usernames, columns=['Username', 'Số lượng truy cập'])
             # fig_username = px.bar(username_df, x='Username', y='Số lượng truy cập',
             #                       title=f'Top {num_usernames} username có nhiều truy cập nhất')
             # st.plotly_chart(fig_username, use_container_width=True)
-
-            st.markdown('<h4>DANH SÁCH CHẶN</h4>', unsafe_allow_html=True)
-
-            banned_usernames_data = list(st.session_state.mongodb.find_many(st.session_state.ban_collection, {}))
-            if banned_usernames_data:
-                banned_df = pd.DataFrame(banned_usernames_data)
-                banned_df['banned_at'] = pd.to_datetime(banned_df['banned_at'])
-                banned_df = banned_df.sort_values('banned_at', ascending=False)
-
-                for _, row in banned_df.iterrows():
-                    col1, col2, col3 = st.columns([2, 2, 1])
-                    col1.write(f"Username: {row['username']}")
-                    col2.write(f"Bị cấm lúc: {row['banned_at'].strftime('%Y-%m-%d %H:%M:%S')}")
-                    if col3.button(f"Gỡ chặn", key=f"unban_{row['username']}"):
-                        st.session_state.mongodb.delete_one(st.session_state.ban_collection, {"username": row['username']})
-                        st.success(f"Đã gỡ cấm username {row['username']}")
-                        st.experimental_rerun()
-            else:
-                st.write("Không có username nào bị chặn.")
         else:
             st.write("Không có dữ liệu đăng nhập.")
 
-
-
+        st.markdown('<h4>DANH SÁCH CHẶN</h4>', unsafe_allow_html=True)
+
+        if bans:
+            banned_df = pd.DataFrame(list(bans.items()), columns=['username', 'banned_at'])
+            banned_df['banned_at'] = pd.to_datetime(banned_df['banned_at'], utc=True).dt.tz_convert(cls._vietnam_tz)
+            banned_df = banned_df.sort_values('banned_at', ascending=False)
+
+            for _, row in banned_df.iterrows():
+                col1, col2, col3 = st.columns([2, 2, 1])
+                col1.write(f"Username: {row['username']}")
+                col2.write(f"Bị cấm lúc: {row['banned_at'].strftime('%Y-%m-%d %H:%M:%S')}")
+                if col3.button(f"Gỡ chặn", key=f"unban_{row['username']}"):
+                    BanList.unban(row['username'])
+                    st.success(f"Đã gỡ cấm username {row['username']}")
+                    st.rerun()
+        else:
+            st.write("Không có username nào bị chặn.")
 
 
 class SearchMessageManager:
     _vietnam_tz = pytz.timezone('Asia/Ho_Chi_Minh')
+    COLUMNS = ['question', 'answer', 'timestamp', 'input_word_count', 'output_word_count', 'processing_time',
+               'username']
+
     @classmethod
-    def show(cls):
-        if "data" not in st.session_state:
-            st.session_state.data = list(st.session_state.mongodb.find_many(
-                st.session_state.chat_collection, {}
-            ))
+    def load_page(cls, search_term, start, end, username, page):
+        # Từ khóa, ngày và người hỏi đều lọc trên index của Mongo, mỗi lần chỉ lấy một trang
+        projection = {column: 1 for column in cls.COLUMNS}
+        projection['_id'] = 0
+        records = ChatSearchIndex.search(st.session_state.chat_collection, search_term, start, end, username, page,
+                                         projection=projection)
+        df = pd.DataFrame(records, columns=cls.COLUMNS)
+        df['timestamp'] = pd.to_datetime(df['timestamp'], utc=True).dt.tz_convert(cls._vietnam_tz)
+        return df
 
-        data = st.session_state.data
-        df = pd.DataFrame(data)
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
+    @staticmethod
+    def term_table(field, start, end):
+        top_terms, total = ChatSearchIndex.top_terms(field, start, end)
+        data = pd.DataFrame(top_terms, columns=['Từ', 'Số Lần Xuất Hiện'])
+        data['Tần suất (%)'] = data['Số Lần Xuất Hiện'] / total * 100 if total else 0.0
+        return data
 
-        col1, col2 = st.columns([2, 1])
+    @classmethod
+    def show(cls):
+        col1, col2, col3 = st.columns([2, 1, 1])
         with col1:
             search_term = st.text_input("Tìm kiếm")
         with col2:
+            username = st.text_input("Người hỏi").strip() or None
+        with col3:
             date_range = st.date_input("Chọn khoảng thời gian", [datetime.now(cls._vietnam_tz) - timedelta(days=7), datetime.now(cls._vietnam_tz)])
 
-        if len(date_range) == 2:
-            start_date, end_date = date_range
-            filtered_df = df[
-                (df['question'].str.contains(search_term, case=False, na=False) | df['answer'].str.contains(search_term, case=False, na=False)) &
-                (df['timestamp'].dt.date >= start_date) &
-                (df['timestamp'].dt.date <= end_date)
-                ]
-        else:
-            filtered_df = df[df['question'].str.contains(search_term, case=False, na=False)]
+        # Đang chọn dở khoảng thời gian (mới có ngày bắt đầu) thì chỉ xem ngày đó
+        start_date, end_date = (date_range[0], date_range[-1]) if date_range else (datetime.now(cls._vietnam_tz).date(),) * 2
+        start, end = day_bounds(start_date, end_date)
 
-        filtered_df_renamed = filtered_df.rename(columns={
+        total = ChatSearchIndex.count(st.session_state.chat_collection, search_term, start, end, username)
+        pages = max(1, -(-total // ChatSearchIndex.PAGE_SIZE))
+        page = st.number_input(f"Trang (tổng {pages})", min_value=1, max_value=pages, value=1, step=1)
+        df = cls.load_page(search_term, start, end, username, page - 1)
+
+        filtered_df_renamed = df.rename(columns={
             'question': 'Câu Hỏi',
             'answer': 'Câu Trả Lời',
             'timestamp': 'Thời Gian',
@@ -311,48 +398,29 @@ class SearchMessageManager:
             'username': 'Người hỏi'
         })
 
-        st.markdown(f"**Kết quả:** `{len(filtered_df)}` bản ghi")
+        st.markdown(f"**Kết quả:** `{total}` bản ghi")
         st.dataframe(
             filtered_df_renamed[
                 ['Câu Hỏi', 'Câu Trả Lời', 'Thời Gian', 'Số Từ Input', 'Số Từ Output', 'Thời Gian Xử Lý (giây)', 'Người hỏi']],
             height=300
         )
 
-        # Tokenize text and count word frequencies
-        def tokenize(text):
-            words = re.findall(r'\w+', text.lower())
-            return words
-
-        all_questions = ' '.join(filtered_df['question'].dropna())
-        all_answers = ' '.join(filtered_df['answer'].dropna())
-
-        question_words = tokenize(all_questions)
-        answer_words = tokenize(all_answers)
-
-        question_word_counts = Counter(question_words)
-        answer_word_counts = Counter(answer_words)
-
-        total_question_words = sum(question_word_counts.values())
-        total_answer_words = sum(answer_word_counts.values())
-
-        top_question_words = question_word_counts.most_common(10)
-        top_answer_words = answer_word_counts.most_common(10)
-
-        question_data = pd.DataFrame(top_question_words, columns=['Từ', 'Số Lần Xuất Hiện'])
-        question_data['Tần suất (%)'] = question_data['Số Lần Xuất Hiện'] / total_question_words * 100
-
-        answer_data = pd.DataFrame(top_answer_words, columns=['Từ', 'Số Lần Xuất Hiện'])
-        answer_data['Tần suất (%)'] = answer_data['Số Lần Xuất Hiện'] / total_answer_words * 100
+        # Thống kê từ đọc từ bảng tổng hợp theo ngày nên chỉ lọc được theo khoảng thời gian
+        st.markdown("#### Thống kê từ toàn hệ thống")
+        st.caption(f"Tính trên mọi câu hỏi từ {start_date:%d/%m/%Y} đến {end_date:%d/%m/%Y}, "
+                   "không áp dụng bộ lọc từ khóa và người hỏi ở trên.")
+        if search_term.strip() or username:
+            st.info("Bảng kết quả phía trên đã lọc theo từ khóa/người hỏi, còn thống kê từ bên dưới thì không.")
 
         col1, col2 = st.columns(2)
 
         with col1:
-            st.markdown("### Từ hỏi nhiều nhất")
-            st.write(question_data)
+            st.markdown("### Từ hỏi nhiều nhất (toàn hệ thống)")
+            st.write(cls.term_table('question', start, end))
 
         with col2:
-            st.markdown("### Từ trả lời nhiều nhất")
-            st.write(answer_data)
+            st.markdown("### Từ trả lời nhiều nhất (toàn hệ thống)")
+            st.write(cls.term_table('answer', start, end))
 
 
 class SystemInfoManager:
@@ -369,7 +437,8 @@ class SystemInfoManager:
 
         col1, col2 = st.columns(2)
         col1.info(f"**Embedded Model:** {st.session_state.model_embed}")
-        col2.info(f"**Current Database:** {st.session_state.current_data}")
+        active = ResourceRegistry.get_active_collection()
+        col2.info(f"**Current Database:** {active.name} (v{active.version})")
 
         # Thông tin chi tiết
         st.markdown("### Chi tiết cấu hình")
@@ -413,11 +482,13 @@ class SystemInfoManager:
         status_info = {
             "IP Address": st.session_state.ip,
             "Initialized": "Yes" if st.session_state.initialized else "No",
+            "Process Init (giây)": f"{ResourceRegistry.get_stats()['init_time'] or 0:.2f}",
+            "Session Init (giây)": f"{st.session_state.get('session_init_time', 0):.3f}",
+            "Sessions": ResourceRegistry.get_stats()['session_count'],
             "Current Date": datetime.now(cls._vietnam_tz).strftime("%Y-%m-%d"),
             "Uptime": f"{(time.time() - psutil.boot_time()) / 60:.2f} minutes",
             "CPU Usage": f"{psutil.cpu_percent()}%",
-            "Active Users": len(set(
-                msg['username'] for msg in st.session_state.mongodb.find_many(st.session_state.chat_collection, {})))
+            "Active Users": RollupManager.summarize(RollupManager.get_buckets("chat", "day"))['users']
         }
 
         col1, col2 = st.columns(2)
@@ -427,5 +498,16 @@ class SystemInfoManager:
             else:
                 col2.info(f"**{key}:** {value}")
 
-
-
+        # Bộ nhớ đệm câu trả lời
+        st.markdown("### Bộ nhớ đệm câu trả lời")
+        cache_stats = SemanticCache.get_stats()
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Cache hit", f"{cache_stats['hits']:,}")
+        col2.metric("Cache miss", f"{cache_stats['misses']:,}")
+        col3.metric("Tỉ lệ hit", f"{cache_stats['hit_rate'] * 100:.1f}%")
+        col4.metric("Số câu đã lưu", f"{cache_stats['size']:,} / {cache_stats['max_entries']:,}")
+        st.caption(f"Ngưỡng tương đồng: {cache_stats['threshold']} · TTL: {cache_stats['ttl']} giây · "
+                   f"Đã loại bỏ: {cache_stats['evictions']:,} · Collection: {cache_stats['collection']}")
+        if st.button("Xóa bộ nhớ đệm", key="clear_semantic_cache"):
+            SemanticCache.clear()
+            st.rerun()
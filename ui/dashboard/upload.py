@@ -1,12 +1,10 @@
 import os
 import time
+import uuid
 import streamlit as st
-from qdrant_client.http.exceptions import UnexpectedResponse
-from langchain_community.document_loaders import PyPDFLoader, WebBaseLoader, CSVLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from bs4 import BeautifulSoup
-import re
-from langchain.schema import Document
+from config import CRAWLER_CONFIG, INGESTION_CONFIG, QDRANT_CONFIG
+from database.qdrant import COLLECTION_PROFILES
+from services import IngestionJobQueue, CollectionReleaseManager
 
 
 class Upload:
@@ -16,12 +14,15 @@ class Upload:
 
     @staticmethod
     def get_temp_filename(collection_name, typefile):
-        return f"{collection_name}_{int(time.time())}.{typefile}"
+        # File phải tồn tại đến khi job chạy xong (kể cả khi chạy lại), nên lưu vào thư mục riêng với tên duy nhất
+        os.makedirs(INGESTION_CONFIG["UPLOAD_DIR"], exist_ok=True)
+        return os.path.join(INGESTION_CONFIG["UPLOAD_DIR"],
+                            f"{collection_name}_{int(time.time())}_{uuid.uuid4().hex[:8]}.{typefile}")
 
     @classmethod
     def show(cls):
         st.title("UPLOAD DATA")
-        tab1, tab2, tab3 = st.tabs(["PDF", "WEB", "CSV"])
+        tab1, tab2, tab3, tab4 = st.tabs(["PDF", "WEB", "CSV", "JOBS"])
 
         with tab1:
             cls.upload_pdf_ui()
@@ -29,6 +30,8 @@ class Upload:
             cls.upload_web_ui()
         with tab3:
             cls.upload_csv_ui()
+        with tab4:
+            cls.show_jobs()
 
     @classmethod
     def upload_pdf_ui(cls):
@@ -39,7 +42,7 @@ class Upload:
 
     @classmethod
     def upload_csv_ui(cls):
-        st.info(f"Note: Maximum file size is {Upload.MAX_FILE_SIZE_MB}MB.")
+        st.info("CSV files are read in row batches, so large score tables are supported.")
         uploaded_file = st.file_uploader(f"Choose a CSV file", type=["csv"],
                                          accept_multiple_files=False)
         cls._handle_file_upload(uploaded_file, "csv")
@@ -47,17 +50,25 @@ class Upload:
     @classmethod
     def upload_web_ui(cls):
         st.info("Enter a URL to scrape and upload.")
-        url = st.text_input("Enter URL")
+        mode = st.radio("Mode", ["Single page", "Crawl site / sitemap"], horizontal=True)
+        if mode == "Single page":
+            url = st.text_input("Enter URL")
+            upload_type = "web"
+        else:
+            st.caption(f"Crawl cùng tên miền, sâu tối đa {CRAWLER_CONFIG['MAX_DEPTH']} cấp, "
+                       f"tối đa {CRAWLER_CONFIG['MAX_PAGES']} trang; trang không thay đổi sẽ được bỏ qua.")
+            url = st.text_input("Enter seed URL or sitemap.xml")
+            upload_type = "crawl"
         if url:
             cls.initialize_session_state()
-            cls.show_database_options("web", url)
+            cls.show_database_options(upload_type, url)
 
     @classmethod
     def _handle_file_upload(cls, uploaded_file, file_type):
         if uploaded_file:
             file_size_mb = uploaded_file.size / (1024 * 1024)
             st.caption(f"File size: {file_size_mb:.2f} MB")
-            if uploaded_file.size > Upload.MAX_FILE_SIZE_BYTES:
+            if file_type != "csv" and uploaded_file.size > Upload.MAX_FILE_SIZE_BYTES:
                 st.error(f"File is too large. Please upload a file smaller than {Upload.MAX_FILE_SIZE_MB}MB.")
             else:
                 cls.initialize_session_state()
@@ -65,7 +76,7 @@ class Upload:
 
     @classmethod
     def show_database_options(cls, upload_type, data):
-        tab1, tab2 = st.tabs(["Create new database", "Add to existing database"])
+        tab1, tab2, tab3 = st.tabs(["Create new database", "Add to existing database", "Rebuild (blue/green)"])
 
         with tab1:
             cls._new_database_form(upload_type, data)
@@ -73,10 +84,14 @@ class Upload:
         with tab2:
             cls._existing_database_form(upload_type, data)
 
+        with tab3:
+            cls._release_form(upload_type, data)
+
     @classmethod
     def _new_database_form(cls, upload_type, data):
         with st.form("new_database_form"):
             new_collection_name = st.text_input("Enter new database name", "")
+            profile = cls._profile_select("new_database_profile")
             col1, col2 = st.columns([2.5, 5.5])
             with col1:
                 submit_new = st.form_submit_button("Upload to new database")
@@ -87,7 +102,7 @@ class Upload:
                 if new_collection_name.strip() in st.session_state.collection_names:
                     st.error("Database name already exists")
                 elif new_collection_name.strip():
-                    cls.process_upload(upload_type, data, new_collection_name.strip())
+                    cls.process_upload(upload_type, data, new_collection_name.strip(), profile=profile)
 
             if refresh_new:
                 st.rerun()
@@ -116,157 +131,138 @@ class Upload:
                 st.rerun()
 
     @classmethod
-    def process_upload(cls, upload_type, data, collection_name):
-        with st.spinner('Processing...'):
-            start_time = time.time()
-            temp_filename = None
-            try:
-                if upload_type == "pdf":
-                    temp_filename = cls.get_temp_filename(collection_name, Upload.ALLOWED_FILE_TYPE)
-                    content = cls._process_file(data, temp_filename, cls.process_pdf)
-                elif upload_type == "web":
-                    content = cls.process_web(data)
-                elif upload_type == "csv":
-                    temp_filename = cls.get_temp_filename(collection_name, 'csv')
-                    content = cls._process_file(data, temp_filename, cls.process_csv)
-                else:
-                    raise ValueError("Invalid upload type")
-
-                if isinstance(content, Exception):
-                    raise content
-
-                model = st.session_state.embedding_model
-                st.session_state.qdrant_db.upload_data(collection_name, content, model)
-
-                processing_time = time.time() - start_time
-                st.success(f"Processing completed in {processing_time:.2f} seconds!")
-                cls._update_session_state()
-
-            except (UnexpectedResponse, TimeoutError, ConnectionError) as e:
-                st.error(f"Connection error to server: {str(e)}")
-            except Exception as e:
-                st.error(f"An unexpected error occurred: {str(e)}")
-            finally:
-                if temp_filename and os.path.exists(temp_filename):
-                    try:
-                        os.remove(temp_filename)
-                    except Exception as e:
-                        st.warning(f"Could not delete temporary file: {str(e)}")
-
-    @staticmethod
-    def _process_file(data, temp_filename, process_func):
-        with open(temp_filename, "wb") as f:
-            f.write(data.getbuffer())
-        return process_func(temp_filename)
-
-    @staticmethod
-    def initialize_session_state():
-        if 'existing_collections' not in st.session_state:
-            st.session_state.existing_collections = st.session_state.qdrant_db.get_collections()
-        if 'collection_names' not in st.session_state:
-            st.session_state.collection_names = [col["name"].strip() for col in st.session_state.existing_collections]
+    def _release_form(cls, upload_type, data):
+        with st.form("release_form"):
+            st.caption("Dữ liệu được nạp vào một phiên bản mới, kiểm tra bằng các câu hỏi mẫu rồi mới chuyển alias; "
+                       "chatbot dùng alias sẽ không bị gián đoạn.")
+            releases = list(CollectionReleaseManager.list_releases())
+            options = releases + ["+ New release"]
+            selected = st.selectbox("Release:", options)
+            new_alias = st.text_input("New release name (only for '+ New release')", "")
+            profile = cls._profile_select("release_profile")
+            submit_release = st.form_submit_button("Build new version")
+
+            if submit_release:
+                alias = new_alias.strip() if selected == "+ New release" else selected
+                try:
+                    if selected == "+ New release":
+                        CollectionReleaseManager.validate_alias(alias)
+                    cls.process_upload(upload_type, data, CollectionReleaseManager.new_version(alias), release=alias,
+                                       profile=profile)
+                except ValueError as e:
+                    st.error(str(e))
 
     @staticmethod
-    def _update_session_state():
-        st.session_state.existing_collections = st.session_state.qdrant_db.get_collections()
-        st.session_state.collection_names = [col["name"].strip() for col in st.session_state.existing_collections]
+    def _profile_select(key):
+        profiles = list(COLLECTION_PROFILES)
+        profile = st.selectbox("Collection profile:", profiles, index=profiles.index(QDRANT_CONFIG["DEFAULT_PROFILE"]),
+                               key=key, help="default: vector đầy đủ trong RAM · accurate: HNSW lớn hơn · "
+                                             "balanced: lượng tử hóa int8, vector gốc trên đĩa · "
+                                             "compact: lượng tử hóa nhị phân, vector và payload trên đĩa")
+        settings = COLLECTION_PROFILES[profile]
+        st.caption(f"Quantization: {settings['quantization'] or 'none'} · HNSW m={settings['hnsw_m']}, "
+                   f"ef_construct={settings['hnsw_ef_construct']} · on-disk vectors: {settings['on_disk_vectors']} · "
+                   f"on-disk payload: {settings['on_disk_payload']}")
+        return profile
 
     @classmethod
-    def process_pdf(cls, file_path):
+    def process_upload(cls, upload_type, data, collection_name, release=None, profile=None):
+        # Chỉ lưu file và đưa vào hàng đợi; việc nạp chạy nền nên không mất khi đóng tab hay rerun
+        temp_filename = None
         try:
-            data = PyPDFLoader(file_path).load()
-            text_split = cls._split_text(data)
-            if not text_split:
-                raise ValueError("No content extracted from PDF")
-            return text_split
-        except Exception as e:
-            return e
+            if upload_type == "pdf":
+                temp_filename = cls.get_temp_filename(collection_name, Upload.ALLOWED_FILE_TYPE)
+                source = cls._save_temp_file(data, temp_filename)
+            elif upload_type in ("web", "crawl"):
+                source = data
+            elif upload_type == "csv":
+                temp_filename = cls.get_temp_filename(collection_name, 'csv')
+                source = cls._save_temp_file(data, temp_filename)
+            else:
+                raise ValueError("Invalid upload type")
 
-    @classmethod
-    def process_web(cls, url):
-        try:
-            os.environ["USER_AGENT"] = "MyAgent"
-            loader = WebBaseLoader(url)
-            loader.requests_kwargs = {'verify': False}
-            html_content = loader.scrape('html.parser')
-            for element in html_content(['script', 'style', 'meta', 'link', 'comment', 'a']):
-                element.decompose()
-
-            text = html_content.get_text(separator='\n', strip=True)
-            text = cls._clean_text(text)
-
-            data = [Document(page_content=text, metadata={"source": url})]
-            text_split = cls._split_text(data)
-            if not text_split:
-                raise ValueError("No content extracted from web page")
-            return text_split
+            source_name = None if upload_type in ("web", "crawl") else data.name
+            job_id = IngestionJobQueue.submit(upload_type, source, collection_name, source_name=source_name,
+                                              username=st.session_state.get("username"), temp_file=temp_filename,
+                                              release=release, profile=profile)
+            st.success(f"Upload queued as job {job_id[:8]}. Track its progress in the JOBS tab.")
         except Exception as e:
-            return e
+            st.error(f"An unexpected error occurred: {str(e)}")
+            if temp_filename and os.path.exists(temp_filename):
+                os.remove(temp_filename)
 
     @classmethod
-    def process_csv(cls, file_path):
-        try:
-            # Try different encodings
-            encodings = ['utf-8', 'iso-8859-1', 'cp1252']
-            data = []
-
-            for encoding in encodings:
-                try:
-                    loader = CSVLoader(file_path, encoding=encoding)
-                    data = loader.load()
-                    if data:
-                        break
-                except UnicodeDecodeError:
-                    continue
-
-            if not data:
-                raise ValueError("Unable to read the CSV file with supported encodings")
-
-            # Extract column names
-            with open(file_path, 'r', encoding= encoding) as f:
-                header = f.readline().strip().split(',')
-
-            # Process each row
-            processed_data = []
-            for doc in data:
-                content = doc.page_content
-                metadata = doc.metadata
-
-                # Split the content into key-value pairs
-                pairs = content.split(',')
-
-                # Create a dictionary of all fields
-                fields = {header[i]: pairs[i].strip() for i in range(min(len(header), len(pairs)))}
-
-                # Create a more detailed page content
-                detailed_content = "\n".join([f"{k}: {v}" for k, v in fields.items()])
-
-                # Update metadata with all fields for better searchability
-                metadata.update(fields)
+    def show_jobs(cls):
+        col1, col2 = st.columns([7, 1])
+        with col1:
+            st.caption("Các job nạp dữ liệu gần nhất")
+        with col2:
+            if st.button("Refresh", key="refresh_jobs"):
+                cls._update_session_state()
+                st.rerun()
 
-                # Create a new document with detailed content and enhanced metadata
-                processed_data.append(Document(page_content=detailed_content, metadata=metadata))
+        jobs = IngestionJobQueue.list_jobs()
+        if not jobs:
+            st.info("No ingestion jobs yet.")
+            return
+
+        for job in jobs:
+            source = job.get("source_name") or job["source"]
+            with st.container(border=True):
+                info, actions = st.columns([6, 2])
+                with info:
+                    st.markdown(f"**{job['collection']}** · `{job['upload_type']}` · {source}")
+                    st.caption(cls._job_summary(job))
+                    if job["status"] == "running" and job["progress"].get("split"):
+                        progress = job["progress"]
+                        done = progress.get("upserted", 0) + progress.get("skipped", 0)
+                        st.progress(min(done / progress["split"], 1.0))
+                    if job.get("error"):
+                        st.error(job["error"])
+                with actions:
+                    if job["status"] in ("queued", "running"):
+                        if st.button("Cancel", key=f"cancel_{job['_id']}"):
+                            IngestionJobQueue.cancel(job["_id"])
+                            st.rerun()
+                    else:
+                        if job["status"] in ("failed", "cancelled") and st.button("Retry", key=f"retry_{job['_id']}"):
+                            IngestionJobQueue.retry(job["_id"])
+                            st.rerun()
+                        if st.button("Delete", key=f"delete_{job['_id']}"):
+                            IngestionJobQueue.delete(job["_id"])
+                            st.rerun()
 
-            text_split = cls._split_text(processed_data)
-            if not text_split:
-                raise ValueError("No content extracted from CSV after splitting")
-            return text_split
+    @staticmethod
+    def _job_summary(job):
+        parts = [f"Status: {job['status']}", f"Attempt: {job.get('attempts', 1)}",
+                 time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(job["created_at"]))]
+        if job.get("started_at"):
+            parts.append(f"{(job.get('finished_at') or time.time()) - job['started_at']:.1f}s")
+        result = job.get("result")
+        if result:
+            parts.append(f"added {result['added']}, skipped {result['skipped']}, removed {result['removed']}")
+            if "release" in result:
+                parts.append(f"promoted {result['release']['alias']} → {result['release']['version']}")
+            if "crawl" in result:
+                parts.append(f"pages {result['crawl']['fetched']}, unchanged {result['crawl']['unchanged']}")
+        elif job.get("progress"):
+            progress = job["progress"]
+            parts.append(f"split {progress.get('split', 0)}, upserted {progress.get('upserted', 0)}")
+        return " · ".join(parts)
 
-        except Exception as e:
-            return ValueError(f"Error processing CSV file: {str(e)}")
+    @staticmethod
+    def _save_temp_file(data, temp_filename):
+        with open(temp_filename, "wb") as f:
+            f.write(data.getbuffer())
+        return temp_filename
 
     @staticmethod
-    def _clean_text(text):
-        text = re.sub(r'\s+', ' ', text)
-        text = re.sub(r'[^a-zA-Z0-9À-ỹ\s.,!?]', '', text)
-        text = re.sub(r'\n\s*\n', '\n', text)
-        return text.strip()
+    def initialize_session_state():
+        # Danh mục collection được cache dùng chung theo TTL nên đọc lại mỗi lần render vẫn rẻ
+        st.session_state.existing_collections = st.session_state.qdrant_db.get_collections()
+        st.session_state.collection_names = [col["name"].strip() for col in st.session_state.existing_collections]
 
     @staticmethod
-    def _split_text(data, chunk_size: int = 1000, chunk_overlap: int = 200):
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            separators=["\n\n", "\n", " ", ".", ",", "\u200b", "\uff0c", "\u3001", "\uff0e", "\u3002", ""]
-        )
-        return text_splitter.split_documents(data)
\ No newline at end of file
+    def _update_session_state():
+        st.session_state.existing_collections = st.session_state.qdrant_db.get_collections(force=True)
+        st.session_state.collection_names = [col["name"].strip() for col in st.session_state.existing_collections]
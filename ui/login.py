@@ -1,11 +1,10 @@
 import re
 import streamlit as st
-from datetime import datetime
+from pymongo.errors import DuplicateKeyError
 from werkzeug.security import check_password_hash, generate_password_hash
-import pytz
+from services import RollupManager, BanList, utc_now
 
 class Login:
-    _vietnam_tz = pytz.timezone('Asia/Ho_Chi_Minh')
 
     @staticmethod
     def show(mongo_db, account, login_history, ban_collection, ip):
@@ -80,7 +79,7 @@ class Login:
 
     @classmethod
     def login(cls, mongo_db, account, login_history, ban_collection, username, password, ip):
-        if Login.check_banned_user(mongo_db, ban_collection, username):
+        if Login.check_banned_user(username):
             st.error("Tài khoản của bạn đã bị cấm. Vui lòng liên hệ quản trị viên.")
             return
 
@@ -119,21 +118,28 @@ class Login:
                 "username": new_username,
                 "password": hashed_password,
                 "role": "user",
-                "created_at": datetime.now(cls._vietnam_tz).strftime("%Y-%m-%d %H:%M:%S"),
+                "created_at": utc_now(),
             }
-            mongo_db.insert_one(account, new_user)
+            try:
+                mongo_db.insert_one(account, new_user)
+            except DuplicateKeyError:
+                # Hai lượt đăng ký cùng tên đồng thời, unique index chặn bản thứ hai
+                st.error("Tên đăng nhập đã tồn tại!")
+                return
             st.session_state.registration_success = True
             st.rerun()
 
     @classmethod
     def save_login_info(cls, mongo_db, login_history, username, role, ip):
+        now = utc_now()
         login_info = {
             "username": username,
             "role": role,
             "ip_address": ip,
-            "timestamp": datetime.now(cls._vietnam_tz).strftime("%Y-%m-%d %H:%M:%S %Z")
+            "timestamp": now
         }
         mongo_db.insert_one(login_history, login_info)
+        RollupManager.record_login(login_info, now)
         return True
 
     @staticmethod
@@ -143,6 +149,6 @@ class Login:
         st.rerun()
 
     @staticmethod
-    def check_banned_user(mongo_db, ban_collection, username):
-        banned_user = mongo_db.find_one(ban_collection, {"username": username})
-        return banned_user is not None
+    def check_banned_user(username):
+        # Danh sách chặn giữ trong bộ nhớ tiến trình, chỉ tải lại khi phiên bản trên Mongo thay đổi
+        return BanList.is_banned(username)